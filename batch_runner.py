@@ -0,0 +1,126 @@
+import os
+import glob
+import json
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+def collect_jobs(input_dir=None, manifest=None, modify_source=None, output_dir="output_hwpx", template=None,
+                 use_registry=True, output_format="both", options=None):
+    """
+    배치 작업 목록을 만듭니다.
+    - input_dir: 폴더 안의 *.hwpx 전부 (치환 데이터는 modify_source 공통 사용)
+    - manifest: 한 줄에 하나씩 HWPX 경로, 또는 JSON 객체
+      ({"input": ..., "output": ..., "modify": ..., "template": ...} / "modify" 대신 "data" 가능)
+    - template: 양식 지정 (없으면 use_registry=True일 때 문서마다 양식 레지스트리로 자동 판별)
+    - output_format: "both" | "hwpx" | "pdf" (main.OUTPUT_FORMATS)
+    - options: 모든 작업에 공통으로 넘길 main.process_hwpx_document 키워드 인자 (압축 레벨, 캐시 사용 여부 등)
+      프로세스 간에 넘기므로 값은 pickle 가능해야 하며, 결과 캐시는 "result_cache_bytes"(최대 크기)로 지정합니다.
+    """
+    jobs = []
+
+    if input_dir:
+        for path in sorted(glob.glob(os.path.join(input_dir, "*.hwpx"))):
+            jobs.append({"input": path, "modify": modify_source})
+
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="UTF-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    entry = json.loads(line)
+                    job = {
+                        "input": entry["input"],
+                        "output": entry.get("output"),
+                        "modify": entry.get("modify") or entry.get("data") or modify_source,
+                        "template": entry.get("template"),
+                    }
+                    if isinstance(job["modify"], dict):
+                        job["modify"] = json.dumps(job["modify"], ensure_ascii=False)
+                else:
+                    job = {"input": line, "modify": modify_source}
+                if not os.path.isabs(job["input"]):
+                    job["input"] = os.path.join(base_dir, job["input"])
+                jobs.append(job)
+
+    for job in jobs:
+        job.setdefault("output", None)
+        if not job.get("template"):
+            job["template"] = template
+        job["use_registry"] = use_registry
+        job["output_format"] = output_format
+        job["output_dir"] = output_dir
+        job["options"] = dict(options or {})
+    return jobs
+
+
+def _run_job(job):
+    """
+    워커 프로세스에서 문서 1건을 처리합니다.
+    job["options"]는 process_hwpx_document에 그대로 넘기고, "result_cache_bytes"가 있으면 결과 캐시를 엽니다.
+    (결과 캐시는 항목마다 임시 폴더에 쓴 뒤 교체하므로 여러 워커가 같은 폴더를 함께 써도 안전)
+    """
+    import main  # 워커에서 지연 로드 (main <-> batch_runner 순환 import 방지)
+    import result_cache
+    import template_registry
+
+    options = dict(job.get("options") or {})
+    cache_bytes = options.pop("result_cache_bytes", None)
+    if cache_bytes is not None:
+        options["results"] = result_cache.ResultCache(main.RESULT_CACHE_DIR, cache_bytes)
+
+    with_hwpx, with_pdf = main.OUTPUT_FORMATS[job.get("output_format", "both")]
+    result = asyncio.run(main.process_hwpx_document(
+        job["input"],
+        job.get("output"),
+        job.get("modify"),
+        job.get("template"),
+        output_dir=job["output_dir"],
+        # 레지스트리는 워커 프로세스마다 한 번만 로드됨
+        registry=template_registry.get_registry(main.TEMPLATE_DIR) if job.get("use_registry", True) else None,
+        with_hwpx=with_hwpx,
+        with_pdf=with_pdf,
+        section_workers=1,  # 문서 단위로 이미 프로세스 병렬 처리 중이므로 섹션은 순차
+        **options,
+    ))
+    if not result:
+        raise RuntimeError("문서 처리 결과가 없습니다 (로그 확인 필요)")
+    return result
+
+
+def run_batch(jobs, workers=None):
+    """
+    작업 목록을 ProcessPoolExecutor로 병렬 처리합니다.
+    실패한 작업은 기록만 하고 나머지 작업은 계속 진행합니다.
+    반환값: [{"input", "ok", "output" 또는 "error"}] (입력 순서)
+    """
+    if not jobs:
+        logger.error("처리할 HWPX 작업이 없습니다.")
+        return []
+
+    os.makedirs(jobs[0]["output_dir"], exist_ok=True)
+    logger.info(f"배치 처리 시작: {len(jobs)}건, 워커 {workers or os.cpu_count()}개")
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            job = jobs[i]
+            try:
+                output = future.result()
+                results[i] = {"input": job["input"], "ok": True, "output": output}
+                logger.info(f"[성공] {job['input']} -> {output}")
+            except Exception as e:
+                results[i] = {"input": job["input"], "ok": False, "error": str(e)}
+                logger.error(f"[실패] {job['input']}: {e}")
+
+    success_count = sum(1 for r in results if r["ok"])
+    logger.info(f"배치 처리 결과: {len(jobs)}건 중 {success_count}건 성공")
+    return results
@@ -0,0 +1,310 @@
+"""
+HWPX 파이프라인 벤치마크.
+합성 HWPX(synth_hwpx.py)를 시나리오별로 만들고 단계별 시간과 CLI 전체 시간을 측정해
+benchmarks/results/ 아래 JSON 파일로 저장합니다. 이전 결과와 비교할 수 있습니다.
+
+    python benchmarks/run_benchmarks.py                  # 기본 시나리오
+    python benchmarks/run_benchmarks.py --quick          # 작은 시나리오만 (빠른 확인)
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/이전결과.json
+    python benchmarks/run_benchmarks.py --cold-start-only   # HWPX 전용 콜드 스타트 예산만 확인 (초과 시 종료 코드 1)
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import synth_hwpx
+import xml_editor
+import xml_repacker
+import hwpx_package
+import template_index
+import text_modifier
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SCHEMA_PATH = os.path.join(ROOT_DIR, "master_template.json")
+MODIFY_PATH = os.path.join(ROOT_DIR, "modify_data2.json")
+
+# name: 합성 HWPX 파라미터 (synth_hwpx.generate_hwpx 인자)
+SCENARIOS = {
+    "sample": dict(paragraphs=30),
+    "paragraphs_2k": dict(paragraphs=2000),
+    "paragraphs_20k": dict(paragraphs=20000),
+    "sections_8": dict(paragraphs=1000, sections=8),
+    "table_2500_cells": dict(paragraphs=200, table_cells=2500),
+    "fragmented_runs": dict(paragraphs=2000, runs_per_paragraph=8),
+    "image_4mb": dict(paragraphs=200, image_bytes=4 * 1024 * 1024),
+}
+QUICK_SCENARIOS = ["sample", "paragraphs_2k", "table_2500_cells"]
+
+# HWPX만 만드는 실행의 `import main` 시간 예산 (cron/서버리스 워커의 콜드 스타트 회귀 확인용)
+IMPORT_BUDGET_MS = 250
+# HWPX만 만들 때 로드되면 안 되는 모듈 (PDF/미리보기를 만들 때만 지연 로드)
+HEAVY_MODULES = ["weasyprint", "lxml", "PIL", "pdf_repacker", "pdf_queue", "html_renderer", "font_manager"]
+
+# 새 프로세스에서 main을 import하고 HWPX 전용 처리를 1건 실행한 뒤 로드된 무거운 모듈을 보고
+_COLD_START_PROBE = """
+import sys, json, time, asyncio
+started = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - started) * 1000
+hwpx_path, output_path, modify_path, heavy = sys.argv[1], sys.argv[2], sys.argv[3], json.loads(sys.argv[4])
+ok = asyncio.run(main.process_hwpx_document(hwpx_path, output_path, modify_path, with_pdf=False,
+                                            output_dir=sys.argv[5], use_template_cache=False)) is not None
+print(json.dumps({"import_ms": import_ms, "ok": ok, "loaded": [m for m in heavy if m in sys.modules]}))
+"""
+
+
+def _measure(fn, repeat, setup=None):
+    """fn을 repeat번 실행한 시간(초) 통계. setup은 매 실행 전에 호출되며 측정에서 제외됩니다."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {"min": min(runs), "median": statistics.median(runs), "mean": statistics.fmean(runs), "runs": runs}
+
+
+def _stage(results, name, fn, repeat, setup=None):
+    try:
+        results[name] = _measure(fn, repeat, setup)
+    except Exception as e:
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+    print(f"    {name:<24} {_format(results[name])}")
+
+
+def _format(stat):
+    if "error" in stat:
+        return f"오류: {stat['error']}"
+    return f"min {stat['min'] * 1000:9.1f} ms  median {stat['median'] * 1000:9.1f} ms"
+
+
+def _modifications_for(hwpx_path):
+    """샘플 치환 데이터(modify_data2.json)를 이 문서의 실제 라벨 줄에 맞춘 치환 규칙으로 변환"""
+    with hwpx_package.HWPXPackage(hwpx_path) as package:
+        index = template_index.build_template_index(package, template_index.load_schema_mappings(SCHEMA_PATH))
+    mods = text_modifier.get_json_modifications(MODIFY_PATH, is_file=True, template_mappings=index["mappings"])
+    return [{"original": m["original"], "modified": str(m["modified"])} for m in mods
+            if "original" in m and "modified" in m]
+
+
+def run_scenario(name, params, work_dir, repeat, with_pdf=True, with_cli=True):
+    hwpx_path = os.path.join(work_dir, f"{name}.hwpx")
+    synth_hwpx.generate_hwpx(hwpx_path, **params)
+    print(f"[*] {name}: {os.path.getsize(hwpx_path) / 1024:.0f} KB {params}")
+
+    stages = {}
+    section_name = "Contents/section0.xml"
+    cache_dir = os.path.join(work_dir, f"{name}_template_cache")
+
+    # 1. 패키지 로드 (zip 열기 + 모든 섹션 파싱, 스트리밍 전환 없이 트리 모드)
+    def load_package():
+        with hwpx_package.HWPXPackage(hwpx_path, streaming_threshold=None) as package:
+            for section in package.section_names:
+                package.get_root(section)
+    _stage(stages, "package_load", load_package, repeat)
+
+    # 2. 템플릿 인덱스: 캐시 없음(문서 스캔 + 라벨 해석 + 저장) / 캐시 적중
+    def template_index_run():
+        with hwpx_package.HWPXPackage(hwpx_path) as package:
+            template_index.get_template_index(hwpx_path, package, SCHEMA_PATH, cache_dir=cache_dir)
+    _stage(stages, "template_index_cold", template_index_run, repeat,
+           setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+    _stage(stages, "template_index_warm", template_index_run, repeat)
+
+    # 3. 라벨 해석 (문서 스캔 결과에 대해 스키마 라벨 → 실제 줄)
+    schema = template_index.load_schema_mappings(SCHEMA_PATH)
+    with hwpx_package.HWPXPackage(hwpx_path) as package:
+        lines, _ = template_index.scan_text_lines(package)
+        section_data = package.read(section_name)
+    _stage(stages, "label_resolution", lambda: template_index.resolve_schema_mappings(lines, schema), repeat)
+
+    # 4. 섹션 XML 스트리밍 치환 (메모리 안에서 원본 bytes -> 새 bytes)
+    modifications = _modifications_for(hwpx_path)
+    edited = io.BytesIO()
+
+    def update_stream():
+        edited.seek(0)
+        edited.truncate()
+        xml_editor.update_xml_stream(io.BytesIO(section_data), edited, modifications)
+    _stage(stages, "update_xml_stream", update_stream, repeat)
+
+    # 5. 증분 재압축 (수정된 섹션만 새로 압축, 나머지는 원본 압축 바이트 복사)
+    repacked = os.path.join(work_dir, f"{name}_repacked.hwpx")
+
+    def repack():
+        if not xml_repacker.repackage_incremental(hwpx_path, repacked, {section_name: edited.getvalue()}):
+            raise RuntimeError("repackage_incremental 실패")
+    _stage(stages, "repackage_incremental", repack, repeat)
+
+    # 6. PDF 변환 (WeasyPrint가 없는 환경에서는 오류로 기록)
+    if with_pdf:
+        def convert():
+            import pdf_repacker
+            if not pdf_repacker.convert_to_pdf(repacked, os.path.join(work_dir, f"{name}_pdf")):
+                raise RuntimeError("convert_to_pdf 실패")
+        _stage(stages, "convert_to_pdf", convert, repeat)
+
+    # 7. CLI 전체 (프로세스 시작/임포트 포함)
+    if with_cli:
+        def cli():
+            subprocess.run(
+                [sys.executable, os.path.join(ROOT_DIR, "main.py"), "--input", hwpx_path,
+                 "--modify", MODIFY_PATH, "--output", os.path.join(work_dir, f"{name}_cli.hwpx"),
+                 "--no-template-cache"],
+                cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        _stage(stages, "cli_end_to_end", cli, repeat)
+
+        def cli_hwpx_only():
+            subprocess.run(
+                [sys.executable, os.path.join(ROOT_DIR, "main.py"), "--input", hwpx_path,
+                 "--modify", MODIFY_PATH, "--output", os.path.join(work_dir, f"{name}_cli_hwpx.hwpx"),
+                 "--no-template-cache", "--format", "hwpx"],
+                cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        _stage(stages, "cli_hwpx_only", cli_hwpx_only, repeat)
+
+    return {
+        "name": name,
+        "params": params,
+        "input_bytes": os.path.getsize(hwpx_path),
+        "paragraph_lines": len(lines),
+        "modifications": len(modifications),
+        "stages": stages,
+    }
+
+
+def measure_cold_start(work_dir, repeat):
+    """
+    HWPX 전용 실행의 콜드 스타트: 매번 새 프로세스에서 `import main` 시간을 재고,
+    문서 1건을 처리한 뒤에도 WeasyPrint/lxml 등 PDF 쪽 모듈이 로드되지 않았는지 확인합니다.
+    """
+    hwpx_path = os.path.join(work_dir, "cold_start.hwpx")
+    synth_hwpx.generate_hwpx(hwpx_path, **SCENARIOS["sample"])
+    import_runs, loaded, ok = [], set(), True
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _COLD_START_PROBE, hwpx_path, os.path.join(work_dir, "cold_start_out.hwpx"),
+             MODIFY_PATH, json.dumps(HEAVY_MODULES), work_dir],
+            cwd=ROOT_DIR, check=True, capture_output=True, text=True,
+        )
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        import_runs.append(probe["import_ms"])
+        loaded.update(probe["loaded"])
+        ok = ok and probe["ok"]
+    return {"import_ms_min": min(import_runs), "import_ms_median": statistics.median(import_runs),
+            "runs": import_runs, "heavy_modules_loaded": sorted(loaded), "ok": ok}
+
+
+def check_cold_start(cold_start, budget_ms):
+    """예산 초과, 무거운 모듈 로드, 처리 실패 중 하나라도 있으면 False"""
+    print(f"[*] 콜드 스타트 (HWPX 전용): import main median {cold_start['import_ms_median']:.1f} ms "
+          f"(예산 {budget_ms:.0f} ms)")
+    passed = cold_start["ok"]
+    if not cold_start["ok"]:
+        print("[!] HWPX 전용 처리 실패")
+    if cold_start["import_ms_median"] > budget_ms:
+        print(f"[!] import 시간이 예산을 초과했습니다: {cold_start['import_ms_median']:.1f} ms > {budget_ms:.0f} ms")
+        passed = False
+    if cold_start["heavy_modules_loaded"]:
+        print(f"[!] HWPX 전용 실행에서 로드된 모듈: {', '.join(cold_start['heavy_modules_loaded'])}")
+        passed = False
+    return passed
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(base, current):
+    """이전 결과 대비 단계별 median 비율 출력 (1.00보다 작으면 빨라짐)"""
+    base_scenarios = {s["name"]: s for s in base["scenarios"]}
+    print(f"[*] 비교: {base['meta'].get('git_revision')} -> {current['meta'].get('git_revision')}")
+    for scenario in current["scenarios"]:
+        old = base_scenarios.get(scenario["name"])
+        if not old:
+            continue
+        print(f"  {scenario['name']}")
+        for stage, stat in scenario["stages"].items():
+            old_stat = old["stages"].get(stage)
+            if not old_stat or "median" not in stat or "median" not in old_stat:
+                continue
+            ratio = stat["median"] / old_stat["median"] if old_stat["median"] else float("inf")
+            print(f"    {stage:<24} {old_stat['median'] * 1000:9.1f} ms -> {stat['median'] * 1000:9.1f} ms  (x{ratio:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HWPX 파이프라인 벤치마크")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="실행할 시나리오 (여러 번 지정 가능, 기본: 전체)")
+    parser.add_argument("--quick", action="store_true", help="작은 시나리오만 실행")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 횟수")
+    parser.add_argument("--no-pdf", action="store_true", help="PDF 변환 단계 생략")
+    parser.add_argument("--no-cli", action="store_true", help="CLI 전체 측정 생략")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/bench-<시각>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help="HWPX 전용 실행의 import main 시간 예산(ms), 초과 시 종료 코드 1")
+    parser.add_argument("--cold-start-only", action="store_true", help="콜드 스타트 예산 확인만 실행")
+    args = parser.parse_args()
+
+    names = args.scenario or (QUICK_SCENARIOS if args.quick else list(SCENARIOS))
+    result = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "scenarios": [],
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="hwpx_bench_")
+    try:
+        result["cold_start"] = measure_cold_start(work_dir, max(args.repeat, 3))
+        cold_start_ok = check_cold_start(result["cold_start"], args.import_budget_ms)
+        if args.cold_start_only:
+            sys.exit(0 if cold_start_ok else 1)
+        for name in names:
+            result["scenarios"].append(run_scenario(name, SCENARIOS[name], work_dir, args.repeat,
+                                                    with_pdf=not args.no_pdf, with_cli=not args.no_cli))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="UTF-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"[*] 결과 저장: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="UTF-8") as f:
+            compare(json.load(f), result)
+    if not cold_start_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+벤치마크용 합성 HWPX 생성기.
+debug_text/(해촉증명서 샘플을 풀어 둔 구조)를 바탕으로 문단 수, 섹션 수, 표 셀 수,
+run 분할 정도, BinData 이미지 크기를 늘린 HWPX 패키지를 만듭니다.
+
+    python benchmarks/synth_hwpx.py out.hwpx --paragraphs 5000 --sections 3 --table-cells 400
+"""
+import os
+import sys
+import copy
+import math
+import zlib
+import random
+import shutil
+import struct
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import xml_editor  # HWPX 네임스페이스 접두어 등록
+import xml_repacker
+
+TEMPLATE_DIR = os.path.join(ROOT_DIR, "debug_text")
+
+HP = "{http://www.hancom.co.kr/hwpml/2011/paragraph}"
+HC = "{http://www.hancom.co.kr/hwpml/2011/core}"
+IMAGE_ID = "image1"
+
+
+def _split_text(text, parts):
+    """텍스트를 최대 parts개의 조각으로 나눔 (run 분할용)"""
+    if parts <= 1 or len(text) <= 1:
+        return [text]
+    size = math.ceil(len(text) / min(parts, len(text)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _fragment_runs(p, runs_per_paragraph):
+    """hp:t 하나짜리 run을 같은 charPr의 run 여러 개로 쪼갬 (편집기가 만드는 조각난 run 재현)"""
+    if runs_per_paragraph <= 1:
+        return
+    for run in list(p.findall(f"{HP}run")):
+        texts = run.findall(f"{HP}t")
+        if len(texts) != 1 or not texts[0].text or len(run) != 1:
+            continue
+        pieces = _split_text(texts[0].text, runs_per_paragraph)
+        index = list(p).index(run)
+        p.remove(run)
+        for offset, piece in enumerate(pieces):
+            new_run = ET.Element(f"{HP}run", run.attrib)
+            ET.SubElement(new_run, f"{HP}t").text = piece
+            p.insert(index + offset, new_run)
+
+
+def _fill_text(p, label):
+    """복제한 문단의 텍스트를 본문용 채움 텍스트로 바꿈 (라벨이 한 번만 나오도록)"""
+    for t in p.iter(f"{HP}t"):
+        if t.text and t.text.strip():
+            t.text = f"{label} 합성 본문 텍스트입니다. 성능 측정을 위한 채움 문장."
+
+
+def _table_paragraph(cells):
+    """cells개 이상의 셀을 가진 표(hp:tbl)를 담은 문단"""
+    cols = max(1, math.ceil(math.sqrt(cells)))
+    rows = max(1, math.ceil(cells / cols))
+    p = ET.Element(f"{HP}p", {"id": "0", "paraPrIDRef": "0", "styleIDRef": "0",
+                              "pageBreak": "0", "columnBreak": "0", "merged": "0"})
+    run = ET.SubElement(p, f"{HP}run", {"charPrIDRef": "0"})
+    tbl = ET.SubElement(run, f"{HP}tbl", {"rowCnt": str(rows), "colCnt": str(cols)})
+    for r in range(rows):
+        tr = ET.SubElement(tbl, f"{HP}tr")
+        for c in range(cols):
+            tc = ET.SubElement(tr, f"{HP}tc")
+            sub_list = ET.SubElement(tc, f"{HP}subList")
+            cell_p = ET.SubElement(sub_list, f"{HP}p", {"id": "0", "paraPrIDRef": "0", "styleIDRef": "0"})
+            cell_run = ET.SubElement(cell_p, f"{HP}run", {"charPrIDRef": "0"})
+            ET.SubElement(cell_run, f"{HP}t").text = f"셀 {r + 1}-{c + 1}"
+    return p
+
+
+def _image_paragraph():
+    p = ET.Element(f"{HP}p", {"id": "0", "paraPrIDRef": "0", "styleIDRef": "0",
+                              "pageBreak": "0", "columnBreak": "0", "merged": "0"})
+    run = ET.SubElement(p, f"{HP}run", {"charPrIDRef": "0"})
+    pic = ET.SubElement(run, f"{HP}pic")
+    ET.SubElement(pic, f"{HP}curSz", {"width": "20000", "height": "20000"})
+    ET.SubElement(pic, f"{HC}img", {"binaryItemIDRef": IMAGE_ID})
+    return p
+
+
+def make_png(target_bytes, rng):
+    """대략 target_bytes 크기의 (압축이 잘 안 되는) RGB PNG"""
+    side = max(1, int(math.sqrt(target_bytes / 3)))
+    raw = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 1))
+            + chunk(b"IEND", b""))
+
+
+def build_section(template_root, paragraphs, runs_per_paragraph, table_cells, with_image, keep_labels):
+    """
+    템플릿 섹션에서 문단 수를 paragraphs개로 늘린 섹션 root를 만듭니다.
+    첫 문단(secPr)은 그대로 두고, 나머지 문단을 반복 복제합니다.
+    keep_labels=True이면 첫 번째 반복은 원본 텍스트(라벨)를 유지합니다.
+    """
+    root = copy.deepcopy(template_root)
+    body = [child for child in root if child.tag == f"{HP}p"][1:]
+    for child in body:
+        root.remove(child)
+
+    extra = []
+    if table_cells:
+        extra.append(_table_paragraph(table_cells))
+    if with_image:
+        extra.append(_image_paragraph())
+
+    count = 1 + len(extra)
+    round_no = 0
+    while count < paragraphs and body:
+        for template_p in body:
+            if count >= paragraphs:
+                break
+            p = copy.deepcopy(template_p)
+            if round_no > 0 or not keep_labels:
+                _fill_text(p, f"[{round_no}-{count}]")
+            _fragment_runs(p, runs_per_paragraph)
+            root.append(p)
+            count += 1
+        round_no += 1
+
+    for p in extra:
+        root.append(p)
+    return root
+
+
+def _update_content_hpf(path, sections, with_image):
+    with open(path, "r", encoding="UTF-8") as f:
+        hpf = f.read()
+    items, refs = [], []
+    for i in range(1, sections):
+        items.append(f'<opf:item id="section{i}" href="Contents/section{i}.xml" media-type="application/xml"/>')
+        refs.append(f'<opf:itemref idref="section{i}" linear="yes"/>')
+    if with_image:
+        items.append(f'<opf:item id="{IMAGE_ID}" href="BinData/{IMAGE_ID}.png" media-type="image/png" isEmbeded="1"/>')
+    hpf = hpf.replace("</opf:manifest>", "".join(items) + "</opf:manifest>")
+    hpf = hpf.replace("</opf:spine>", "".join(refs) + "</opf:spine>")
+    with open(path, "w", encoding="UTF-8") as f:
+        f.write(hpf)
+
+
+def generate_hwpx(output_path, paragraphs=30, sections=1, table_cells=0, runs_per_paragraph=1,
+                  image_bytes=0, template_dir=TEMPLATE_DIR, seed=0):
+    """
+    합성 HWPX를 output_path에 만들고 경로를 반환합니다.
+    paragraphs: 섹션당 최상위 문단 수 / sections: 섹션 수 / table_cells: 섹션마다 넣을 표의 셀 수
+    runs_per_paragraph: 문단 텍스트를 나눌 run 수 / image_bytes: BinData PNG 크기 (0이면 이미지 없음)
+    라벨 문장(신청인 등)은 첫 섹션에만 한 번 나오므로 라벨 해석/치환 결과가 샘플과 같습니다.
+    """
+    rng = random.Random(seed)
+    work_dir = tempfile.mkdtemp(prefix="synth_hwpx_")
+    try:
+        package_dir = os.path.join(work_dir, "package")
+        shutil.copytree(template_dir, package_dir)
+
+        section_path = os.path.join(package_dir, "Contents", "section0.xml")
+        template_root = ET.parse(section_path).getroot()
+        for i in range(sections):
+            root = build_section(template_root, paragraphs, runs_per_paragraph, table_cells,
+                                 with_image=image_bytes > 0, keep_labels=(i == 0))
+            with open(os.path.join(package_dir, "Contents", f"section{i}.xml"), "wb") as f:
+                f.write(xml_editor.serialize_xml(root))
+
+        if image_bytes:
+            os.makedirs(os.path.join(package_dir, "BinData"), exist_ok=True)
+            with open(os.path.join(package_dir, "BinData", f"{IMAGE_ID}.png"), "wb") as f:
+                f.write(make_png(image_bytes, rng))
+
+        _update_content_hpf(os.path.join(package_dir, "Contents", "content.hpf"), sections, image_bytes > 0)
+
+        if not xml_repacker.repackage_hwpx(package_dir, output_path):
+            raise RuntimeError(f"합성 HWPX 생성 실패: {output_path}")
+        return output_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 HWPX 생성")
+    parser.add_argument("output", help="출력 HWPX 경로")
+    parser.add_argument("--paragraphs", type=int, default=30, help="섹션당 문단 수")
+    parser.add_argument("--sections", type=int, default=1, help="섹션 수")
+    parser.add_argument("--table-cells", type=int, default=0, help="섹션마다 넣을 표의 셀 수")
+    parser.add_argument("--runs-per-paragraph", type=int, default=1, help="문단 텍스트를 나눌 run 수")
+    parser.add_argument("--image-kb", type=int, default=0, help="BinData 이미지 크기(KB)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_hwpx(args.output, args.paragraphs, args.sections, args.table_cells,
+                  args.runs_per_paragraph, args.image_kb * 1024, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
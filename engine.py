@@ -0,0 +1,178 @@
+import os
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import main
+import hwpx_package
+import xml_repacker
+
+logger = logging.getLogger(__name__)
+
+# 동시에 처리할 문서 수 기본값 (초과 작업은 자리가 날 때까지 대기)
+DEFAULT_CONCURRENCY = 4
+# process_bytes가 만들 수 있는 결과 종류
+OUTPUT_NAMES = ("hwpx", "pdf", "html")
+# run_in_each_thread에서 모든 스레드가 작업을 하나씩 맡을 때까지 기다리는 최대 시간(초)
+WARM_UP_TIMEOUT = 60
+
+
+class HWPXEngine:
+    """
+    asyncio 서비스에 파이프라인을 내장하기 위한 비동기 API.
+    스키마/캐시 경로 등 설정은 생성 시 명시적으로 받고, 작업 상태는 호출마다 따로 두므로
+    한 프로세스에서 수백 건을 동시에 await해도 서로 섞이지 않습니다.
+
+    파싱/치환/압축/렌더링은 executor에서 실행되며, 동시에 실행되는 문서 수는 max_concurrency로 제한됩니다.
+    executor를 넘기지 않으면 max_concurrency개 스레드의 풀을 만들어 close()에서 정리합니다.
+    문서 모델(HWPXPackage)을 단계 사이에 넘기므로 executor는 스레드 기반이어야 합니다.
+    (프로세스 단위 격리가 필요하면 batch_runner, PDF만 따로 돌리려면 pdf_queue.PDFJobQueue 사용)
+
+        async with engine.HWPXEngine(max_concurrency=8) as hwpx:
+            result = await hwpx.process_bytes(hwpx_bytes, {"신청인": "홍길동"})
+            result["hwpx"], result["pdf"]  # bytes
+
+            # 편집 중 미리보기: PDF 없이 HTML만 (WeasyPrint를 거치지 않음)
+            preview = await hwpx.process_bytes(hwpx_bytes, data, outputs=("html",))
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_CONCURRENCY, executor=None, schema_path=main.MASTER_TEMPLATE_PATH,
+                 template_cache_dir=main.TEMPLATE_CACHE_DIR, use_template_cache=True, results=None,
+                 pdf_jobs=None, compresslevel=xml_repacker.DEFAULT_COMPRESS_LEVEL,
+                 streaming_threshold=hwpx_package.STREAMING_THRESHOLD, xml_backend=None, registry=None,
+                 html_static_base=None, section_workers=1):
+        self.max_concurrency = max_concurrency
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="hwpx")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.options = dict(
+            schema_path=os.path.abspath(schema_path),
+            template_cache_dir=os.path.abspath(template_cache_dir),
+            use_template_cache=use_template_cache,
+            results=results,
+            pdf_jobs=pdf_jobs,
+            compresslevel=compresslevel,
+            streaming_threshold=streaming_threshold,
+            xml_backend=xml_backend,
+            registry=registry,  # template_registry.TemplateRegistry (양식 자동 판별)
+            html_static_base=html_static_base,  # HTML 미리보기의 폰트 참조 경로 (None: /static/)
+            # 요청 단위로 이미 병렬 처리하므로 문서 안의 섹션은 순차 (요청마다 스레드 풀을 더 만들지 않음)
+            section_workers=section_workers,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run_in_each_thread(self, fn):
+        """
+        executor의 스레드(max_concurrency개)마다 fn()을 한 번씩 실행하고 결과 목록을 반환합니다.
+        컴파일된 XSLT/FontConfiguration처럼 스레드별로 캐시되는 자원을 첫 요청 전에 예열할 때 사용합니다.
+        작업마다 다른 작업이 모두 시작될 때까지 스레드를 붙잡아 두므로 한 스레드가 여러 번 실행하지 않습니다.
+        """
+        barrier = threading.Barrier(self.max_concurrency)
+
+        def run_once():
+            try:
+                return fn()
+            finally:
+                try:
+                    barrier.wait(WARM_UP_TIMEOUT)
+                except threading.BrokenBarrierError:
+                    pass  # 넘겨받은 executor의 스레드가 더 적으면 가능한 스레드만 예열
+
+        futures = [self.executor.submit(run_once) for _ in range(self.max_concurrency)]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """직접 만든 executor만 종료합니다. (넘겨받은 executor는 호출한 쪽에서 관리)"""
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def process_file(self, input_hwpx, output_hwpx, data=None, with_pdf=True, with_html=False,
+                           html_inline_images=False, with_hwpx=True):
+        """
+        문서 1건 처리 (경로 입출력).
+        data: {필드: 값} 등 dict/list, 또는 JSON 문자열/JSON 파일 경로 (외부 입력은 경로로 해석되지 않는 process_bytes 사용)
+        PDF/HTML 미리보기는 output_hwpx와 같은 폴더에 같은 이름(.pdf/.html)으로 저장됩니다.
+        with_hwpx=False이면 HWPX는 디스크에 쓰지 않습니다. (PDF는 메모리의 문서 모델에서 바로 렌더링)
+        반환값: {"hwpx": 경로 또는 None, "pdf": 경로 또는 None, "html": 경로 또는 None}, 실패 시 None
+        """
+        output_hwpx = os.path.abspath(output_hwpx)
+        output_dir = os.path.dirname(output_hwpx)
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                result = await main.process_hwpx_document(
+                    os.path.abspath(input_hwpx), output_hwpx, data,
+                    output_dir=output_dir, executor=self.executor, with_pdf=with_pdf, with_html=with_html,
+                    html_inline_images=html_inline_images, with_hwpx=with_hwpx, **self.options
+                )
+            finally:
+                self.in_flight -= 1
+        if not result:
+            return None
+
+        html_path = os.path.splitext(output_hwpx)[0] + ".html"
+        html_path = html_path if with_html and os.path.exists(html_path) else None
+        if isinstance(result, tuple):
+            # pdf_jobs 사용 시: PDF는 큐에서 렌더링되므로 여기서 완료를 기다림
+            output_hwpx, pdf_job = result
+            return {"hwpx": output_hwpx, "pdf": await pdf_job, "html": html_path}
+
+        pdf_path = os.path.splitext(output_hwpx)[0] + ".pdf"
+        return {"hwpx": output_hwpx if with_hwpx else None,
+                "pdf": pdf_path if with_pdf and os.path.exists(pdf_path) else None, "html": html_path}
+
+    async def process_bytes(self, hwpx_bytes, data=None, outputs=("hwpx", "pdf"), filename="document.hwpx"):
+        """
+        문서 1건 처리 (bytes 입출력). 작업마다 전용 임시 폴더를 쓰고 끝나면 삭제합니다.
+        outputs: 돌려받을 결과 ("hwpx", "pdf", "html"), 목록에 없는 결과는 만들지 않습니다.
+                 HTML 미리보기는 이미지를 data: URI로 포함하므로 bytes 하나로 완결됩니다. (폰트는 html_static_base 참조)
+        data: 치환 데이터 dict/list 또는 None (외부 입력을 받는 API이므로 파일 경로/JSON 문자열은 받지 않음)
+        반환값: {"hwpx": bytes 또는 None, "pdf": bytes 또는 None, "html": bytes 또는 None}, 실패 시 None
+        """
+        if data is not None and not isinstance(data, (dict, list)):
+            raise TypeError(f"data는 dict, list 또는 None이어야 합니다: {type(data).__name__}")
+        loop = asyncio.get_running_loop()
+        work_dir = tempfile.mkdtemp(prefix="hwpx_job_")
+        try:
+            file_name = os.path.basename(filename) or "document.hwpx"
+            input_path = os.path.join(work_dir, file_name)
+            await loop.run_in_executor(self.executor, _write_file, input_path, hwpx_bytes)
+
+            result = await self.process_file(input_path, os.path.join(work_dir, "output", file_name), data,
+                                             with_pdf="pdf" in outputs, with_html="html" in outputs,
+                                             html_inline_images=True, with_hwpx="hwpx" in outputs)
+            if result is None:
+                return None
+            return {
+                "hwpx": await loop.run_in_executor(self.executor, _read_file, result["hwpx"])
+                if result["hwpx"] else None,
+                "pdf": await loop.run_in_executor(self.executor, _read_file, result["pdf"])
+                if result["pdf"] else None,
+                "html": await loop.run_in_executor(self.executor, _read_file, result["html"])
+                if result["html"] else None,
+            }
+        finally:
+            await loop.run_in_executor(self.executor, _remove_tree, work_dir)
+
+
+def _write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _remove_tree(path):
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,199 @@
+import os
+import hashlib
+import logging
+import threading
+import contextlib
+from collections import OrderedDict
+from urllib.request import pathname2url
+
+from weasyprint import CSS
+from weasyprint.text.fonts import FontConfiguration
+
+logger = logging.getLogger(__name__)
+
+# CSS font-family -> fonts/ 안의 파일 (hwpx_to_html.xslt의 body font-family와 맞춤)
+# 목록에 없는 폰트 파일은 파일명(확장자 제외)을 family로 등록합니다.
+FONT_FAMILIES = {"Gulim": "GulimChe.ttf"}
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc", ".woff", ".woff2")
+
+# 서브셋 캐시 최대 항목 수 (항목 하나 = 글리프 집합 하나에 대한 서브셋 폰트 bytes)
+SUBSET_CACHE_SIZE = 256
+
+# FontConfiguration/CSS는 스레드 간 공유가 보장되지 않으므로 스레드별로 보관 (get_transform과 같은 방식)
+_local = threading.local()
+
+
+def font_files(fonts_dir):
+    """[(family, 폰트 파일 절대 경로)] (FONT_FAMILIES에 있는 파일은 그 family로, 나머지는 파일명 기준)"""
+    if not fonts_dir or not os.path.isdir(fonts_dir):
+        return []
+    fonts_dir = os.path.abspath(fonts_dir)
+    names = sorted(n for n in os.listdir(fonts_dir) if n.lower().endswith(FONT_EXTENSIONS))
+
+    files = [(family, os.path.join(fonts_dir, name)) for family, name in FONT_FAMILIES.items() if name in names]
+    mapped = set(FONT_FAMILIES.values())
+    files += [(os.path.splitext(name)[0], os.path.join(fonts_dir, name)) for name in names if name not in mapped]
+    return files
+
+
+def font_face_css(fonts_dir):
+    """fonts_dir의 폰트 파일마다 @font-face 규칙"""
+    rules = []
+    for family, path in font_files(fonts_dir):
+        rules.append(f"@font-face {{ font-family: '{family}'; src: url('file:{pathname2url(path)}'); }}")
+    return "\n".join(rules)
+
+
+def get_font_config():
+    """
+    스레드별로 하나씩 유지하는 WeasyPrint FontConfiguration.
+    시스템 폰트 목록 로드와 @font-face 폰트 등록을 렌더링마다 반복하지 않도록 재사용합니다.
+    """
+    font_config = getattr(_local, "font_config", None)
+    if font_config is None:
+        font_config = _local.font_config = FontConfiguration()
+    return font_config
+
+
+def get_font_stylesheet(fonts_dir):
+    """
+    fonts_dir의 폰트를 공용 FontConfiguration에 한 번만 등록한 CSS 객체.
+    (CSS 생성 시점에 폰트를 읽어 등록하므로, 이후 렌더링에서는 폰트를 다시 읽거나 파싱하지 않음)
+    폰트 파일이 바뀌면(크기/mtime) 다시 등록하고, 폰트가 없으면 None을 반환합니다.
+    """
+    files = font_files(fonts_dir)
+    if not files:
+        return None
+
+    signature = tuple((family, path, os.path.getsize(path), os.path.getmtime(path)) for family, path in files)
+    cache = getattr(_local, "stylesheets", None)
+    if cache is None:
+        cache = _local.stylesheets = {}
+
+    key = os.path.abspath(fonts_dir)
+    cached = cache.get(key)
+    if cached is None or cached[0] != signature:
+        logger.info(f"폰트 등록: {', '.join(family for family, _ in files)}")
+        cached = (signature, CSS(string=font_face_css(fonts_dir), font_config=get_font_config()))
+        cache[key] = cached
+    return cached[1]
+
+
+class SubsetCache:
+    """
+    서브셋 폰트 LRU 캐시 (프로세스 공용).
+    키는 폰트 파일 내용(sha256)/인덱스 + 힌팅 여부 + 사용된 글리프 집합이므로,
+    같은 양식의 문서처럼 글리프 집합이 같으면 서브셋 작업을 건너뜁니다.
+    """
+
+    def __init__(self, max_entries=SUBSET_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_digest(font):
+        """
+        서브셋 전 폰트 파일 내용의 sha256 (Font 객체마다 한 번만 계산)
+        font.hash는 폰트 설명(family/굵기 등)의 해시라서 설명이 같은 다른 폰트 파일을 구분하지 못함
+        """
+        digest = getattr(font, "_hwpx_content_digest", None)
+        if digest is None:
+            digest = hashlib.sha256(font.file_content).hexdigest()
+            font._hwpx_content_digest = digest
+        return digest
+
+    @classmethod
+    def make_key(cls, font, glyph_ids, hinting):
+        hasher = hashlib.sha256()
+        hasher.update(f"{cls.content_digest(font)}\0{font.index}\0{bool(hinting)}\0"
+                      f"{bool(font.missing)}\0".encode())
+        hasher.update(",".join(map(str, sorted(glyph_ids))).encode())
+        return hasher.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": sum(len(data) for data in self._entries.values())}
+
+
+subset_cache = SubsetCache()
+# Font.subset 교체 상태: 렌더링 중인 스레드 수와 원래 메서드 (마지막 렌더링이 끝나면 되돌림)
+_patch_lock = threading.Lock()
+_patch_users = 0
+_original_subset = None
+
+
+def _cached_subset(original_subset):
+    def cached_subset(font, to_unicode, hinting):
+        if not to_unicode:
+            return original_subset(font, to_unicode, hinting)
+        key = SubsetCache.make_key(font, to_unicode, hinting)
+        data = subset_cache.get(key)
+        if data is not None:
+            font.file_content = data
+            return
+        original_subset(font, to_unicode, hinting)
+        subset_cache.put(key, font.file_content)
+    return cached_subset
+
+
+def _install_subset_cache():
+    global _patch_users, _original_subset
+    with _patch_lock:
+        if _patch_users == 0:
+            try:
+                from weasyprint.pdf.fonts import Font
+                original_subset = Font.subset
+            except (ImportError, AttributeError) as e:
+                logger.info(f"폰트 서브셋 캐시를 사용할 수 없습니다: {e}")
+                return False
+            _original_subset = original_subset
+            Font.subset = _cached_subset(original_subset)
+        _patch_users += 1
+        return True
+
+
+def _uninstall_subset_cache():
+    global _patch_users, _original_subset
+    with _patch_lock:
+        _patch_users -= 1
+        if _patch_users == 0:
+            from weasyprint.pdf.fonts import Font
+            Font.subset = _original_subset
+            _original_subset = None
+
+
+@contextlib.contextmanager
+def subset_cache_installed():
+    """
+    이 블록 안에서만 WeasyPrint의 폰트 서브셋 단계(Font.subset)에 subset_cache를 연결합니다. (render_pdf에서 사용)
+    Font.subset은 클래스 속성이므로 여러 스레드가 동시에 렌더링하면 마지막 렌더링이 끝날 때 원래대로 되돌립니다.
+    서브셋은 retain_gids로 만들어지므로 같은 키의 결과를 그대로 재사용해도 PDF 내용은 같습니다.
+    WeasyPrint 내부 구조가 다르면 캐시 없이 그대로 동작합니다.
+    """
+    installed = _install_subset_cache()
+    try:
+        yield
+    finally:
+        if installed:
+            _uninstall_subset_cache()
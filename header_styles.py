@@ -0,0 +1,185 @@
+import re
+import math
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+HH_NS = "http://www.hancom.co.kr/hwpml/2011/head"
+HP_NS = "http://www.hancom.co.kr/hwpml/2011/paragraph"
+
+# 최근 사용한 header CSS 캐시 크기 (같은 양식의 header는 내용이 같으므로 재사용)
+CSS_CACHE_SIZE = 64
+_css_cache = OrderedDict()
+_css_cache_lock = threading.Lock()  # 여러 요청 스레드가 동시에 렌더링해도 LRU 순서/크기가 깨지지 않도록
+
+
+# XPath number()(libxml2)가 숫자로 인정하는 문자열 (지수 표기 포함, inf/nan 등은 NaN)
+_XPATH_NUMBER_RE = re.compile(r"^\s*(-?(?:\d+(?:\.\d*)?|\.\d+))(?:[eE]([+-]?\d+)?)?\s*$")
+
+
+def _number(text):
+    """XSLT 엔진의 number(text)와 같이 변환 (숫자가 아니면 NaN)"""
+    m = _XPATH_NUMBER_RE.match(text) if text is not None else None
+    if m is None:
+        return float("nan")
+    return float(f"{m.group(1)}e{m.group(2) or 0}")
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else None
+
+
+def _first_effective(para_pr, tag):
+    """
+    XSLT의 ($paraPr//hp:default//TAG | $paraPr//TAG[not(ancestor::hp:switch)])[1]과 동일:
+    hp:switch 밖에 있거나 hp:default 안에 있는 첫 번째 TAG (문서 순서)
+    """
+    switch_tag = f"{{{HP_NS}}}switch"
+    default_tag = f"{{{HP_NS}}}default"
+
+    def walk(elem, in_switch, in_default):
+        for child in elem:
+            if child.tag == tag and (in_default or not in_switch):
+                return child
+            found = walk(child, in_switch or child.tag == switch_tag, in_default or child.tag == default_tag)
+            if found is not None:
+                return found
+        return None
+
+    return walk(para_pr, False, False)
+
+
+def _margin_value(margin, name):
+    if margin is None:
+        return 0.0
+    for child in margin:
+        if _local_name(child.tag) == name and child.get("value") is not None:
+            # XSLT는 xsl:value-of로 문자열 변수에 담았다가 나누므로 한 번 문자열로 바꿨다가 다시 읽음
+            return _number(_fmt(_number(child.get("value"))))
+    return 0.0
+
+
+# libxml2 xmlXPathFormatNumber의 기준값 (DBL_DIG = 15)
+_XPATH_DIGITS = 15
+_XPATH_INT_MIN, _XPATH_INT_MAX = -2 ** 31, 2 ** 31 - 1
+_XPATH_UPPER, _XPATH_LOWER = 1e9, 1e-5
+
+
+def _fmt(value):
+    """
+    XSLT(libxml2)의 숫자 -> 문자열 변환(string())과 같은 문자열.
+    정수는 소수점 없이, 1e9 초과/1e-5 미만은 유효숫자 15자리 지수 표기,
+    그 외에는 소수점 아래 (15 - 정수부 자릿수)자리까지 출력한 뒤 끝의 0을 지웁니다.
+    (예: 301/33 -> 9.121212121212121, 1000/33 -> 30.3030303030303)
+    """
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if _XPATH_INT_MIN < value < _XPATH_INT_MAX and value == int(value):
+        return str(int(value))
+
+    absolute = abs(value)
+    if absolute > _XPATH_UPPER or absolute < _XPATH_LOWER:
+        mantissa, exponent = f"{value:.{_XPATH_DIGITS - 1}e}".split("e")
+        return f"{mantissa.rstrip('0').rstrip('.')}e{exponent}"
+    integer_place = int(math.log10(absolute))
+    fraction_place = _XPATH_DIGITS - integer_place - (1 if integer_place > 0 else 0)
+    return f"{value:.{fraction_place}f}".rstrip("0").rstrip(".")
+
+
+def paragraph_style(para_pr, para_id):
+    """hh:paraPr 하나를 CSS 선언으로 변환 (hwpx_to_html.xslt의 기존 인라인 스타일과 동일한 규칙)"""
+    align_node = margin_node = None
+    if para_pr is not None:
+        align_node = _first_effective(para_pr, f"{{{HH_NS}}}align")
+        margin_node = _first_effective(para_pr, f"{{{HH_NS}}}margin")
+
+    horizontal = align_node.get("horizontal") if align_node is not None else None
+    if para_id == "15":
+        align = "right"
+    else:
+        align = {"CENTER": "center", "RIGHT": "right", "JUSTIFY": "justify"}.get(horizontal, "left")
+
+    # [강도 보정 공식] HWPUNIT / 33
+    left = _margin_value(margin_node, "left") / 33
+    intent = _margin_value(margin_node, "intent") / 33
+    final_left = left + intent
+    final_indent = -1 * intent
+
+    return (f"text-align: {align}; margin-left: {_fmt(final_left)}pt; "
+            f"text-indent: {_fmt(final_indent)}pt; line-height: 1.6; word-break: break-all;")
+
+
+def char_style(char_pr):
+    """hh:charPr 하나를 CSS 선언으로 변환"""
+    parts = []
+    if char_pr.find(f"{{{HH_NS}}}bold") is not None or char_pr.get("bold") is not None:
+        parts.append("font-weight: bold;")
+    # XSLT의 hh:underline/@type != 'NONE'과 동일: type 속성이 있고 NONE이 아닌 underline이 하나라도 있어야 밑줄
+    # (type이 없는 underline은 비교 대상 노드가 없으므로 거짓)
+    if any(u.get("type", "NONE") != "NONE" for u in char_pr.findall(f"{{{HH_NS}}}underline")):
+        parts.append("text-decoration: underline;")
+    if char_pr.get("height") is not None:
+        parts.append(f"font-size: {_fmt(_number(char_pr.get('height')) / 100)}pt;")
+    return " ".join(parts)
+
+
+def build_header_css(header_root):
+    """
+    header.xml을 한 번 훑어 paraPr/charPr id별 CSS 클래스(.pp-ID / .cp-ID)를 만듭니다.
+    XSLT에서는 클래스만 붙이면 되므로 노드마다 header 전체를 검색하지 않습니다.
+    """
+    rules = []
+    seen_para = set()
+    for para_pr in header_root.iter(f"{{{HH_NS}}}paraPr"):
+        para_id = para_pr.get("id")
+        if para_id is None or para_id in seen_para:
+            continue  # XSLT의 [@id=$pId]와 같이 첫 번째 정의 사용
+        seen_para.add(para_id)
+        rules.append(f".pp-{para_id} {{ {paragraph_style(para_pr, para_id)} }}")
+
+    # header에 정의가 없는 id의 기본값 (XSLT의 otherwise 분기와 동일)
+    rules.append(f"p {{ {paragraph_style(None, None)} }}")
+    if "15" not in seen_para:
+        rules.append(f".pp-15 {{ {paragraph_style(None, '15')} }}")
+
+    seen_char = set()
+    for char_pr in header_root.iter(f"{{{HH_NS}}}charPr"):
+        char_id = char_pr.get("id")
+        if char_id is None or char_id in seen_char:
+            continue
+        seen_char.add(char_id)
+        style = char_style(char_pr)
+        if style:
+            rules.append(f".cp-{char_id} {{ {style} }}")
+
+    return "\n".join(rules)
+
+
+def get_header_css(header_bytes, header_root=None, parse=None):
+    """
+    header 내용(bytes) 기준으로 CSS를 캐시합니다.
+    header_root가 없으면 parse(header_bytes)로 파싱합니다.
+    """
+    key = hashlib.sha1(header_bytes).hexdigest()
+    with _css_cache_lock:
+        css = _css_cache.get(key)
+        if css is not None:
+            _css_cache.move_to_end(key)
+            return css
+
+    # CSS 생성은 잠금 밖에서 (같은 header를 동시에 만들면 결과가 같으므로 나중 것이 덮어써도 무방)
+    if header_root is None:
+        header_root = parse(header_bytes)
+    css = build_header_css(header_root)
+
+    with _css_cache_lock:
+        _css_cache[key] = css
+        _css_cache.move_to_end(key)
+        while len(_css_cache) > CSS_CACHE_SIZE:
+            _css_cache.popitem(last=False)
+    return css
@@ -0,0 +1,210 @@
+import os
+import base64
+import logging
+import mimetypes
+import threading
+import posixpath
+from urllib.parse import quote, unquote, parse_qs
+from urllib.request import pathname2url
+from lxml import etree
+
+import hwpx_package
+import header_styles
+import image_cache
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# 실행 위치(cwd)와 무관하도록 모듈 기준 절대 경로 사용
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+XSLT_PATH = os.path.join(BASE_DIR, "hwpx_to_html.xslt")
+FONTS_DIR = os.path.join(BASE_DIR, "fonts")
+# hwpx_to_html.xslt의 'Gulim' family로 쓰는 fonts/ 안의 폰트 파일
+FONT_FILE = "GulimChe.ttf"
+
+# HTML 미리보기 기본값: 폰트는 웹 UI의 정적 자원 경로(static_base + "fonts/")에서 제공된다고 가정
+DEFAULT_STATIC_BASE = "/static/"
+# 미리보기 이미지 축소 기준 해상도 (화면용이므로 PDF(image_cache.DEFAULT_DPI)보다 낮게)
+PREVIEW_DPI = 144
+
+# 미리보기 전용 이미지 캐시 (PDF용 image_cache.default_cache와 해상도가 달라 따로 보관)
+preview_images = image_cache.ImageCache(dpi=PREVIEW_DPI)
+
+# 컴파일된 XSLT 캐시 (프로세스 수명 동안 재사용, lxml XSLT 객체는 스레드별로 보관)
+_transform_cache = threading.local()
+
+
+def get_transform(xslt_path):
+    """XSLT를 한 번만 파싱/컴파일합니다. 파일이 바뀌면(mtime) 다시 컴파일합니다."""
+    xslt_path = os.path.abspath(xslt_path)
+    cache = getattr(_transform_cache, "transforms", None)
+    if cache is None:
+        cache = _transform_cache.transforms = {}
+
+    mtime = os.path.getmtime(xslt_path)
+    cached = cache.get(xslt_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, etree.XSLT(etree.parse(xslt_path)))
+        cache[xslt_path] = cached
+    return cached[1]
+
+
+def get_header_css(package):
+    """문서 모델의 header.xml로 paraPr/charPr 스타일 클래스를 만듭니다. (같은 header는 캐시 재사용)"""
+    if hwpx_package.HEADER_NAME not in package.names:
+        return ""
+    header_bytes = package.read(hwpx_package.HEADER_NAME)
+    return header_styles.get_header_css(header_bytes, parse=lambda data: package.header_root)
+
+
+def _section_tree(package, name):
+    """문서 모델의 lxml 트리를 그대로 사용 (다른 백엔드/스트리밍 섹션만 다시 파싱)"""
+    if package.xml_backend == "lxml" and not package.is_streaming(name):
+        return package.get_root(name)
+    with package.open_part(name) as src:
+        return etree.parse(src, etree.XMLParser(huge_tree=True))
+
+
+def render_html_tree(package, xslt_path=XSLT_PATH, fonts_dir=FONTS_DIR, base_dir="", section_names=None,
+                     font_url=None):
+    """
+    문서 모델의 모든 섹션을 XSLT로 변환해 하나의 HTML 트리로 합칩니다.
+    섹션마다 div.hwpx-section으로 감싸고, 두 번째 섹션부터는 새 페이지에서 시작합니다.
+    section_names: 일부 섹션만 렌더링할 때 지정 (기본: 전체)
+    font_url: @font-face에 쓸 폰트 URL (None이면 fonts_dir의 폰트를 file: URL로, 둘 다 비어 있으면 생략)
+    """
+    if font_url is None:
+        font_url = f"file:{pathname2url(os.path.join(os.path.abspath(fonts_dir), FONT_FILE))}" if fonts_dir else ""
+
+    transform = get_transform(xslt_path)
+    params = {
+        "header_css": etree.XSLT.strparam(get_header_css(package)),
+        "font_url": etree.XSLT.strparam(font_url),
+        "base_dir": etree.XSLT.strparam(base_dir),
+    }
+
+    html_root = None
+    for name in section_names or package.section_names:
+        with instrumentation.stage("xslt", section=name):
+            result_root = transform(_section_tree(package, name), **params).getroot()
+        body = result_root.find("body")
+
+        section_div = etree.Element("div", {"class": "hwpx-section"})
+        for child in list(body):
+            section_div.append(child)
+
+        if html_root is None:
+            html_root = result_root
+            body.append(section_div)
+        else:
+            section_div.set("style", "break-before: page;")
+            html_root.find("body").append(section_div)
+
+    return html_root
+
+
+def query_size(query):
+    """"w=..&h=.." 쿼리(XSLT가 넣은 표시 크기, pt)를 (width, height)로. 없거나 유한한 양수가 아니면 (None, None)"""
+    params = parse_qs(query)
+    try:
+        width, height = float(params["w"][0]), float(params["h"][0])
+    except (KeyError, IndexError, ValueError):
+        return None, None
+    # curSz가 없는 그림은 XSLT가 "NaN"을 넣음: 표시 크기를 모르는 것으로 처리 (원본 사용)
+    if not (image_cache.valid_size(width) and image_cache.valid_size(height)):
+        return None, None
+    return width, height
+
+
+def resolve_part_name(package, path):
+    """
+    HTML이 참조한 상대 경로(BinData/...)를 패키지 안의 실제 파트 이름으로 변환합니다. 없으면 None
+    (XSLT는 BinData를 .png로 참조하므로 확장자가 다르면 같은 이름의 다른 파트를 찾음)
+    """
+    name = posixpath.normpath(unquote(path))
+    if name in package.names:
+        return name
+    stem = posixpath.splitext(name)[0]
+    candidates = [n for n in package.names if posixpath.splitext(n)[0] == stem]
+    return candidates[0] if candidates else None
+
+
+def _asset_name(name, mime_type):
+    """내보낼 이미지 파일 이름 (축소 과정에서 형식이 바뀔 수 있으므로 확장자는 실제 MIME 기준)"""
+    extension = mimetypes.guess_extension(mime_type) if mime_type.startswith("image/") else None
+    return posixpath.splitext(name)[0] + extension if extension else name
+
+
+def render_preview(package, output=None, static_base=DEFAULT_STATIC_BASE, asset_base=None, asset_dir=None,
+                   xslt_path=XSLT_PATH, section_names=None, images=None):
+    """
+    WeasyPrint를 거치지 않고 문서 모델을 HTML 미리보기로 렌더링합니다.
+    (편집 중 미리보기용, PDF는 실제로 내려받을 때만 render_pdf로 렌더링)
+    - 폰트: static_base + "fonts/" 아래 경로로 참조 (None이면 @font-face 생략)
+    - 이미지: 표시 크기에 맞게 축소한 결과(images, 기본 PREVIEW_DPI)를 사용
+      asset_base가 None이면 data: URI로 HTML에 포함하고, 주어지면 asset_base + "BinData/..."로 참조합니다.
+      asset_dir를 함께 주면 참조한 이미지 파일을 그 폴더에 기록합니다.
+    output: None이면 HTML bytes를 반환, 경로면 그곳에 기록하고 경로를 반환
+    """
+    images = images or preview_images
+    font_url = f"{static_base}fonts/{FONT_FILE}" if static_base is not None else ""
+
+    with instrumentation.stage("html") as rec:
+        html_root = render_html_tree(package, xslt_path, section_names=section_names, font_url=font_url)
+
+        exported = set()
+        for img in html_root.iter("img"):
+            path, _, query = img.get("src", "").partition("?")
+            name = resolve_part_name(package, path)
+            if name is None:
+                logger.warning(f"패키지에 없는 이미지: {path}")
+                continue
+            data, mime_type = images.prepare(package.read(name), *query_size(query))
+            if asset_base is None:
+                img.set("src", f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}")
+                continue
+
+            asset_name = _asset_name(name, mime_type)
+            if asset_dir and asset_name not in exported:
+                asset_path = os.path.join(asset_dir, *asset_name.split("/"))
+                os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+                with open(asset_path, "wb") as f:
+                    f.write(data)
+                exported.add(asset_name)
+            img.set("src", asset_base + quote(asset_name))
+
+        html = etree.tostring(html_root, method="html", encoding="UTF-8", doctype="<!DOCTYPE html>")
+        rec.add_bytes(written=len(html))
+
+    if output is None:
+        return html
+    with open(output, "wb") as f:
+        f.write(html)
+    return output
+
+
+def convert_to_html(hwpx_path, output_dir, package=None, static_base=DEFAULT_STATIC_BASE, inline_images=False):
+    """
+    HWPX를 HTML 미리보기(같은 이름의 .html)로 저장합니다. (convert_to_pdf와 같은 호출 방식)
+    이미지는 HTML 옆의 "<이름>_files/" 폴더에 기록하고 상대 경로로 참조합니다. (inline_images=True면 HTML에 포함)
+    반환값: HTML 경로, 실패 시 None
+    """
+    base_name = os.path.splitext(os.path.basename(hwpx_path))[0]
+    html_path = os.path.join(output_dir, f"{base_name}.html")
+    asset_base = asset_dir = None
+    if not inline_images:
+        asset_base = f"{quote(base_name)}_files/"
+        asset_dir = os.path.join(output_dir, f"{base_name}_files")
+
+    own_package = package is None
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        if own_package:
+            package = hwpx_package.HWPXPackage(hwpx_path, xml_backend="lxml")
+        return render_preview(package, html_path, static_base, asset_base, asset_dir)
+    except Exception as e:
+        logger.error(f"HTML 미리보기 생성 중 오류 발생: {e}")
+        return None
+    finally:
+        if own_package and package is not None:
+            package.close()
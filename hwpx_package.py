@@ -0,0 +1,389 @@
+import io
+import os
+import re
+import time
+import shutil
+import zipfile
+import logging
+import tempfile
+import threading
+import posixpath
+import contextlib
+import contextvars
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import xml_editor
+import xml_repacker
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+HP_NS = "http://www.hancom.co.kr/hwpml/2011/paragraph"
+SECTION_PATTERN = re.compile(r"^Contents/section(\d+)\.xml$")
+HEADER_NAME = "Contents/header.xml"
+
+# 이 크기(압축 해제 기준)를 넘는 섹션은 트리 전체를 올리지 않고 스트리밍(iterparse)으로 처리
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+
+
+def section_worker_count(section_count, workers=None, xml_backend="lxml"):
+    """
+    섹션 병렬 처리 워커 수 (섹션 수를 넘지 않음)
+    workers가 None이면 lxml 백엔드는 CPU 수, etree 백엔드는 1 (순수 파이썬 파싱/직렬화라 GIL 때문에 이득이 없음)
+    """
+    if workers is None:
+        workers = (os.cpu_count() or 1) if xml_backend == "lxml" else 1
+    return max(1, min(workers, section_count))
+
+
+def extract_paragraph_text(element):
+    """
+    문단(hp:p) 요소의 전체 텍스트를 재구성합니다. (탭, tail 포함)
+    """
+    text_parts = []
+    for node in element.iter():
+        if node.tag == f"{{{HP_NS}}}t" and node.text:
+            text_parts.append(node.text)
+        elif node.tag == f"{{{HP_NS}}}tab":
+            text_parts.append("\t")
+        if node.tail and node != element:
+            text_parts.append(node.tail)
+    return "".join(text_parts)
+
+
+def _parse_xml(data, xml_backend):
+    """xml_backend("etree" | "lxml")에 맞춰 XML bytes를 파싱"""
+    if xml_backend == "lxml":
+        from lxml import etree as lxml_etree  # PDF 렌더링(XSLT)에 넘길 트리가 필요할 때만 로드
+        return lxml_etree.fromstring(data, lxml_etree.XMLParser(huge_tree=True))
+    return ET.fromstring(data)
+
+
+class HWPXPackage:
+    """
+    HWPX(ZIP) 패키지를 디스크에 풀지 않고 메모리에서 다루는 객체.
+    zip은 한 번만 열고, 필요한 파트만 파싱하며, 결과 zip을 바로 작성합니다.
+
+    스캔/수정/렌더링 단계가 같은 객체를 공유하는 문서 모델 역할도 합니다.
+    섹션과 header는 한 번만 파싱되고, 문단 텍스트는 한 번 계산한 뒤 재사용합니다.
+    PDF까지 렌더링할 문서는 xml_backend="lxml"로 열면 XSLT가 같은 트리를 그대로 사용합니다.
+
+    섹션은 서로 독립된 파트이므로 section_workers가 2 이상이면 섹션별 파싱/텍스트 추출, 치환,
+    저장 시 재직렬화를 스레드 풀에서 동시에 실행합니다. 결과는 항상 섹션 순서대로 합쳐집니다.
+    (lxml 백엔드는 파싱/직렬화 중 GIL을 풀기 때문에 큰 섹션이 여러 개일 때 효과가 큼)
+    """
+
+    def __init__(self, source, streaming_threshold=STREAMING_THRESHOLD, xml_backend="etree", section_workers=1):
+        """
+        source: HWPX 파일 경로 또는 bytes
+        streaming_threshold: 이 크기를 넘는 섹션은 스트리밍 모드로 스캔/수정 (None이면 항상 트리 모드)
+        xml_backend: "etree"(기본) 또는 "lxml"
+        section_workers: 섹션 병렬 처리 스레드 수 (1: 순차, None: lxml이면 CPU 수, etree면 순차)
+        """
+        self.streaming_threshold = streaming_threshold
+        self.xml_backend = xml_backend
+        self.section_workers = section_workers
+        self._zip_lock = threading.Lock()  # 여러 섹션을 동시에 읽을 때 zip 파일 위치 보호
+        self._executor = None  # 섹션 병렬 처리용 스레드 풀 (처음 필요할 때 만들고 close()까지 재사용)
+        if isinstance(source, (bytes, bytearray)):
+            self.path = None
+            self._zf = zipfile.ZipFile(io.BytesIO(source), "r")
+        else:
+            self.path = source
+            self._zf = zipfile.ZipFile(source, "r")
+
+        # 디렉토리 엔트리는 제외 (repackage_hwpx와 동일한 구성)
+        self._infos = [info for info in self._zf.infolist() if not info.is_dir()]
+        self._roots = {}      # {파트명: 파싱된 root}
+        self._dirty = set()   # 수정되어 재직렬화가 필요한 파트
+        self._touched = {}    # {파트명: 수정된 문단 목록} (원본 바이트에 해당 문단만 바꿔 끼워 저장)
+        self._replaced = {}   # {파트명: 교체된 bytes 또는 임시 파일 객체(스트리밍 결과)}
+        self._paragraph_texts = {}  # {섹션명: [문단 텍스트]} (수정 전까지 재사용)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for data in self._replaced.values():
+            if not isinstance(data, (bytes, bytearray)):
+                data.close()
+        self._zf.close()
+
+    @property
+    def names(self):
+        return [info.filename for info in self._infos]
+
+    @property
+    def section_names(self):
+        """Contents/section*.xml 목록 (섹션 번호 순)"""
+        sections = []
+        for name in self.names:
+            m = SECTION_PATTERN.match(name)
+            if m:
+                sections.append((int(m.group(1)), name))
+        return [name for _, name in sorted(sections)]
+
+    def read(self, name):
+        """파트의 현재 내용을 bytes로 반환 (수정분 반영)"""
+        if name in self._dirty:
+            return xml_editor.serialize_xml(self._roots[name])
+        if name in self._touched:
+            return self._splice(name)
+        if name in self._replaced:
+            return self._replaced_bytes(name)
+        return self._read_original(name)
+
+    def _read_original(self, name):
+        with self._zip_lock:
+            return self._zf.read(name)
+
+    def open_part(self, name):
+        """파트의 현재 내용을 읽는 바이너리 스트림 (with 문으로 사용)"""
+        if name in self._replaced and not isinstance(self._replaced[name], (bytes, bytearray)):
+            spool = self._replaced[name]
+            spool.seek(0)
+            return contextlib.nullcontext(spool)
+        if name in self._dirty or name in self._touched or name in self._replaced:
+            return io.BytesIO(self.read(name))
+        with self._zip_lock:
+            return self._zf.open(name)
+
+    def part_size(self, name):
+        """파트의 현재 크기 (압축 해제 기준, 바이트)"""
+        if name in self._replaced:
+            data = self._replaced[name]
+            if isinstance(data, (bytes, bytearray)):
+                return len(data)
+            data.seek(0, io.SEEK_END)
+            return data.tell()
+        return self._zf.getinfo(name).file_size
+
+    def is_streaming(self, name):
+        """아직 파싱되지 않았고 임계값보다 큰 파트인지 (스트리밍 모드 대상)"""
+        if self.streaming_threshold is None or name in self._roots:
+            return False
+        return self.part_size(name) > self.streaming_threshold
+
+    def get_root(self, name):
+        """파트를 파싱한 root 요소를 반환 (최초 1회만 파싱)"""
+        if name not in self._roots:
+            with instrumentation.stage("parse", part=name, backend=self.xml_backend) as rec:
+                data = self.read(name)
+                rec.add_bytes(read=len(data))
+                self._roots[name] = _parse_xml(data, self.xml_backend)
+        return self._roots[name]
+
+    @property
+    def header_root(self):
+        """Contents/header.xml 트리 (스타일 정의, 없으면 None)"""
+        if HEADER_NAME not in self.names:
+            return None
+        return self.get_root(HEADER_NAME)
+
+    def mark_modified(self, name):
+        """get_root로 얻은 트리를 수정했음을 표시 (저장 시 트리 전체 재직렬화)"""
+        self._dirty.add(name)
+        self._touched.pop(name, None)
+        self._paragraph_texts.pop(name, None)
+
+    def mark_paragraphs_modified(self, name, paragraphs):
+        """
+        get_root로 얻은 트리에서 문단(hp:p) 내용만 수정했음을 표시합니다.
+        저장 시 원본 바이트에서 해당 문단 범위만 다시 직렬화해 바꿔 끼웁니다.
+        """
+        if name in self._dirty:
+            return
+        self._touched.setdefault(name, []).extend(paragraphs)
+        self._paragraph_texts.pop(name, None)
+
+    def _splice(self, name):
+        """수정된 문단만 바꿔 끼운 파트 bytes (대응이 안 되면 트리 전체 직렬화)"""
+        root = self._roots[name]
+        source = self._replaced_bytes(name) if name in self._replaced else self._read_original(name)
+        data = xml_editor.splice_paragraphs(source, list(root.iter(xml_editor.HP_P_TAG)), self._touched[name])
+        if data is None:
+            logger.info(f"문단 위치를 대응시킬 수 없어 전체를 직렬화합니다: {name}")
+            data = xml_editor.serialize_xml(root)
+        return data
+
+    def _replaced_bytes(self, name):
+        data = self._replaced[name]
+        if isinstance(data, (bytes, bytearray)):
+            return data
+        data.seek(0)
+        return data.read()
+
+    def replace(self, name, data):
+        """파트 내용을 bytes 또는 바이너리 파일 객체로 통째로 교체"""
+        self._roots.pop(name, None)
+        self._dirty.discard(name)
+        self._touched.pop(name, None)
+        self._paragraph_texts.pop(name, None)
+        old = self._replaced.get(name)
+        if old is not None and not isinstance(old, (bytes, bytearray)) and old is not data:
+            old.close()
+        self._replaced[name] = data
+
+    def revert(self, name):
+        """파트의 수정/교체 내용을 버리고 원본 zip의 내용으로 되돌림"""
+        self._roots.pop(name, None)
+        self._dirty.discard(name)
+        self._touched.pop(name, None)
+        self._paragraph_texts.pop(name, None)
+        data = self._replaced.pop(name, None)
+        if data is not None and not isinstance(data, (bytes, bytearray)):
+            data.close()
+
+    def update_section_text(self, name, modifications):
+        """
+        섹션의 텍스트를 치환합니다. 큰 섹션은 스트리밍으로 읽고 쓰며,
+        나머지는 파싱된 트리를 제자리에서 수정합니다. 수정 여부를 반환합니다.
+        """
+        streaming = self.is_streaming(name)
+        with instrumentation.stage("edit_section", section=name, streaming=streaming) as rec:
+            rec.add_bytes(read=self.part_size(name))
+            if not streaming:
+                root = self.get_root(name)
+                touched = xml_editor.modify_tree_paragraphs(root, modifications)
+                if touched:
+                    self.mark_paragraphs_modified(name, touched)
+                    return True
+                return False
+
+            out = tempfile.SpooledTemporaryFile(max_size=xml_repacker.STREAM_CHUNK_SIZE)
+            with self.open_part(name) as src:
+                changed = xml_editor.update_xml_stream(src, out, modifications)
+            if changed:
+                self.replace(name, out)
+            else:
+                out.close()
+            return changed
+
+    def map_sections(self, label, fn, names=None):
+        """
+        섹션마다 fn(섹션명)을 실행하고 결과를 섹션 순서대로 반환합니다.
+        section_workers가 2 이상이면 스레드 풀에서 동시에 실행하며, 작업마다 현재 context를 복사해
+        계측 단계의 부모-자식 관계를 유지합니다. 섹션이 여러 개면 섹션별 소요 시간을 로그로 남깁니다.
+        """
+        names = self.section_names if names is None else names
+        workers = section_worker_count(len(names), self.section_workers, self.xml_backend)
+
+        def timed(name):
+            started = time.perf_counter()
+            result = fn(name)
+            return result, time.perf_counter() - started
+
+        with instrumentation.stage(f"sections_{label}", sections=len(names), workers=workers) as rec:
+            if workers == 1:
+                outcomes = [timed(name) for name in names]
+            else:
+                pool = self._get_executor()
+                futures = [pool.submit(contextvars.copy_context().run, timed, name) for name in names]
+                outcomes = [future.result() for future in futures]
+
+            timings = {name: elapsed for name, (_, elapsed) in zip(names, outcomes)}
+            rec.set(section_ms={name: round(elapsed * 1000, 2) for name, elapsed in timings.items()})
+        if len(names) > 1:
+            _log_section_timings(label, timings, workers)
+        return [result for result, _ in outcomes]
+
+    def _get_executor(self):
+        """스캔/치환/직렬화 단계가 함께 쓰는 스레드 풀 (단계마다 새로 만들지 않음)"""
+        if self._executor is None:
+            workers = section_worker_count(len(self.section_names), self.section_workers, self.xml_backend)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hwpx_sections")
+        return self._executor
+
+    def iter_paragraph_texts(self):
+        """모든 섹션의 문단 텍스트를 (섹션명, 문단 인덱스, 텍스트) 형태로 순회"""
+        # 트리 모드 섹션은 먼저 섹션 단위로(병렬 가능) 파싱/텍스트 추출 (스트리밍 섹션은 메모리 제한을 위해 순회 시 처리)
+        pending = [name for name in self.section_names
+                   if name not in self._paragraph_texts and not self.is_streaming(name)]
+        if len(pending) > 1:
+            self.map_sections("scan", self.get_paragraph_texts, pending)
+        for name in self.section_names:
+            yield from self.iter_section_paragraph_texts(name)
+
+    def iter_section_paragraph_texts(self, name):
+        """섹션 하나의 문단 텍스트를 (섹션명, 문단 인덱스, 텍스트) 형태로 순회 (스트리밍 섹션은 읽으면서 처리)"""
+        if self.is_streaming(name):
+            yield from self._iter_streaming_paragraph_texts(name)
+            return
+        for idx, text in enumerate(self.get_paragraph_texts(name)):
+            yield name, idx, text
+
+    def update_sections_text(self, modifications):
+        """모든 섹션에 update_section_text 적용 (section_workers에 따라 병렬). 섹션별 수정 여부 목록을 반환"""
+        return self.map_sections("edit", lambda name: self.update_section_text(name, modifications))
+
+    def get_paragraph_texts(self, name):
+        """섹션의 문단 텍스트 목록 (파싱된 트리 기준, 최초 1회만 계산)"""
+        if name not in self._paragraph_texts:
+            root = self.get_root(name)
+            self._paragraph_texts[name] = [extract_paragraph_text(p) for p in root.iter(f"{{{HP_NS}}}p")]
+        return self._paragraph_texts[name]
+
+    def _iter_streaming_paragraph_texts(self, name):
+        """큰 섹션: 최상위 요소 단위로 읽고 버리며 문단 텍스트를 순회 (문서 순서 동일)"""
+        idx = 0
+        with self.open_part(name) as src:
+            for event, elem, _ in xml_editor.iterparse_top_level(src):
+                if event != "child":
+                    continue
+                for p in elem.iter(f"{{{HP_NS}}}p"):
+                    yield name, idx, extract_paragraph_text(p)
+                    idx += 1
+                elem.clear()
+
+    def save(self, output_file, compresslevel=xml_repacker.DEFAULT_COMPRESS_LEVEL, workers=1):
+        """
+        현재 상태를 HWPX 파일로 저장합니다.
+        수정된 파트만 새로 압축하고, 나머지는 원본 zip의 압축 바이트를 그대로 복사합니다.
+        """
+        changed = {}
+        # 수정된 섹션의 재직렬화는 섹션별로 독립적이므로 병렬 처리
+        serialized = [name for name in self.names if name in self._dirty or name in self._touched]
+        if len(serialized) > 1:
+            changed.update(zip(serialized, self.map_sections("serialize", self.read, serialized)))
+        for name in self.names:
+            if name in changed:
+                continue
+            if name in self._dirty or name in self._touched:
+                changed[name] = self.read(name)
+            elif name in self._replaced:
+                data = self._replaced[name]
+                if not isinstance(data, (bytes, bytearray)):
+                    data.seek(0)  # 스트리밍 결과는 파일 객체 그대로 넘겨 청크 단위로 압축
+                changed[name] = data
+        return xml_repacker.repackage_incremental(self._zf, output_file, changed,
+                                                  compresslevel=compresslevel, workers=workers)
+
+    def extract_to(self, output_dir):
+        """
+        (디버그용) 현재 상태를 디렉토리에 풀어 놓습니다. 기존 폴더는 삭제 후 재생성합니다.
+        """
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        for name in self.names:
+            target = os.path.join(output_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with self.open_part(name) as src, open(target, "wb") as f:
+                shutil.copyfileobj(src, f)
+        logger.info(f"디버그 추출 완료: {output_dir}")
+        return output_dir
+
+
+def _log_section_timings(label, timings, workers):
+    """섹션별 소요 시간과 불균형(최대/평균) 로그"""
+    mean = sum(timings.values()) / len(timings)
+    imbalance = max(timings.values()) / mean if mean else 1.0
+    detail = ", ".join(f"{posixpath.splitext(posixpath.basename(name))[0]} {elapsed * 1000:.1f}ms"
+                       for name, elapsed in timings.items())
+    logger.info(f"섹션별 {label} 시간 (워커 {workers}, 최대/평균 x{imbalance:.2f}): {detail}")
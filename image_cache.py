@@ -0,0 +1,146 @@
+import io
+import math
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image  # 선택 의존성 (없으면 원본 이미지를 그대로 사용)
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# 축소 기준 해상도: 표시 크기(curSz)를 이 DPI로 환산한 픽셀 수보다 큰 이미지만 축소
+DEFAULT_DPI = 200
+# 캐시 최대 크기 (준비된 이미지 bytes 합계)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 표시 크기 대비 이 비율 이하로 크면 축소하지 않음 (재인코딩 비용/화질 손실 대비 이득이 적음)
+MIN_SCALE_GAIN = 1.25
+
+# (매직 바이트, 형식, MIME)
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"\xff\xd8\xff", "jpeg", "image/jpeg"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+    (b"BM", "bmp", "image/bmp"),
+    (b"II*\x00", "tiff", "image/tiff"),
+    (b"MM\x00*", "tiff", "image/tiff"),
+    (b"\xd7\xcd\xc6\x9a", "wmf", "image/wmf"),
+    (b"<svg", "svg", "image/svg+xml"),
+]
+
+
+def detect_format(data):
+    """
+    이미지 실제 형식 판별 (확장자/참조 경로와 무관하게 내용의 매직 바이트 기준).
+    반환값: (형식, MIME), 알 수 없으면 (None, "application/octet-stream")
+    """
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    if bytes(data[40:44]) == b" EMF":
+        return "emf", "image/emf"
+    for signature, kind, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return kind, mime
+    if head.lstrip().startswith(b"<?xml") and b"<svg" in bytes(data[:1024]):
+        return "svg", "image/svg+xml"
+    return None, "application/octet-stream"
+
+
+def valid_size(value):
+    """표시 크기로 쓸 수 있는 값인지 (curSz가 없으면 XSLT가 NaN을 넣으므로 유한한 양수만 허용)"""
+    return isinstance(value, (int, float)) and math.isfinite(value) and value > 0
+
+
+def target_pixels(width_pt, height_pt, dpi=DEFAULT_DPI):
+    """표시 크기(pt)를 dpi 기준 픽셀 수로 환산. 크기가 없거나 잘못된 값이면 None"""
+    if not (valid_size(width_pt) and valid_size(height_pt)):
+        return None
+    return max(1, round(width_pt * dpi / 72)), max(1, round(height_pt * dpi / 72))
+
+
+def _downsample(data, kind, size):
+    """size(픽셀)로 축소해 다시 인코딩 (Pillow 필요). 축소할 필요가 없으면 None"""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width < size[0] * MIN_SCALE_GAIN and image.height < size[1] * MIN_SCALE_GAIN:
+            return None
+        image.draft("RGB", size)  # JPEG은 디코딩 단계에서부터 축소 (전체 해상도 디코딩 생략)
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode == "P" else "RGB")
+        image = image.resize(size, Image.LANCZOS)
+
+        output = io.BytesIO()
+        if kind == "jpeg" and image.mode in ("RGB", "L"):
+            image.save(output, "JPEG", quality=90, optimize=True)
+            return output.getvalue(), "image/jpeg"
+        image.save(output, "PNG", optimize=False)
+        return output.getvalue(), "image/png"
+
+
+class ImageCache:
+    """
+    렌더링용으로 준비한 BinData 이미지의 LRU 캐시 (프로세스 공용, 스레드 안전).
+    키는 원본 내용 해시 + 목표 픽셀 크기이므로, 여러 문서에 반복되는 직인/도장 이미지는
+    처음 한 번만 디코딩/축소하고 이후에는 준비된 bytes를 그대로 사용합니다.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, dpi=DEFAULT_DPI):
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {키: (bytes, MIME)}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, data, width_pt=None, height_pt=None):
+        """
+        이미지를 표시 크기에 맞게 준비합니다. 반환값: (bytes, MIME)
+        표시 크기를 모르거나(None/NaN/0 이하), Pillow가 없거나, 이미 충분히 작으면 원본 bytes를 그대로 돌려줍니다.
+        """
+        size = target_pixels(width_pt, height_pt, self.dpi)
+        key = f"{hashlib.sha256(data).hexdigest()}:{size[0]}x{size[1]}" if size else None
+        if key:
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return cached
+                self.misses += 1
+
+        kind, mime = detect_format(data)
+        result = (data, mime)
+        if size and Image is not None and kind in ("png", "jpeg", "gif", "bmp", "tiff", "webp"):
+            try:
+                prepared = _downsample(data, kind, size)
+                if prepared is not None:
+                    result = prepared
+            except Exception as e:
+                logger.warning(f"이미지 축소 실패, 원본 사용 ({kind}): {e}")
+
+        if key:
+            self._put(key, result)
+        return result
+
+    def _put(self, key, result):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = result
+            self._size += len(result[0])
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._size -= len(old)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+# 렌더러가 기본으로 사용하는 공용 캐시
+default_cache = ImageCache()
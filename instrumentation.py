@@ -0,0 +1,262 @@
+import io
+import json
+import time
+import logging
+import threading
+import tracemalloc
+import contextvars
+
+try:
+    import resource  # Unix 전용 (Windows에서는 최대 RSS를 기록하지 않음)
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 비활성화 상태에서는 stage()가 공용 no-op 객체를 돌려주므로 비용은 함수 호출 1번 수준입니다.
+_enabled = False
+_track_memory = False
+_hooks = []
+_current = contextvars.ContextVar("hwpx_stage", default=None)
+
+
+class StageRecord:
+    """
+    단계 1회 실행의 측정 결과.
+    wall/cpu/process_cpu: 초. cpu는 단계를 시작한 스레드의 CPU 시간(time.thread_time)이라 단계 본문이 같은 스레드에서
+    실행되는 말단 단계에서 정확하고, process_cpu는 프로세스 전체 CPU 시간(time.process_time)이라 다른 스레드의
+    작업도 포함됩니다. (run_in_executor로 다른 스레드에 넘기는 단계는 cpu가 0에 가깝고 process_cpu를 봐야 함)
+    peak_memory: tracemalloc 기준 최대 할당 바이트(track_memory=True일 때),
+    max_rss_kb: 프로세스 최대 RSS(KB, Unix), bytes_read/bytes_written: 단계가 보고한 입출력 바이트
+    """
+
+    __slots__ = ("name", "attrs", "parent", "started_at", "wall", "cpu", "peak_memory", "max_rss_kb",
+                 "bytes_read", "bytes_written", "error", "process_cpu", "_wall_start", "_cpu_start",
+                 "_process_cpu_start")
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.started_at = time.time()
+        self.wall = self.cpu = self.process_cpu = 0.0
+        self.peak_memory = self.max_rss_kb = None
+        self.bytes_read = self.bytes_written = 0
+        self.error = None
+
+    def add_bytes(self, read=0, written=0):
+        self.bytes_read += read
+        self.bytes_written += written
+
+    def set(self, **attrs):
+        """실행 중에 알게 된 속성(캐시 적중 여부 등)을 추가"""
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "stage": self.name,
+            "parent": self.parent.name if self.parent is not None else None,
+            "started_at": self.started_at,
+            "wall_seconds": self.wall,
+            "cpu_seconds": self.cpu,
+            "process_cpu_seconds": self.process_cpu,
+            "peak_memory_bytes": self.peak_memory,
+            "max_rss_kb": self.max_rss_kb,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class StageHook:
+    """훅 인터페이스: 필요한 메서드만 재정의해서 add_hook()으로 등록 (외부 tracer 연결용)"""
+
+    def on_start(self, record):
+        pass
+
+    def on_end(self, record):
+        pass
+
+
+class JSONLinesHook(StageHook):
+    """단계가 끝날 때마다 측정 결과를 JSON 한 줄로 기록 (경로 또는 텍스트 스트림)"""
+
+    def __init__(self, target):
+        self._own = not isinstance(target, io.IOBase)
+        self._fp = open(target, "a", encoding="UTF-8") if self._own else target
+        self._lock = threading.Lock()
+
+    def on_end(self, record):
+        line = json.dumps(record.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._fp.write(line + "\n")
+            self._fp.flush()
+
+    def close(self):
+        if self._own:
+            self._fp.close()
+
+
+class PrometheusHook(StageHook):
+    """단계별 누적값을 모아 Prometheus 텍스트 형식 스냅샷으로 제공"""
+
+    def __init__(self, prefix="hwpx_stage"):
+        self.prefix = prefix
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def on_end(self, record):
+        with self._lock:
+            totals = self._totals.setdefault(record.name, {
+                "count": 0, "errors": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                "process_cpu_seconds": 0.0,
+                "bytes_read": 0, "bytes_written": 0, "peak_memory_bytes": 0,
+            })
+            totals["count"] += 1
+            totals["errors"] += record.error is not None
+            totals["wall_seconds"] += record.wall
+            totals["cpu_seconds"] += record.cpu
+            totals["process_cpu_seconds"] += record.process_cpu
+            totals["bytes_read"] += record.bytes_read
+            totals["bytes_written"] += record.bytes_written
+            if record.peak_memory:
+                totals["peak_memory_bytes"] = max(totals["peak_memory_bytes"], record.peak_memory)
+
+    def snapshot(self):
+        with self._lock:
+            items = sorted((name, dict(totals)) for name, totals in self._totals.items())
+        lines = []
+        for metric, kind in (("count", "counter"), ("errors", "counter"), ("wall_seconds", "counter"),
+                             ("cpu_seconds", "counter"), ("process_cpu_seconds", "counter"),
+                             ("bytes_read", "counter"),
+                             ("bytes_written", "counter"), ("peak_memory_bytes", "gauge")):
+            suffix = "_total" if kind == "counter" else ""
+            lines.append(f"# TYPE {self.prefix}_{metric}{suffix} {kind}")
+            for name, totals in items:
+                lines.append(f'{self.prefix}_{metric}{suffix}{{stage="{name}"}} {totals[metric]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w", encoding="UTF-8") as f:
+            f.write(self.snapshot())
+
+
+class _Stage:
+    __slots__ = ("record", "_token")
+
+    def __init__(self, name, attrs):
+        self.record = StageRecord(name, attrs, _current.get())
+
+    def __enter__(self):
+        record = self.record
+        self._token = _current.set(record)
+        if _track_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        for hook in _hooks:
+            hook.on_start(record)
+        record._process_cpu_start = time.process_time()
+        record._cpu_start = time.thread_time()
+        record._wall_start = time.perf_counter()
+        return record
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self.record
+        record.wall = time.perf_counter() - record._wall_start
+        record.cpu = time.thread_time() - record._cpu_start
+        record.process_cpu = time.process_time() - record._process_cpu_start
+        if exc is not None:
+            record.error = f"{exc_type.__name__}: {exc}"
+        if _track_memory and tracemalloc.is_tracing():
+            record.peak_memory = max(tracemalloc.get_traced_memory()[1], record.peak_memory or 0)
+            # 하위 단계의 reset_peak로 상위 단계의 최대값이 사라지지 않도록 전파
+            if record.parent is not None:
+                record.parent.peak_memory = max(record.parent.peak_memory or 0, record.peak_memory)
+        if resource is not None:
+            record.max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        _current.reset(self._token)
+
+        for hook in _hooks:
+            try:
+                hook.on_end(record)
+            except Exception as e:
+                logger.warning(f"계측 훅 오류 ({type(hook).__name__}): {e}")
+        return False
+
+
+class _NullRecord:
+    __slots__ = ()
+
+    def add_bytes(self, read=0, written=0):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NULL_RECORD
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_RECORD = _NullRecord()
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, **attrs):
+    """
+    파이프라인 단계 측정용 컨텍스트 매니저.
+        with instrumentation.stage("repack", members=3) as rec:
+            ...
+            rec.add_bytes(written=size)
+    계측이 꺼져 있으면 아무것도 하지 않는 공용 객체를 반환합니다.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, attrs)
+
+
+def is_enabled():
+    return _enabled
+
+
+def add_hook(hook):
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enable(hooks=(), track_memory=False):
+    """
+    계측을 켭니다. track_memory=True이면 tracemalloc으로 단계별 최대 메모리도 기록합니다.
+    (tracemalloc은 할당마다 비용이 있으므로 프로파일링할 때만 사용)
+    워커 프로세스(배치/PDF 큐)에는 적용되지 않으며, 각 프로세스에서 따로 enable해야 합니다.
+    """
+    global _enabled, _track_memory
+    for hook in hooks:
+        add_hook(hook)
+    _track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable():
+    """계측을 끄고 등록된 훅을 모두 제거"""
+    global _enabled, _track_memory
+    _enabled = False
+    if _track_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _track_memory = False
+    for hook in list(_hooks):
+        if hasattr(hook, "close"):
+            hook.close()
+    _hooks.clear()
@@ -0,0 +1,212 @@
+import os
+import re
+import csv
+import copy
+import json
+import logging
+import argparse
+
+import xml_editor
+import hwpx_package
+import template_index
+import xml_repacker
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "master_template.json")
+OUTPUT_DIR = "output_hwpx"
+DEFAULT_NAME_PATTERN = "merge_{index:05d}.hwpx"
+
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\r\n\t]')
+
+
+def read_records(path):
+    """
+    레코드 스트림: JSONL(한 줄에 {필드: 값}) 또는 CSV(첫 줄이 필드명)
+    전체를 메모리에 올리지 않고 한 건씩 돌려줍니다.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if k is not None}
+        return
+
+    with open(path, "r", encoding="UTF-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_no}: 레코드는 JSON 객체여야 합니다.")
+            yield record
+
+
+def output_name(pattern, index, record):
+    """출력 파일명 패턴 적용 (예: "{index:05d}_{신청인}.hwpx"), 경로 구분자 등은 '_'로 치환"""
+    values = {k.replace(" ", ""): _UNSAFE_NAME_RE.sub("_", str(v)) for k, v in record.items()}
+    values.update({k: _UNSAFE_NAME_RE.sub("_", str(v)) for k, v in record.items()})
+    values["index"] = index
+    name = pattern.format_map(values)
+    return name if name.lower().endswith(".hwpx") else f"{name}.hwpx"
+
+
+class _Slot:
+    """채울 문단 하나: 필드, 원본 줄, 라벨 접두어(구분자 포함), 섹션 내 문단 위치"""
+
+    __slots__ = ("field", "original", "label_prefix", "section", "p_index")
+
+    def __init__(self, field, original, section, p_index):
+        self.field = field
+        self.original = original
+        self.section = section
+        self.p_index = p_index
+        # text_modifier.create_smart_replacements와 같은 규칙: 콜론이 있으면 라벨은 유지하고 값만 교체
+        self.label_prefix = None
+        for sep in (":", "："):
+            if sep in original:
+                self.label_prefix = original.split(sep, 1)[0] + sep
+                break
+
+    def modified_text(self, value):
+        if self.label_prefix is not None:
+            return f"{self.label_prefix} {value}"
+        return str(value)
+
+
+class FillPlan:
+    """
+    템플릿 1개를 한 번만 "컴파일"한 채우기 계획.
+    라벨 해석 결과로 필드별 문단 슬롯을 정하고, 섹션별 원본 bytes / 파싱된 문단 / 문단 바이트 범위를 보관합니다.
+    레코드마다 해당 슬롯 문단만 복사해 치환하고, 원본 bytes에 바꿔 끼워 섹션을 만듭니다.
+    """
+
+    def __init__(self, template_path, schema_path=SCHEMA_PATH, use_cache=True):
+        self.template_path = template_path
+        self.package = hwpx_package.HWPXPackage(template_path, streaming_threshold=None)
+        index = template_index.get_template_index(template_path, self.package, schema_path, use_cache=use_cache)
+
+        self.slots = {}  # {정규화된 필드명: _Slot}
+        for field, location in index["field_locations"].items():
+            if location is None:
+                logger.warning(f"템플릿에서 라벨을 찾지 못한 필드: {field}")
+                continue
+            section, p_index = location
+            self.slots[field.replace(" ", "")] = _Slot(field, index["mappings"][field], section, p_index)
+
+        self.sections = {}  # {섹션명: (원본 bytes, 문단 목록, 네임스페이스 선언, 문단 바이트 범위)}
+        for section in sorted({slot.section for slot in self.slots.values()}):
+            data = self.package.read(section)
+            paragraphs = list(self.package.get_root(section).iter(xml_editor.HP_P_TAG))
+            ns_decls = xml_editor.read_namespace_decls(data)
+            prefix = next((p for p, uri in ns_decls if uri == xml_editor.HP_NS), "hp")
+            ranges = xml_editor.find_paragraph_ranges(data, f"{prefix}:p" if prefix else "p")
+            if ranges is None or len(ranges) != len(paragraphs):
+                raise ValueError(f"문단 위치를 대응시킬 수 없는 섹션입니다: {section}")
+            self.sections[section] = (data, paragraphs, ns_decls, ranges)
+
+        self._warned_fields = set()
+        print(f"[*] 채우기 계획 생성: 슬롯 {len(self.slots)}개, 섹션 {len(self.sections)}개")
+
+    def close(self):
+        self.package.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def render_sections(self, record):
+        """레코드 1건의 치환 결과: {섹션명: 새 섹션 bytes} (바뀐 섹션만)"""
+        # 같은 문단을 가리키는 필드(정규화하면 같은 키, 또는 한 문단의 여러 필드)는 문단 하나로 모아 한 번만 바꿔 끼움
+        rules = {}  # {(섹션명, 문단 인덱스): {정규화된 필드명: 치환 규칙}}
+        for field, value in record.items():
+            key = field.replace(" ", "")
+            slot = self.slots.get(key)
+            if slot is None:
+                if field not in self._warned_fields:
+                    self._warned_fields.add(field)
+                    print(f"[!] Warning: Field '{field}' not found in template.")
+                continue
+            rules.setdefault((slot.section, slot.p_index), {})[key] = {
+                "original": slot.original, "modified": slot.modified_text(value)}
+
+        pieces = {}
+        for (section, p_index), paragraph_rules in rules.items():
+            data, paragraphs, ns_decls, ranges = self.sections[section]
+            p_copy = copy.deepcopy(paragraphs[p_index])
+            # 규칙을 차례로 적용 (앞 규칙이 문단 텍스트를 바꾸면 같은 원문을 찾는 뒤 규칙은 적용되지 않음)
+            changed = False
+            for rule in paragraph_rules.values():
+                changed = xml_editor.modify_paragraph(p_copy, [rule]) or changed
+            if not changed:
+                continue
+            start, end = ranges[p_index]
+            pieces.setdefault(section, []).append((start, end, xml_editor.serialize_element(p_copy, ns_decls)))
+
+        result = {}
+        for section, section_pieces in pieces.items():
+            section_pieces.sort(key=lambda piece: piece[0])
+            result[section] = xml_editor.splice_bytes(self.sections[section][0], section_pieces)
+        return result
+
+    def fill(self, record, output_path, compresslevel=xml_repacker.DEFAULT_COMPRESS_LEVEL):
+        """레코드 1건을 채워 output_path에 HWPX로 저장 (바뀐 섹션만 새로 압축)"""
+        for section, data in self.render_sections(record).items():
+            self.package.replace(section, data)
+        try:
+            return self.package.save(output_path, compresslevel=compresslevel)
+        finally:
+            for section in self.sections:
+                self.package.revert(section)
+
+
+def run_mail_merge(template_path, records_path, output_dir=OUTPUT_DIR, name_pattern=DEFAULT_NAME_PATTERN,
+                   schema_path=SCHEMA_PATH, with_pdf=False, compresslevel=xml_repacker.DEFAULT_COMPRESS_LEVEL):
+    """
+    템플릿 1개 + 레코드 스트림으로 문서를 일괄 생성합니다.
+    반환값: (성공 건수, 실패 건수)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if with_pdf:
+        import pdf_repacker  # PDF가 필요할 때만 WeasyPrint 로드
+
+    ok = failed = 0
+    with FillPlan(template_path, schema_path) as plan:
+        for index, record in enumerate(read_records(records_path), 1):
+            try:
+                output_path = os.path.join(output_dir, output_name(name_pattern, index, record))
+                if not plan.fill(record, output_path, compresslevel):
+                    raise RuntimeError("HWPX 저장 실패")
+                if with_pdf and not pdf_repacker.convert_to_pdf(output_path, output_dir):
+                    raise RuntimeError("PDF 변환 실패")
+                ok += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"[실패] 레코드 {index}: {e}")
+
+    print(f"[*] 메일 머지 완료: {ok}건 성공, {failed}건 실패 -> {output_dir}")
+    return ok, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HWPX 메일 머지 (템플릿 1개 + 레코드 여러 건)")
+    parser.add_argument("template", help="템플릿 HWPX 파일")
+    parser.add_argument("records", help="레코드 파일 (JSONL 또는 CSV)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="출력 폴더")
+    parser.add_argument("--name-pattern", default=DEFAULT_NAME_PATTERN,
+                        help='출력 파일명 패턴 (예: "{index:05d}_{신청인}.hwpx")')
+    parser.add_argument("--schema", default=SCHEMA_PATH, help="라벨 스키마 JSON")
+    parser.add_argument("--pdf", action="store_true", help="레코드마다 PDF도 생성")
+    parser.add_argument("--compress-level", type=int, default=xml_repacker.DEFAULT_COMPRESS_LEVEL,
+                        help="수정된 XML 파트의 DEFLATE 압축 레벨 (0-9)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    run_mail_merge(args.template, args.records, args.output_dir, args.name_pattern,
+                   args.schema, args.pdf, args.compress_level)
+
+
+if __name__ == "__main__":
+    main()
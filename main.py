@@ -1,214 +1,418 @@
 import os
-import zipfile
-import shutil
-import glob
 import argparse
 import asyncio
 import logging
-import re
-from datetime import datetime
-import json as json_lib
-import xml.etree.ElementTree as ET
-
-# 전역 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
-
-import xml_converter
+import shutil
+import functools
+import contextvars
+
 import xml_editor
+import hwpx_package
 import xml_repacker
 import text_modifier
-import pdf_repacker
+import batch_runner
+import template_index
+import template_registry
+import result_cache
+import instrumentation
 
-# logging
-# basicConfig is already done in other modules, but let's ensure it's clean here
+# 로깅 설정(basicConfig)은 CLI 진입점에서만 합니다. (라이브러리로 import할 때는 호출한 쪽 설정을 따름)
+logger = logging.getLogger(__name__)
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
 
-# 폴더 경로 상수
+# 폴더 경로 상수 (입출력 폴더는 CLI 기준 현재 디렉토리, 스키마는 실행 위치와 무관하게 모듈 기준)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_DIR = "input_hwpx"
 OUTPUT_DIR = "output_hwpx"
-TEMPLATE_DIR = "template_json"
-MASTER_TEMPLATE_PATH = "master_template.json"
+TEMPLATE_DIR = template_registry.TEMPLATE_DIR
+MASTER_TEMPLATE_PATH = os.path.join(BASE_DIR, "master_template.json")
+TEMPLATE_CACHE_DIR = template_index.CACHE_DIR
+RESULT_CACHE_DIR = result_cache.CACHE_DIR
 
+# --format 값 -> (HWPX 저장 여부, PDF 생성 여부)
+# PDF 관련 모듈(pdf_repacker -> WeasyPrint, html_renderer -> lxml)은 실제로 필요할 때만 함수 안에서 import 합니다.
+# (HWPX만 만드는 실행은 WeasyPrint/lxml을 로드하지 않으므로 시작이 빠름)
+OUTPUT_FORMATS = {"both": (True, True), "hwpx": (True, False), "pdf": (False, True)}
+# 배치 모드에서 지원하지 않는 옵션 (플래그, args 속성): 계측은 워커 프로세스별로 나뉘어 한 파일에 모을 수 없고,
+# 섹션/PDF 병렬화는 문서 단위 프로세스 병렬 처리와 겹치므로 조용히 무시하지 않고 거부합니다.
+BATCH_UNSUPPORTED = [("--metrics-jsonl", "metrics_jsonl"), ("--metrics-prom", "metrics_prom"),
+                     ("--metrics-memory", "metrics_memory"), ("--pdf-workers", "pdf_workers"),
+                     ("--parallel-sections", "parallel_sections"), ("--section-workers", "section_workers")]
 
-async def process_hwpx_document(input_hwpx, output_hwpx=None, modify_source=None, template_file=None):
+
+def _run_blocking(executor, fn, *args, **kwargs):
+    """
+    CPU/IO 위주의 동기 작업을 executor(None이면 asyncio 기본 스레드 풀)에서 실행합니다.
+    계측 단계의 부모-자식 관계가 유지되도록 현재 context를 복사해 넘깁니다.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+
+def _select_schema(package, template_file, registry, default_path, source=None, cache_dir=None):
+    """
+    사용할 스키마 경로 결정: --template 지정 > 레지스트리 라우팅(지문/라벨 스캔) > 기본 스키마
+    source/cache_dir를 주면 라우팅 결과도 템플릿 인덱스 캐시에 저장해, 캐시가 맞으면 문서를 스캔하지 않습니다.
+    """
+    if template_file:
+        return template_registry.resolve_template_path(template_file, TEMPLATE_DIR)
+    if registry is not None:
+        template = registry.route(package, source, cache_dir)
+        if template is not None:
+            return template.path
+    return default_path
+
+
+def _build_modifications(modify_source, template_mappings):
+    """치환 데이터(JSON 파일 경로, JSON 문자열 또는 dict/list)를 실제 문서 줄 기준의 치환 규칙 목록으로 변환"""
+    modifications = []
+    if not modify_source:
+        return modifications
+
+    is_json_file = os.path.exists(modify_source) if isinstance(modify_source, str) else False
+
+    # 여기서 생성한 template_mappings(실제 문서 텍스트 기반)를 넘겨줍니다.
+    # text_modifier는 이제 "진짜 원본 문장"을 보고 교체 규칙을 만듭니다.
+    modify_data_list = text_modifier.get_json_modifications(
+        modify_source,
+        is_file=is_json_file,
+        template_mappings=template_mappings
+    )
+
+    for mod_item in modify_data_list:
+        if "original" in mod_item and "modified" in mod_item:
+            modifications.append({
+                "original": mod_item["original"],
+                "modified": str(mod_item["modified"])
+            })
+    return modifications
+
+
+def _edit_and_save(package, modifications, output_hwpx, compresslevel, debug_dir=None):
+    """치환 규칙을 모든 섹션에 적용하고 HWPX로 저장 (executor에서 실행, output_hwpx가 None이면 저장하지 않음)"""
+    # 치환 규칙은 한 번만 컴파일하여 모든 섹션에 재사용 (큰 섹션은 스트리밍 처리)
+    # 섹션별 치환은 서로 독립적이므로 package.section_workers에 따라 병렬로 실행 (결과는 섹션 순서로 반영)
+    with instrumentation.stage("edit", sections=len(package.section_names)):
+        matcher = xml_editor.ReplacementMatcher(modifications)
+        package.update_sections_text(matcher)
+
+    if debug_dir:
+        package.extract_to(debug_dir)
+    if output_hwpx is None:
+        return True
+
+    output_dir = os.path.dirname(output_hwpx)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with instrumentation.stage("save"):
+        return package.save(output_hwpx, compresslevel=compresslevel)
+
+
+async def _write_preview(executor, output_hwpx, output_dir, package, static_base, inline_images):
+    import html_renderer  # 미리보기가 필요할 때만 lxml 로드
+
+    if static_base is None:
+        static_base = html_renderer.DEFAULT_STATIC_BASE
+    with instrumentation.stage("preview"):
+        html_path = await _run_blocking(executor, html_renderer.convert_to_html, output_hwpx, output_dir,
+                                        package=package, static_base=static_base, inline_images=inline_images)
+    if html_path:
+        print(f"[*] HTML 미리보기 생성 완료: {html_path}")
+    return html_path
+
+
+async def process_hwpx_document(input_hwpx, output_hwpx=None, modify_source=None, template_file=None, debug_extract=False,
+                                compresslevel=xml_repacker.DEFAULT_COMPRESS_LEVEL, work_dir=None,
+                                output_dir=OUTPUT_DIR, use_template_cache=True,
+                                streaming_threshold=hwpx_package.STREAMING_THRESHOLD, xml_backend=None,
+                                pdf_jobs=None, results=None, schema_path=MASTER_TEMPLATE_PATH,
+                                template_cache_dir=TEMPLATE_CACHE_DIR, executor=None, with_pdf=True, registry=None,
+                                with_html=False, html_static_base=None, html_inline_images=False, with_hwpx=True,
+                                section_workers=None):
     """
     HWPX 파일을 처리합니다.
-    master_template.json(스키마)의 라벨을 사용하여 입력 파일에서 실제 텍스트 라인을 찾고,
+    스키마(기본: master_template.json)의 라벨을 사용하여 입력 파일에서 실제 텍스트 라인을 찾고,
     해당 라인에 대해 값 치환을 수행합니다.
+    template_file(양식 이름 또는 스키마 경로)을 주면 그 스키마를, registry(template_registry.TemplateRegistry)를
+    주면 문서 구조 지문으로 고른 양식의 스키마를 사용합니다. 둘 다 없거나 맞는 양식이 없으면 schema_path를 사용합니다.
+    패키지는 메모리에서 처리하며, debug_extract=True일 때만 결과를 work_dir(기본: extracted_xml)에 풀어 둡니다.
+    성공 시 출력 HWPX 경로를 반환합니다.
+
+    작업 상태는 모두 이 호출 안에만 있으므로 같은 프로세스에서 여러 건을 동시에 실행할 수 있습니다.
+    파싱/치환/압축/렌더링은 executor(기본: asyncio 기본 스레드 풀)에서 실행되어 이벤트 루프를 막지 않습니다.
+    (동시 실행 수 제한과 bytes 입출력은 engine.HWPXEngine 참고)
+
+    pdf_jobs(pdf_queue.PDFJobQueue)를 넘기면 PDF 변환은 큐에 넣기만 하고 기다리지 않으며,
+    (출력 HWPX 경로, PDFJob 핸들)을 반환합니다. 이때 PDF는 저장된 HWPX에서 워커 프로세스가 렌더링합니다.
+    with_pdf=False이면 PDF를 만들지 않고, WeasyPrint도 로드하지 않습니다.
+    with_hwpx=False이면 HWPX를 디스크에 쓰지 않고 수정된 문서 모델에서 바로 PDF를 만들며,
+    PDF 경로(PDF도 만들지 않으면 HTML 미리보기 경로)를 반환합니다.
+    (pdf_jobs는 저장된 HWPX가 필요하므로 이때는 사용하지 않고, 결과 캐시에도 저장하지 않음)
+    xml_backend: 기본값(None)은 PDF/미리보기를 만들 때 lxml(XSLT와 트리 공유), HWPX만 만들 때 etree
+    with_html=True이면 WeasyPrint 없이 HTML 미리보기(같은 이름의 .html)도 저장합니다. 폰트는 html_static_base
+    (기본: html_renderer.DEFAULT_STATIC_BASE),
+    이미지는 "<이름>_files/" 상대 경로로 참조합니다. (html_inline_images=True면 이미지를 HTML에 포함)
+
+    section_workers: 섹션별 스캔/치환/직렬화를 병렬로 실행할 스레드 수
+    (None: lxml 백엔드면 CPU 수, etree 백엔드면 순차 / 1: 순차)
+    섹션 결과는 항상 섹션 순서대로 합치므로 라벨 매칭(문서에서 처음 나온 줄)은 순차 실행과 같습니다.
+
+    results(result_cache.ResultCache)를 넘기면 같은 입력/치환 규칙/스키마/XSLT·폰트 조합의
+    이전 결과(HWPX, PDF)를 그대로 복사해 반환하고, 새로 만든 결과는 캐시에 저장합니다.
     """
     file_name = os.path.basename(input_hwpx)
     file_name_no_ext = os.path.splitext(file_name)[0]
     
-    # 0. 작업 디렉토리 준비 (입력 파일 추출)
-    temp_dir = "extracted_xml"
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    extracted_content_path = ""
+    # 0. 패키지 열기 (디스크 추출 없이 메모리에서 처리)
+    if xml_backend is None:
+        xml_backend = "lxml" if with_pdf or with_html else "etree"
     try:
-        await xml_converter.extract_all_hwpx_files(input_hwpx, temp_dir)
-        extracted_content_path = os.path.join(temp_dir, f"{file_name_no_ext}_xml")
+        # PDF/미리보기를 만들 때는 XSLT와 같은 트리를 공유하도록 lxml 백엔드로 한 번만 파싱
+        with instrumentation.stage("open", file=file_name):
+            package = await _run_blocking(executor, hwpx_package.HWPXPackage, input_hwpx,
+                                          streaming_threshold, xml_backend, section_workers)
     except Exception as e:
-        logger.error(f"파일 추출 실패: {e}")
+        logger.error(f"파일 열기 실패: {e}")
         return
 
-    # 1. 문서 전체 텍스트 추출 (메모리 로드)
-    # 스키마 매칭을 위해 현재 문서의 내용을 스캔합니다.
-    ns = {'hp': 'http://www.hancom.co.kr/hwpml/2011/paragraph'}
-    all_text_lines = []
-    
-    xml_files = glob.glob(os.path.join(extracted_content_path, "**", "section*.xml"), recursive=True)
-    for xml in xml_files:
-        tree = ET.parse(xml)
-        root = tree.getroot()
-        for p in root.findall('.//hp:p', ns):
-            def extract_all_p_text(element):
-                text_parts = []
-                for node in element.iter():
-                    if node.tag == f"{{{ns['hp']}}}t" and node.text:
-                        text_parts.append(node.text)
-                    elif node.tag == f"{{{ns['hp']}}}tab":
-                        text_parts.append("\t")
-                    if node.tail and node != element:
-                        text_parts.append(node.tail)
-                return "".join(text_parts)
-            para = extract_all_p_text(p).strip()
-            if para: 
-                all_text_lines.append(para)
-
-    # 2. 스키마(라벨) 로드
-    schema_mappings = {} # {Key: Label}
-    if os.path.exists(MASTER_TEMPLATE_PATH):
-        print(f"[*] 마스터 스키마 로드: {MASTER_TEMPLATE_PATH}")
-        with open(MASTER_TEMPLATE_PATH, "r", encoding="UTF-8") as f:
-            full_data = json_lib.load(f)
-            # 매핑 값은 "신청인 :" 같은 라벨(Label) 역할
-            schema_mappings = full_data.get("mappings", {})
-    
-    # 3. Dynamic Mapping (Label -> Actual Full Line in Input Doc)
-    # 스키마의 라벨이 포함된 실제 문장을 찾아서 '진짜 template_mappings' 구축
-    current_doc_mappings = {} # {Key: Actual Full Line Text}
-    
-    if schema_mappings:
-        # "위의 사실을 증명합니다" 위치 찾기 (날짜 식별을 위한 Anchor)
-        anchor_index = -1
-        for i, line in enumerate(all_text_lines):
-            if "위의 사실을 증명합니다" in line.replace(" ", ""):
-                anchor_index = i
-                break
-
-        for field_key, label_pattern in schema_mappings.items():
-            found = False
-
-            # 작성날짜 특수 처리: Regex + Anchor 기반 정밀 탐색
-            if field_key == "작성날짜":
-                date_pattern = r"\d{2,4}년\s*\d{1,2}월\s*\d{1,2}일"
-                
-                # 1. Anchor(증명 문구) 이후 구간에서 가장 먼저 나오는 날짜 탐색
-                if anchor_index != -1:
-                    for i in range(anchor_index + 1, len(all_text_lines)):
-                        line = all_text_lines[i]
-                        if re.search(date_pattern, line) and "~" not in line:
-                            current_doc_mappings[field_key] = line
-                            found = True
-                            break
-                
-                # 2. Anchor가 없거나 검색 실패 시, 전체 문서에서 마지막 날짜 줄 선택 (Fallback)
-                if not found:
-                    for line in reversed(all_text_lines):
-                        if re.search(date_pattern, line) and "~" not in line:
-                            current_doc_mappings[field_key] = line
-                            found = True
-                            break
-            
-            # 일반 필드: Label 기반 prefix 매칭
-            else:
-                clean_label = label_pattern.replace(" ", "").strip()
-                for line in all_text_lines:
-                    # 라인에서도 공백 제거 후 라벨로 시작하는지 확인 (정밀 매칭)
-                    clean_line = line.replace(" ", "")
-                    if clean_line.startswith(clean_label):
-                        # [중요] 원본 라인(공백 포함)을 매핑 값으로 저장
-                        current_doc_mappings[field_key] = line
-                        found = True
-                        break # 첫 번째 매칭만 사용
-            
-            if not found:
-                 # 못 찾았다면 스키마의 값을 그대로 사용
-                 current_doc_mappings[field_key] = label_pattern
-
-    # 4. 치환 규칙 생성
-    ai_modifications = []
-    if modify_source:
-        is_json_file = os.path.exists(modify_source) if isinstance(modify_source, str) else False
-        
-        # 여기서 생성한 current_doc_mappings(실제 문서 텍스트 기반)를 넘겨줍니다.
-        # text_modifier는 이제 "진짜 원본 문장"을 보고 교체 규칙을 만듭니다.
-        modify_data_list = text_modifier.get_json_modifications(
-            modify_source, 
-            is_file=is_json_file, 
-            template_mappings=current_doc_mappings
-        )
-        
-        for mod_item in modify_data_list:
-            if "original" in mod_item and "modified" in mod_item:
-                ai_modifications.append({
-                    "original": mod_item["original"],
-                    "modified": str(mod_item["modified"])
-                })
-
-    if not ai_modifications:
-        print("[!] 적용할 치환 내용이 없습니다.")
-
-    # 5. XML 수정 및 레이아웃 최적화 수행
     try:
-        # print(f"[*] XML 데이터 수정 및 레이아웃 최적화 수행...")
-        # (좌표/스타일 수정 로직 삭제됨)
-        xml_files_content = glob.glob(os.path.join(extracted_content_path, "Contents", "section*.xml"))
-        for xml_file in xml_files_content:
-            
-            # xml_base_path를 전달하여 header.xml 스타일 수동 수정(내어쓰기 등)이 가능하도록 함
-            xml_editor.update_xml_text_content(xml_file, ai_modifications)
-        
+        try:
+            schema_path = await _run_blocking(executor, _select_schema, package, template_file, registry, schema_path,
+                                              input_hwpx if use_template_cache else None, template_cache_dir)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            return
+
+        # 1~3. 문서 스캔 + 스키마(라벨) 로드 + Dynamic Mapping (Label -> Actual Full Line in Input Doc)
+        # 같은 입력/스키마 조합이면 컴파일된 템플릿 인덱스 캐시를 사용하여 스캔을 생략합니다.
+        template_idx = await _run_blocking(
+            executor, template_index.get_template_index, input_hwpx, package, schema_path,
+            cache_dir=template_cache_dir, use_cache=use_template_cache
+        )
+        current_doc_mappings = template_idx["mappings"] # {Key: Actual Full Line Text}
+
+        # 4. 치환 규칙 생성
+        with instrumentation.stage("modifications") as rec:
+            ai_modifications = _build_modifications(modify_source, current_doc_mappings)
+            rec.set(rules=len(ai_modifications))
+
+        if not ai_modifications:
+            print("[!] 적용할 치환 내용이 없습니다.")
+
+        # 5. XML 수정 및 레이아웃 최적화 수행
         if not output_hwpx:
-            output_hwpx = os.path.join(OUTPUT_DIR, f"[수정]{file_name}")
-            
-        xml_repacker.repackage_hwpx(extracted_content_path, output_hwpx)
-        print(f"[*] 수정 완료: {output_hwpx}")
-        
-        pdf_path = pdf_repacker.convert_to_pdf(output_hwpx, OUTPUT_DIR)
+            output_hwpx = os.path.join(output_dir, f"[수정]{file_name}")
+        pdf_name = f"{os.path.splitext(os.path.basename(output_hwpx))[0]}.pdf"
+
+        # 결과 캐시: 같은 조합이면 편집/압축/렌더링을 모두 생략
+        result_key = None
+        if results is not None:
+            import html_renderer  # 캐시 키에 XSLT/폰트 경로 포함
+            import image_cache
+
+            result_key = await _run_blocking(
+                executor, result_cache.compute_result_key,
+                input_hwpx, ai_modifications, schema_path, html_renderer.XSLT_PATH, html_renderer.FONTS_DIR,
+                compresslevel=compresslevel, xml_backend=xml_backend, image_dpi=image_cache.DEFAULT_DPI
+            )
+            cached = results.get(result_key, need_pdf=with_pdf)
+            if cached:
+                os.makedirs(output_dir, exist_ok=True)
+                pdf_path = os.path.join(output_dir, pdf_name)
+                if with_hwpx:
+                    shutil.copyfile(cached["hwpx"], output_hwpx)
+                if with_pdf:
+                    shutil.copyfile(cached["pdf"], pdf_path)
+                print(f"[*] 결과 캐시 사용: {output_hwpx if with_hwpx else pdf_path}")
+                html_path = None
+                if with_html:
+                    # 캐시에는 HWPX/PDF만 있으므로 미리보기는 캐시된 HWPX에서 다시 만듦 (XSLT만 실행하므로 빠름)
+                    cached_package = await _run_blocking(executor, hwpx_package.HWPXPackage, cached["hwpx"],
+                                                         xml_backend="lxml")
+                    try:
+                        html_path = await _write_preview(executor, output_hwpx, output_dir, cached_package,
+                                             html_static_base, html_inline_images)
+                    finally:
+                        cached_package.close()
+                if pdf_jobs is not None and with_pdf and with_hwpx:
+                    return output_hwpx, pdf_jobs.completed(output_hwpx, pdf_path)
+                if with_pdf:
+                    print(f"[*] PDF 생성 완료: {pdf_path}")
+                return output_hwpx if with_hwpx else (pdf_path if with_pdf else html_path)
+
+        debug_dir = None
+        if debug_extract:
+            debug_dir = os.path.join(work_dir or "extracted_xml", f"{file_name_no_ext}_xml")
+        if not await _run_blocking(executor, _edit_and_save, package, ai_modifications,
+                                   output_hwpx if with_hwpx else None, compresslevel, debug_dir):
+            logger.error(f"HWPX 저장 실패: {output_hwpx}")
+            return
+        if with_hwpx:
+            print(f"[*] 수정 완료: {output_hwpx}")
+
+        html_path = None
+        if with_html:
+            # 미리보기는 PDF보다 먼저 (수정된 문서 모델을 그대로 XSLT로 변환)
+            html_path = await _write_preview(executor, output_hwpx, output_dir, package, html_static_base, html_inline_images)
+
+        if not with_pdf:
+            if result_key and with_hwpx:
+                await _run_blocking(executor, results.put, result_key, output_hwpx)
+            return output_hwpx if with_hwpx else html_path
+
+        if pdf_jobs is not None and with_hwpx:
+            # HWPX는 바로 반환하고, PDF는 큐(프로세스 풀)에서 따로 렌더링
+            pdf_job = await pdf_jobs.submit(output_hwpx, output_dir)
+            print(f"[*] PDF 변환 대기열 등록: {pdf_job.pdf_path}")
+            if result_key:
+                async def store_result():
+                    # 캐시 복사는 파일 I/O이므로 이벤트 루프 밖에서 실행 (큐의 join/close가 완료를 기다림)
+                    pdf_path = await pdf_job
+                    if pdf_path:
+                        await asyncio.to_thread(results.put, result_key, output_hwpx, pdf_path)
+                pdf_jobs.track(store_result())
+            return output_hwpx, pdf_job
+
+        # 문서 모델(수정된 트리)을 그대로 넘겨 재추출/재파싱 없이 렌더링 (이벤트 루프는 막지 않음)
+        import pdf_repacker  # PDF가 필요할 때만 WeasyPrint 로드
+
+        with instrumentation.stage("pdf"):
+            pdf_path = await _run_blocking(executor, pdf_repacker.convert_to_pdf, output_hwpx, output_dir,
+                                           package=package)
         if pdf_path:
             print(f"[*] PDF 생성 완료: {pdf_path}")
+            if result_key and with_hwpx:
+                await _run_blocking(executor, results.put, result_key, output_hwpx, pdf_path)
+
+        return output_hwpx if with_hwpx else pdf_path
             
     finally:
-        pass
+        package.close()
 
 async def main():
     for directory in [INPUT_DIR, OUTPUT_DIR]:
         os.makedirs(directory, exist_ok=True)
 
     parser = argparse.ArgumentParser(description="HWPX 문서 생성 엔진 (Target Search Mode)")
-    parser.add_argument("--input", required=True, help="입력 HWPX 파일 경로")
-    parser.add_argument("--output", help="출력 HWPX 파일 경로")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--input", help="입력 HWPX 파일 경로")
+    source_group.add_argument("--input-dir", help="(배치) 입력 HWPX 폴더 경로")
+    source_group.add_argument("--manifest", help="(배치) 작업 목록 파일 (줄마다 HWPX 경로 또는 JSON)")
+    parser.add_argument("--output", help="출력 HWPX 파일 경로 (배치 모드에서는 출력 폴더)")
+    parser.add_argument("--workers", type=int, help="(배치) 워커 프로세스 수 (기본값: CPU 수)")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="both",
+                        help="출력 선택: hwpx(PDF 생략, WeasyPrint 미로드), pdf(HWPX를 디스크에 쓰지 않음), both(기본)")
     
     group = parser.add_mutually_exclusive_group(required=False)
     group.add_argument("--modify", help="치환 데이터 JSON 파일")
     group.add_argument("--data", help="치환 데이터 JSON 문자열")
     
-    parser.add_argument("--template", help="템플릿 지정 (옵션)")
+    parser.add_argument("--template", help=f"양식 지정: {TEMPLATE_DIR}/ 안의 이름 또는 스키마 JSON 경로 (기본: 자동 판별)")
+    parser.add_argument("--no-registry", action="store_true",
+                        help=f"양식 자동 판별({TEMPLATE_DIR}/)을 사용하지 않고 {os.path.basename(MASTER_TEMPLATE_PATH)}만 사용")
+    parser.add_argument("--compress-level", type=int, default=xml_repacker.DEFAULT_COMPRESS_LEVEL,
+                        help="수정된 XML 파트의 DEFLATE 압축 레벨 (0-9, 기본값: zlib 기본)")
+    parser.add_argument("--no-template-cache", action="store_true", help="컴파일된 템플릿 인덱스 캐시를 사용하지 않음")
+    parser.add_argument("--stream-threshold-mb", type=float, default=hwpx_package.STREAMING_THRESHOLD / (1024 * 1024),
+                        help="이 크기(MB)를 넘는 섹션 XML은 스트리밍 모드로 처리")
+    parser.add_argument("--section-workers", type=int,
+                        help="섹션별 스캔/치환을 병렬로 실행할 스레드 수 (기본값: lxml 백엔드면 CPU 수, etree면 순차)")
+    parser.add_argument("--pdf-workers", type=int,
+                        help="PDF 변환을 별도 프로세스 풀 큐에서 실행 (워커 수 지정, HWPX는 먼저 반환)")
+    parser.add_argument("--parallel-sections", action="store_true",
+                        help="(--pdf-workers 사용 시) 섹션별로 병렬 렌더링 후 이어 붙임 (pypdf 필요)")
+    parser.add_argument("--html", action="store_true",
+                        help="HTML 미리보기(.html)도 저장 (WeasyPrint를 거치지 않음, 이미지는 <이름>_files/에 기록)")
+    parser.add_argument("--html-static-base",
+                        help="HTML 미리보기에서 폰트를 참조할 정적 자원 경로 (폰트: <경로>fonts/, 기본: /static/)")
+    parser.add_argument("--result-cache", action="store_true",
+                        help=f"결과(HWPX/PDF) 캐시 사용 ({RESULT_CACHE_DIR}/, 같은 입력/치환 데이터는 바로 반환)")
+    parser.add_argument("--result-cache-mb", type=int, default=result_cache.DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="결과 캐시 최대 크기(MB), 초과 시 오래된 항목부터 삭제")
+    parser.add_argument("--metrics-jsonl", help="단계별 계측 결과(시간/CPU/메모리/바이트)를 JSON Lines로 기록할 파일")
+    parser.add_argument("--metrics-prom", help="단계별 계측 누적값을 Prometheus 텍스트 형식으로 저장할 파일")
+    parser.add_argument("--metrics-memory", action="store_true", help="(계측) tracemalloc으로 단계별 최대 메모리 기록")
+    parser.add_argument("--debug-extract", action="store_true", help="(디버그) 수정된 패키지를 extracted_xml/에 풀어 둠")
 
     args = parser.parse_args()
+    modify_source = args.modify if args.modify else args.data
+    if args.input_dir or args.manifest:
+        unsupported = [flag for flag, value in BATCH_UNSUPPORTED if getattr(args, value)]
+        if unsupported:
+            parser.error(f"배치 모드(--input-dir/--manifest)에서는 사용할 수 없는 옵션입니다: {', '.join(unsupported)}")
+
+    prometheus_hook = None
+    if args.metrics_jsonl or args.metrics_prom:
+        hooks = []
+        if args.metrics_jsonl:
+            hooks.append(instrumentation.JSONLinesHook(args.metrics_jsonl))
+        if args.metrics_prom:
+            prometheus_hook = instrumentation.PrometheusHook()
+            hooks.append(prometheus_hook)
+        instrumentation.enable(hooks, track_memory=args.metrics_memory)
+    try:
+        await _run_cli(args, modify_source)
+    finally:
+        if prometheus_hook is not None:
+            prometheus_hook.write(args.metrics_prom)
+        instrumentation.disable()
+
+
+def _document_options(args):
+    """단일/배치 모드 공통: CLI 인자 -> process_hwpx_document 키워드 인자 (배치 워커에 넘길 수 있는 값만)"""
+    return dict(debug_extract=args.debug_extract, compresslevel=args.compress_level,
+                use_template_cache=not args.no_template_cache,
+                streaming_threshold=int(args.stream_threshold_mb * 1024 * 1024),
+                with_html=args.html, html_static_base=args.html_static_base)
+
+
+async def _run_cli(args, modify_source):
+    """파싱된 CLI 인자에 따라 단일 문서 또는 배치 처리를 실행"""
+    # 배치 모드: 문서별로 프로세스 풀에 분산
+    if args.input_dir or args.manifest:
+        options = _document_options(args)
+        if args.result_cache:
+            options["result_cache_bytes"] = args.result_cache_mb * 1024 * 1024
+        jobs = batch_runner.collect_jobs(args.input_dir, args.manifest, modify_source,
+                                         output_dir=args.output or OUTPUT_DIR, template=args.template,
+                                         use_registry=not args.no_registry, output_format=args.format,
+                                         options=options)
+        results = await asyncio.to_thread(batch_runner.run_batch, jobs, args.workers)
+        failed = [r for r in results if not r["ok"]]
+        print(f"[*] 배치 완료: {len(results) - len(failed)}/{len(results)}건 성공")
+        for r in failed:
+            print(f"[!] 실패: {r['input']} ({r['error']})")
+        return
     
     input_path = args.input
     if not os.path.dirname(input_path) and not os.path.isabs(input_path):
         input_path = os.path.join(INPUT_DIR, input_path)
-            
-    modify_source = args.modify if args.modify else args.data
 
-    await process_hwpx_document(input_path, args.output, modify_source, args.template)
+    with_hwpx, with_pdf = OUTPUT_FORMATS[args.format]
+    options = dict(_document_options(args), with_hwpx=with_hwpx, with_pdf=with_pdf,
+                   section_workers=args.section_workers)
+    if not args.no_registry:
+        options["registry"] = template_registry.get_registry(TEMPLATE_DIR)
+    if args.result_cache:
+        options["results"] = result_cache.ResultCache(RESULT_CACHE_DIR, args.result_cache_mb * 1024 * 1024)
+
+    # PDF 큐는 저장된 HWPX에서 렌더링하므로 HWPX와 PDF를 모두 만들 때만 사용
+    if not args.pdf_workers or not (with_hwpx and with_pdf):
+        await process_hwpx_document(input_path, args.output, modify_source, args.template, **options)
+        return
+
+    import pdf_queue  # PDF 큐(WeasyPrint)는 사용할 때만 로드
+
+    async with pdf_queue.PDFJobQueue(args.pdf_workers, parallel_sections=args.parallel_sections) as pdf_jobs:
+        result = await process_hwpx_document(input_path, args.output, modify_source, args.template,
+                                             pdf_jobs=pdf_jobs, **options)
+        if result:
+            _, pdf_job = result
+            pdf_path = await pdf_job
+            if pdf_path:
+                print(f"[*] PDF 생성 완료: {pdf_path}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
     asyncio.run(main())
@@ -0,0 +1,180 @@
+import io
+import os
+import asyncio
+import logging
+import itertools
+import multiprocessing
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+import hwpx_package
+import pdf_repacker
+
+logger = logging.getLogger(__name__)
+
+# 동시에 대기/진행할 수 있는 PDF 작업 수 (초과 시 submit이 자리가 날 때까지 대기)
+DEFAULT_MAX_PENDING = 16
+
+
+def has_pdf_merger():
+    """섹션별 PDF를 이어 붙일 pypdf가 설치되어 있는지 (선택 의존성)"""
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def _pool_context():
+    """
+    렌더링 프로세스 시작 방식: 이벤트 루프와 스레드 풀이 돌고 있는 프로세스를 fork하면
+    잠금 상태까지 복제되어 멈출 수 있으므로 forkserver(지원하지 않는 OS에서는 spawn)를 사용
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _section_names(hwpx_path):
+    with hwpx_package.HWPXPackage(hwpx_path) as package:
+        return package.section_names
+
+
+def concat_pdfs(pdf_parts, output):
+    """섹션 순서대로 렌더링된 PDF(bytes) 목록을 하나의 PDF로 이어 붙입니다. (pypdf 필요)"""
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for part in pdf_parts:
+        for page in PdfReader(io.BytesIO(part)).pages:
+            writer.add_page(page)
+    with open(output, "wb") as f:
+        writer.write(f)
+    return output
+
+
+class PDFJob:
+    """
+    큐에 넣은 PDF 변환 작업 핸들.
+    await job (또는 await job.result())으로 완료를 기다리면 PDF 경로를 반환하고, 실패 시 None을 반환합니다.
+    """
+
+    def __init__(self, job_id, hwpx_path, pdf_path, future):
+        self.job_id = job_id
+        self.hwpx_path = hwpx_path
+        self.pdf_path = pdf_path
+        self._future = future
+
+    def done(self):
+        return self._future.done()
+
+    def add_done_callback(self, fn):
+        """작업이 끝나면 fn(job, pdf_path)을 호출 (실패/취소 시 pdf_path는 None)"""
+        def callback(future):
+            fn(self, None if future.cancelled() else future.result())
+        self._future.add_done_callback(callback)
+
+    async def result(self):
+        return await asyncio.shield(self._future)
+
+    def __await__(self):
+        return self.result().__await__()
+
+    def __repr__(self):
+        state = "done" if self.done() else "pending"
+        return f"<PDFJob {self.job_id} {state} {self.pdf_path}>"
+
+
+class PDFJobQueue:
+    """
+    HWPX 저장과 분리된 PDF 변환 큐.
+    WeasyPrint 렌더링은 프로세스 풀에서 실행되므로 이벤트 루프를 막지 않고,
+    max_pending개를 넘는 작업은 submit 단계에서 기다리게 하여(backpressure) 메모리 사용을 제한합니다.
+    """
+
+    def __init__(self, workers=None, max_pending=DEFAULT_MAX_PENDING, parallel_sections=False):
+        """
+        workers: 렌더링 프로세스 수 (기본값: CPU 수)
+        max_pending: 동시에 대기/진행할 수 있는 작업 수
+        parallel_sections: 섹션이 여러 개인 문서는 섹션별로 나눠 병렬 렌더링 후 이어 붙임 (pypdf 필요)
+        """
+        self.workers = workers
+        self.parallel_sections = parallel_sections
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        self._slots = asyncio.Semaphore(max_pending)
+        self._ids = itertools.count(1)
+        self._pending = set()
+        self._background = set()  # 작업 완료 후 처리 (예: 결과 캐시 저장)
+
+        if parallel_sections and not has_pdf_merger():
+            logger.warning("pypdf가 설치되어 있지 않아 섹션 병렬 렌더링을 사용하지 않습니다.")
+            self.parallel_sections = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def submit(self, hwpx_path, output_dir):
+        """
+        저장된 HWPX의 PDF 변환을 큐에 넣고 작업 핸들을 바로 반환합니다.
+        큐가 가득 차 있으면 자리가 날 때까지 기다립니다.
+        """
+        await self._slots.acquire()
+
+        os.makedirs(output_dir, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(hwpx_path))[0]
+        pdf_path = os.path.join(output_dir, f"{base_name}.pdf")
+
+        task = asyncio.ensure_future(self._run(hwpx_path, pdf_path))
+        task.add_done_callback(self._finish)
+        self._pending.add(task)
+        return PDFJob(next(self._ids), hwpx_path, pdf_path, task)
+
+    def completed(self, hwpx_path, pdf_path):
+        """이미 만들어진 PDF(예: 결과 캐시 적중)를 완료된 작업 핸들로 감싸 반환"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(pdf_path)
+        return PDFJob(next(self._ids), hwpx_path, pdf_path, future)
+
+    def track(self, coro):
+        """작업 완료 후 처리 코루틴을 실행하고, join/close가 함께 기다리도록 등록"""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def _finish(self, task):
+        self._pending.discard(task)
+        self._slots.release()
+
+    async def _run(self, hwpx_path, pdf_path):
+        loop = asyncio.get_running_loop()
+        try:
+            logger.info(f"PDF 변환 작업 시작: {pdf_path}")
+            sections = []
+            if self.parallel_sections:
+                # 패키지 열기/섹션 목록은 파일 I/O이므로 이벤트 루프 밖에서 실행
+                sections = await asyncio.to_thread(_section_names, hwpx_path)
+
+            if len(sections) > 1:
+                # 섹션별 병렬 렌더링 후 섹션 순서대로 이어 붙이기
+                parts = await asyncio.gather(*[
+                    loop.run_in_executor(self._pool, pdf_repacker.render_pdf_file, hwpx_path, None, [name])
+                    for name in sections
+                ])
+                await asyncio.to_thread(concat_pdfs, parts, pdf_path)
+            else:
+                await loop.run_in_executor(self._pool, pdf_repacker.render_pdf_file, hwpx_path, pdf_path)
+
+            logger.info(f"PDF 변환 작업 완료: {pdf_path}")
+            return pdf_path
+        except Exception as e:
+            logger.error(f"PDF 변환 작업 실패 ({hwpx_path}): {e}")
+            return None
+
+    async def join(self):
+        """큐에 들어간 작업(과 완료 후 처리)이 모두 끝날 때까지 대기"""
+        while self._pending or self._background:
+            await asyncio.gather(*list(self._pending), *list(self._background))
+
+    async def close(self):
+        """남은 작업을 마친 뒤 프로세스 풀을 종료"""
+        await self.join()
+        await asyncio.to_thread(self._pool.shutdown)
@@ -1,79 +1,138 @@
 import os
 import logging
-import zipfile
-import shutil
+import mimetypes
 from lxml import etree
 from weasyprint import HTML
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+import hwpx_package
+import font_manager
+import image_cache
+import instrumentation
+# HTML 변환 단계는 WeasyPrint 없이도 쓰도록 html_renderer에 있음 (기존 호출부를 위해 이름을 그대로 노출)
+from html_renderer import (XSLT_PATH, FONTS_DIR, get_transform, get_header_css, render_html_tree,
+                           query_size, resolve_part_name)
 
 logger = logging.getLogger(__name__)
 
+# HTML 안의 상대 경로(BinData/...)를 풀 때 쓰는 가상 base_url.
+# 이 접두어로 시작하는 URL은 디스크가 아닌 문서 모델(zip)에서 바로 읽어 WeasyPrint에 넘깁니다.
+PACKAGE_BASE_URL = "https://hwpx-package.invalid/"
+
+
+class PackageURLFetcher(URLFetcher):
+    """
+    base_url 아래의 URL(BinData 등)은 문서 모델에서 바로 읽어 제공하고, 나머지는 WeasyPrint 기본 동작을 따릅니다.
+    BinData 이미지는 실제 형식을 판별하고, 표시 크기에 맞게 축소한 결과를 images(ImageCache)에서 재사용합니다.
+    """
+
+    def __init__(self, package, base_url, images=None, **kwargs):
+        super().__init__(**kwargs)
+        self.package = package
+        self.base_url = base_url
+        self.images = images or image_cache.default_cache
+
+    def fetch(self, url, headers=None):
+        if not url.startswith(self.base_url):
+            return super().fetch(url, headers)
+
+        path, _, query = url[len(self.base_url):].partition("?")
+        name = resolve_part_name(self.package, path)
+        if name is None:
+            raise ValueError(f"패키지에 없는 리소스: {path}")
+
+        if name.startswith("BinData/"):
+            with instrumentation.stage("image", part=name) as rec:
+                data, mime_type = self.images.prepare(self.package.read(name), *query_size(query))
+                rec.add_bytes(written=len(data))
+        else:
+            data = self.package.read(name)
+            mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return URLFetcherResponse(url, data, {"Content-Type": mime_type})
+
+
+def render_pdf(package, output=None, base_url=PACKAGE_BASE_URL, xslt_path=XSLT_PATH, fonts_dir=FONTS_DIR,
+               section_names=None):
+    """
+    문서 모델을 임시 파일 없이 PDF로 렌더링합니다. (기본: 모든 섹션 포함)
+    HTML은 문자열로 WeasyPrint에 넘기고, BinData는 url_fetcher가 zip에서 바로 제공합니다.
+    폰트는 font_manager의 공용 FontConfiguration에 한 번만 등록해 두고 재사용하며,
+    서브셋 결과는 글리프 집합별로 캐시됩니다.
+    output: None이면 PDF bytes를 반환, 경로나 파일 객체면 그곳에 기록
+    """
+    font_config = font_manager.get_font_config()
+    font_stylesheet = font_manager.get_font_stylesheet(fonts_dir)
+    # 공용 스타일시트로 폰트를 등록했으면 XSLT 출력에서는 @font-face를 빼서 렌더링마다 폰트를 다시 읽지 않음
+    html_root = render_html_tree(package, xslt_path, "" if font_stylesheet else fonts_dir,
+                                 section_names=section_names)
+    html_string = etree.tostring(html_root, method="html", encoding="unicode")
+    with instrumentation.stage("weasyprint") as rec:
+        document = HTML(string=html_string, base_url=base_url,
+                        url_fetcher=PackageURLFetcher(package, base_url))
+        with font_manager.subset_cache_installed():
+            result = document.write_pdf(output, font_config=font_config,
+                                        stylesheets=[font_stylesheet] if font_stylesheet else None)
+        if result is not None:
+            rec.add_bytes(written=len(result))
+        elif isinstance(output, (str, os.PathLike)):
+            rec.add_bytes(written=os.path.getsize(output))
+    return result
+
+
+def render_pdf_file(hwpx_path, output=None, section_names=None, xslt_path=XSLT_PATH):
+    """
+    (프로세스 풀 워커용) 저장된 HWPX 파일을 열어 PDF로 렌더링합니다.
+    문서 모델은 프로세스 간에 넘길 수 없으므로 워커에서 다시 엽니다.
+    """
+    with hwpx_package.HWPXPackage(hwpx_path, xml_backend="lxml") as package:
+        return render_pdf(package, output, xslt_path=xslt_path, section_names=section_names)
+
+
 class HWPXToPDFConverter:
-    def __init__(self, hwpx_path, output_dir):
+    def __init__(self, hwpx_path, output_dir, package=None):
+        """
+        package: 이미 열려 있는 HWPXPackage(문서 모델). 주어지면 hwpx_path는 이름 결정에만 쓰이고,
+                 파싱/수정된 트리를 그대로 사용하므로 HWPX를 다시 풀거나 파싱하지 않습니다.
+        """
         self.hwpx_path = hwpx_path
         self.output_dir = output_dir
-        self.extract_path = os.path.join(output_dir, "_temp_xslt_extract")
-        self.xslt_path = os.path.abspath("hwpx_to_html.xslt")
+        self.package = package
+        self.xslt_path = os.path.abspath(XSLT_PATH)
 
     def convert(self):
+        package = self.package
         try:
-            # 1. Extract HWPX
-            if os.path.exists(self.extract_path):
-                shutil.rmtree(self.extract_path)
-            with zipfile.ZipFile(self.hwpx_path, 'r') as zip_ref:
-                zip_ref.extractall(self.extract_path)
-
-            # 2. XSLT Transformation
-            section_path = os.path.join(self.extract_path, "Contents", "section0.xml")
-            header_path = os.path.join(self.extract_path, "Contents", "header.xml")
-            
-            # Load XML and XSLT
-            xml_doc = etree.parse(section_path)
-            xslt_doc = etree.parse(self.xslt_path)
-            transform = etree.XSLT(xslt_doc)
-
-            # Apply transformation (passing header.xml path, fonts_dir, and base_dir as parameters)
-            header_uri = "file://" + os.path.abspath(header_path)
-            fonts_dir_path = os.path.abspath("fonts")
-            base_dir_path = os.path.abspath(self.extract_path)
-            
-            result_tree = transform(xml_doc, 
-                                    header_path=etree.XSLT.strparam(header_uri),
-                                    fonts_dir=etree.XSLT.strparam(fonts_dir_path),
-                                    base_dir=etree.XSLT.strparam(base_dir_path))
-            
-            # 3. Save Temporary HTML
+            # 1. Open document model (without extraction)
+            if package is None:
+                package = hwpx_package.HWPXPackage(self.hwpx_path, xml_backend="lxml")
+
+            # 2. XSLT + WeasyPrint, entirely in memory
             base_name = os.path.splitext(os.path.basename(self.hwpx_path))[0]
-            html_path = os.path.join(self.output_dir, f"{base_name}_xslt_temp.html")
             pdf_path = os.path.join(self.output_dir, f"{base_name}.pdf")
-            
-            with open(html_path, "wb") as f:
-                f.write(etree.tostring(result_tree, pretty_print=True, method="html", encoding="UTF-8"))
 
-            # 4. Render PDF via WeasyPrint
             logger.info(f"XSLT-WeasyPrint PDF 변환 시작: {base_name}")
-            HTML(html_path).write_pdf(pdf_path)
-            
-            # Cleanup
-            if os.path.exists(html_path): os.remove(html_path)
-            shutil.rmtree(self.extract_path)
-            
+            render_pdf(package, pdf_path, xslt_path=self.xslt_path)
+
             return pdf_path
         except Exception as e:
             logger.error(f"XSLT PDF 변환 중 오류 발생: {e}")
-            if os.path.exists(self.extract_path): shutil.rmtree(self.extract_path)
             return None
+        finally:
+            if self.package is None and package is not None:
+                package.close()
 
-def convert_to_pdf(hwpx_path: str, output_dir: str) -> str:
+def convert_to_pdf(hwpx_path: str, output_dir: str, package=None) -> str:
     """
     XSLT + WeasyPrint 방식을 사용하여 HWPX를 PDF로 변환합니다. (Option D)
+    package(HWPXPackage)를 넘기면 이미 파싱/수정된 문서 모델을 그대로 렌더링합니다.
     """
-    if not os.path.exists(hwpx_path):
+    if package is None and not os.path.exists(hwpx_path):
         logger.error(f"변환할 HWPX 파일을 찾을 수 없습니다: {hwpx_path}")
         return None
-    
+
     # 출력 폴더 생성
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-        
-    converter = HWPXToPDFConverter(hwpx_path, output_dir)
+
+    converter = HWPXToPDFConverter(hwpx_path, output_dir, package)
     return converter.convert()
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 결과(HWPX/PDF) 캐시 폴더와 기본 최대 크기
+CACHE_DIR = ".result_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# 결과 형식/생성 규칙이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_VERSION = 1
+
+HWPX_NAME = "result.hwpx"
+PDF_NAME = "result.pdf"
+
+# XSLT 밖에서 결과(스타일 CSS, 이미지 다운샘플링)에 영향을 주는 모듈 소스 (키에 내용을 포함)
+RENDER_SOURCES = ("header_styles.py", "image_cache.py")
+_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _hash_file(hasher, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+
+
+def _hash_fonts(hasher, fonts_dir):
+    """폰트는 크기가 크므로 파일명/크기/수정 시각으로 버전을 표시"""
+    if not fonts_dir or not os.path.isdir(fonts_dir):
+        return
+    for name in sorted(os.listdir(fonts_dir)):
+        st = os.stat(os.path.join(fonts_dir, name))
+        hasher.update(f"{name}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+
+
+def normalize_modifications(modifications):
+    """치환 규칙 목록을 순서를 유지한 채 정규화된 JSON 문자열로 변환"""
+    items = [[str(m["original"]), str(m["modified"])] for m in modifications]
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+
+
+def compute_result_key(input_hwpx, modifications, template_path=None, xslt_path=None, fonts_dir=None, **options):
+    """
+    결과 캐시 키: 입력 HWPX 내용 + 정규화된 치환 규칙 + 스키마 + XSLT/폰트 버전 + 렌더링 모듈 소스 + 출력 옵션.
+    (이미지 해상도처럼 렌더링 모듈의 설정값은 options로 넘김)
+    xml_repacker가 고정 타임스탬프로 저장하므로 키가 같으면 결과 파일도 바이트 단위로 같습니다.
+    """
+    hasher = hashlib.sha256(f"result-cache-v{CACHE_VERSION}".encode())
+    if isinstance(input_hwpx, (bytes, bytearray)):
+        hasher.update(input_hwpx)
+    else:
+        _hash_file(hasher, input_hwpx)
+
+    hasher.update(b"\0modifications\0")
+    hasher.update(normalize_modifications(modifications).encode())
+
+    for label, path in (("template", template_path), ("xslt", xslt_path)):
+        hasher.update(f"\0{label}\0".encode())
+        if path and os.path.exists(path):
+            _hash_file(hasher, path)
+
+    hasher.update(b"\0fonts\0")
+    _hash_fonts(hasher, fonts_dir)
+
+    for name in RENDER_SOURCES:
+        hasher.update(f"\0source\0{name}\0".encode())
+        path = os.path.join(_SOURCE_DIR, name)
+        if os.path.exists(path):
+            _hash_file(hasher, path)
+
+    hasher.update(b"\0options\0")
+    hasher.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    내용 주소 기반 결과 캐시 (디스크).
+    항목마다 <cache_dir>/<key>/ 폴더에 result.hwpx(와 result.pdf)를 저장하고,
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다. (LRU)
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # 적중/실패 횟수 (여러 스레드에서 get 호출)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key, need_pdf=True):
+        """
+        캐시 항목을 찾습니다. 있으면 {"hwpx": 경로, "pdf": 경로 또는 None}, 없으면 None.
+        need_pdf=True이면 PDF까지 있어야 적중으로 봅니다.
+        """
+        entry = self._entry_dir(key)
+        hwpx_path = os.path.join(entry, HWPX_NAME)
+        pdf_path = os.path.join(entry, PDF_NAME)
+        if not os.path.exists(hwpx_path) or (need_pdf and not os.path.exists(pdf_path)):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(entry)  # LRU 순서 갱신
+        except OSError:
+            pass
+        return {"hwpx": hwpx_path, "pdf": pdf_path if os.path.exists(pdf_path) else None}
+
+    def put(self, key, hwpx_path, pdf_path=None):
+        """결과 파일을 캐시에 복사합니다. (임시 폴더에 쓴 뒤 교체하여 동시 실행에도 안전)"""
+        entry = self._entry_dir(key)
+        tmp_entry = f"{entry}.{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}.tmp"
+        try:
+            os.makedirs(tmp_entry)
+            shutil.copyfile(hwpx_path, os.path.join(tmp_entry, HWPX_NAME))
+            if pdf_path and os.path.exists(pdf_path):
+                shutil.copyfile(pdf_path, os.path.join(tmp_entry, PDF_NAME))
+
+            if os.path.exists(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_entry, entry)
+        except OSError as e:
+            logger.warning(f"결과 캐시 저장 실패 ({key[:12]}): {e}")
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def _entries(self):
+        """[(마지막 사용 시각, 크기, 경로)] (임시 폴더 제외)"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                entries.append((os.path.getmtime(path), size, path))
+            except OSError:
+                continue  # 다른 프로세스가 삭제 중인 항목
+        return entries
+
+    def evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 오래된 항목부터 삭제"""
+        if not self.max_bytes:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logger.info(f"결과 캐시 항목 삭제 (LRU): {os.path.basename(path)[:12]}")
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import base64
+import functools
+import mimetypes
+import asyncio
+import logging
+import argparse
+
+import main
+import engine
+import template_index
+import template_registry
+import html_renderer
+import result_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# 동시에 처리할 문서 수 (초과 요청은 자리가 날 때까지 대기)
+DEFAULT_CONCURRENCY = engine.DEFAULT_CONCURRENCY
+# HTML 미리보기가 폰트를 참조하는 경로 (html_renderer.DEFAULT_STATIC_BASE + "fonts/")
+FONTS_PATH = f"{html_renderer.DEFAULT_STATIC_BASE}fonts/"
+# 요청 본문 최대 크기 (base64 인코딩된 HWPX 포함)
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# outputs를 생략했을 때 만들 결과
+DEFAULT_OUTPUTS = ["hwpx", "pdf"]
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HWPXServer:
+    """
+    상주 서버 모드: 스키마, 컴파일된 XSLT, 템플릿 인덱스/결과 캐시를 프로세스에 띄워 둔 채
+    HTTP 요청마다 engine.HWPXEngine으로 문서를 처리합니다.
+
+    POST /process  {"hwpx": base64, "data": {필드: 값}, "outputs": ["hwpx", "pdf"], "filename": "..."}
+                   -> {"hwpx": base64, "pdf": base64 또는 null, "elapsed_ms": ...}
+                   outputs에 "html"을 넣으면 HTML 미리보기(이미지 포함)도 반환, ["html"]만 넣으면 PDF 렌더링 생략
+    GET  /static/fonts/<파일>  -> HTML 미리보기가 참조하는 폰트 (fonts/)
+    GET  /health   -> {"status": "ok", ...}
+    GET  /metrics  -> Prometheus 텍스트 형식 카운터
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, results=None):
+        self.concurrency = concurrency
+        self.results = results
+        self.engine = engine.HWPXEngine(max_concurrency=concurrency, results=results,
+                                        registry=template_registry.get_registry(main.TEMPLATE_DIR))
+        self.started_at = time.time()
+        self.counters = {"requests": 0, "errors": 0, "documents": 0, "processing_seconds": 0.0}
+
+    def warm_up(self):
+        """
+        스키마 로드, XSLT 컴파일, 폰트 등록을 미리 수행 (첫 요청 지연 제거)
+        컴파일된 XSLT와 FontConfiguration은 스레드별로 캐시되므로 렌더링을 실행하는 엔진 executor의 각 스레드에서 수행합니다.
+        """
+        template_index.load_schema_mappings(main.MASTER_TEMPLATE_PATH)
+        try:
+            import font_manager  # WeasyPrint 로드 (스레드마다 동시에 import하지 않도록 여기서 한 번)
+        except (ImportError, OSError) as e:
+            logger.warning(f"PDF 폰트 예열 생략 (WeasyPrint를 사용할 수 없음): {e}")
+            font_manager = None
+        warmed = self.engine.run_in_each_thread(functools.partial(_warm_up_thread, font_manager))
+        print(f"[*] 렌더링 스레드 예열 완료: {len(warmed)}개 (PDF 폰트 {'포함' if font_manager else '제외'})")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            status, content_type, body = await self._dispatch(reader)
+        except Exception as e:
+            logger.error(f"요청 처리 중 오류: {e}")
+            status, content_type, body = 500, "application/json", _json_body({"error": str(e)})
+
+        if status >= 400:
+            self.counters["errors"] += 1
+        header = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                  f"Content-Type: {content_type}\r\n"
+                  f"Content-Length: {len(body)}\r\n"
+                  "Connection: close\r\n\r\n")
+        try:
+            writer.write(header.encode("latin-1") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return 400, "application/json", _json_body({"error": "empty request"})
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return 400, "application/json", _json_body({"error": "malformed request line"})
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        self.counters["requests"] += 1
+        path = path.split("?", 1)[0]
+
+        if path == "/health":
+            return 200, "application/json", _json_body(self.health())
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.metrics().encode()
+        if path.startswith(FONTS_PATH):
+            return self.static_font(path[len(FONTS_PATH):])
+        if path != "/process":
+            return 404, "application/json", _json_body({"error": f"unknown path: {path}"})
+        if method != "POST":
+            return 405, "application/json", _json_body({"error": "POST only"})
+
+        length = _content_length(headers)
+        if length is None:
+            return 400, "application/json", _json_body({"error": "missing or invalid Content-Length"})
+        if length > MAX_BODY_BYTES:
+            return 413, "application/json", _json_body({"error": "request body too large"})
+        try:
+            payload = json.loads(await reader.readexactly(length))
+            outputs = _parse_outputs(payload.get("outputs"))
+            data = payload.get("data")
+            if data is not None and not isinstance(data, (dict, list)):
+                # 문자열은 서버 파일 경로로 해석될 수 있으므로 거부 (치환 데이터는 JSON 객체/배열로만)
+                raise TypeError("data는 JSON 객체, 배열 또는 null이어야 합니다")
+            hwpx_bytes = base64.b64decode(payload["hwpx"])
+        except (ValueError, KeyError, TypeError, AttributeError, asyncio.IncompleteReadError) as e:
+            return 400, "application/json", _json_body({"error": f"invalid request body: {e}"})
+
+        response = await self.process(hwpx_bytes, payload, outputs)
+        if response is None:
+            return 500, "application/json", _json_body({"error": "document processing failed"})
+        return 200, "application/json", _json_body(response)
+
+    async def process(self, hwpx_bytes, payload, outputs=None):
+        """
+        요청 1건 처리: 엔진이 요청마다 전용 임시 폴더에서 실행하고, 결과를 base64로 반환
+        outputs: _parse_outputs로 검증한 결과 목록 (None이면 DEFAULT_OUTPUTS)
+        """
+        started = time.perf_counter()
+        outputs = outputs or DEFAULT_OUTPUTS
+        result = await self.engine.process_bytes(hwpx_bytes, payload.get("data"), outputs,
+                                                 payload.get("filename") or "document.hwpx")
+        if result is None:
+            return None
+
+        response = {name: base64.b64encode(data).decode("ascii") if data else None
+                    for name, data in result.items()}
+        elapsed = time.perf_counter() - started
+        self.counters["documents"] += 1
+        self.counters["processing_seconds"] += elapsed
+        response["elapsed_ms"] = round(elapsed * 1000, 1)
+        return response
+
+    def static_font(self, name):
+        """HTML 미리보기의 @font-face 요청 (fonts/ 바로 아래 파일만 제공)"""
+        path = os.path.join(html_renderer.FONTS_DIR, os.path.basename(name))
+        if not name or name != os.path.basename(name) or not os.path.isfile(path):
+            return 404, "application/json", _json_body({"error": f"unknown font: {name}"})
+        with open(path, "rb") as f:
+            return 200, mimetypes.guess_type(path)[0] or "application/octet-stream", f.read()
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "in_flight": self.engine.in_flight,
+            "concurrency": self.concurrency,
+        }
+
+    def metrics(self):
+        lines = [
+            f"hwpx_requests_total {self.counters['requests']}",
+            f"hwpx_request_errors_total {self.counters['errors']}",
+            f"hwpx_documents_total {self.counters['documents']}",
+            f"hwpx_processing_seconds_total {self.counters['processing_seconds']:.6f}",
+            f"hwpx_in_flight {self.engine.in_flight}",
+            f"hwpx_concurrency_limit {self.concurrency}",
+        ]
+        if self.results is not None:
+            stats = self.results.stats()
+            lines += [
+                f"hwpx_result_cache_hits_total {stats['hits']}",
+                f"hwpx_result_cache_misses_total {stats['misses']}",
+                f"hwpx_result_cache_entries {stats['entries']}",
+                f"hwpx_result_cache_bytes {stats['bytes']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _warm_up_thread(font_manager=None):
+    """(엔진 스레드) XSLT 컴파일과, font_manager가 주어지면 스레드별 FontConfiguration/폰트 등록"""
+    if os.path.exists(html_renderer.XSLT_PATH):
+        html_renderer.get_transform(html_renderer.XSLT_PATH)
+    if font_manager is not None:
+        font_manager.get_font_config()
+        font_manager.get_font_stylesheet(html_renderer.FONTS_DIR)
+
+
+def _content_length(headers):
+    """Content-Length 헤더 값 (없거나 0 이상의 정수가 아니면 None)"""
+    value = headers.get("content-length", "")
+    if not value.isdigit():  # 부호/공백/소수점 등은 거부
+        return None
+    return int(value)
+
+
+def _parse_outputs(value):
+    """
+    요청의 outputs를 검증합니다. 생략(null)하면 DEFAULT_OUTPUTS,
+    목록이 아니거나, 비어 있거나, 알 수 없는 결과 이름이 있으면 ValueError
+    """
+    if value is None:
+        return list(DEFAULT_OUTPUTS)
+    if not isinstance(value, list) or not value:
+        raise ValueError(f"outputs는 {list(engine.OUTPUT_NAMES)} 중 하나 이상을 담은 목록이어야 합니다")
+    unknown = [name for name in value if name not in engine.OUTPUT_NAMES]
+    if unknown:
+        raise ValueError(f"알 수 없는 outputs 값: {unknown} (허용: {list(engine.OUTPUT_NAMES)})")
+    return value
+
+
+def _json_body(obj):
+    return json.dumps(obj, ensure_ascii=False).encode("UTF-8")
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, concurrency=DEFAULT_CONCURRENCY,
+                results=None):
+    server_state = HWPXServer(concurrency, results)
+    server_state.warm_up()
+
+    if unix_socket:
+        server = await asyncio.start_unix_server(server_state.handle_connection, path=unix_socket)
+        print(f"[*] HWPX 서버 시작: unix:{unix_socket} (동시 처리 {concurrency}건)")
+    else:
+        server = await asyncio.start_server(server_state.handle_connection, host, port)
+        print(f"[*] HWPX 서버 시작: http://{host}:{port} (동시 처리 {concurrency}건)")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        server_state.engine.close()
+
+
+def run():
+    parser = argparse.ArgumentParser(description="HWPX 문서 생성 엔진 (상주 서버 모드)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="바인딩 주소")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="포트")
+    parser.add_argument("--unix-socket", help="TCP 대신 Unix 소켓 경로로 대기")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시에 처리할 문서 수")
+    parser.add_argument("--result-cache", action="store_true", help="결과(HWPX/PDF) 캐시 사용")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=main.LOG_FORMAT)
+    results = result_cache.ResultCache(main.RESULT_CACHE_DIR) if args.result_cache else None
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix_socket, args.concurrency, results))
+    except KeyboardInterrupt:
+        print("[*] HWPX 서버 종료")
+
+
+if __name__ == "__main__":
+    run()
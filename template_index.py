@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# 컴파일된 템플릿 인덱스 캐시 폴더
+CACHE_DIR = ".template_cache"
+# 인덱스 구조/해석 규칙이 바뀌면 올려서 기존 캐시를 무효화
+INDEX_VERSION = 1
+# 캐시 항목 수 상한 (넘으면 가장 오래 사용하지 않은 항목부터 삭제, None/0이면 무제한)
+MAX_ENTRIES = 2000
+# 캐시 항목 파일 이름: <sha256 키>.json (같은 폴더의 학습 지문 파일 등은 삭제 대상에서 제외)
+_ENTRY_RE = re.compile(r"^[0-9a-f]{64}\.json$")
+
+ANCHOR_TEXT = "위의 사실을 증명합니다"
+DATE_PATTERN = r"\d{2,4}년\s*\d{1,2}월\s*\d{1,2}일"
+
+
+def hash_source(hasher, source):
+    """파일 경로 또는 bytes를 해시에 반영"""
+    if isinstance(source, (bytes, bytearray)):
+        hasher.update(source)
+        return
+    with open(source, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+
+
+def compute_cache_key(input_hwpx, schema_path):
+    """
+    입력 HWPX 내용과 스키마 파일 내용으로 캐시 키를 만듭니다.
+    둘 중 하나라도 바뀌면 키가 달라지므로 기존 항목은 자동으로 무효화됩니다.
+    """
+    hasher = hashlib.sha256(f"template-index-v{INDEX_VERSION}".encode())
+    hash_source(hasher, input_hwpx)
+    hasher.update(b"\0schema\0")
+    if schema_path and os.path.exists(schema_path):
+        hash_source(hasher, schema_path)
+    return hasher.hexdigest()
+
+
+# 로드한 스키마 캐시 {절대 경로: (mtime, mappings)} (상주 서버 등에서 요청마다 다시 읽지 않도록)
+_schema_cache = {}
+
+
+def load_schema_mappings(schema_path):
+    """스키마(라벨) 로드: {Key: Label} (파일이 바뀌지 않았으면 이전에 읽은 내용을 재사용)"""
+    schema_mappings = {}
+    if schema_path and os.path.exists(schema_path):
+        abs_path = os.path.abspath(schema_path)
+        mtime = os.path.getmtime(abs_path)
+        cached = _schema_cache.get(abs_path)
+        if cached is not None and cached[0] == mtime:
+            return dict(cached[1])
+
+        print(f"[*] 마스터 스키마 로드: {schema_path}")
+        with open(schema_path, "r", encoding="UTF-8") as f:
+            full_data = json.load(f)
+            # 매핑 값은 "신청인 :" 같은 라벨(Label) 역할
+            schema_mappings = full_data.get("mappings", {})
+        _schema_cache[abs_path] = (mtime, dict(schema_mappings))
+    return schema_mappings
+
+
+def scan_text_lines(package):
+    """
+    문서 전체 텍스트 추출 (메모리 로드)
+    반환값: (비어 있지 않은 문단 텍스트 목록, 각 줄의 [섹션명, 문단 인덱스] 목록)
+    """
+    lines, locations = [], []
+    for section_name, p_index, text in package.iter_paragraph_texts():
+        para = text.strip()
+        if para:
+            lines.append(para)
+            locations.append([section_name, p_index])
+    return lines, locations
+
+
+DATE_FIELD = "작성날짜"
+_DATE_RE = re.compile(DATE_PATTERN)
+_TERMINAL = ""  # 트라이 노드에서 "여기서 끝나는 라벨" 목록을 담는 키 (문자 키와 겹치지 않음)
+
+
+def _build_label_trie(schema_mappings):
+    """일반 필드 라벨(공백 제거)로 prefix 트라이를 만듭니다."""
+    trie = {}
+    for field_key, label_pattern in schema_mappings.items():
+        if field_key == DATE_FIELD:
+            continue
+        node = trie
+        for ch in label_pattern.replace(" ", "").strip():
+            node = node.setdefault(ch, {})
+        node.setdefault(_TERMINAL, []).append(field_key)
+    return trie
+
+
+def resolve_schema_mappings(all_text_lines, schema_mappings):
+    """
+    Dynamic Mapping (Label -> Actual Full Line in Input Doc)
+    스키마의 라벨이 포함된 실제 문장을 찾아 {Key: 줄 인덱스}를 반환합니다. (못 찾으면 None)
+
+    각 줄은 한 번만 정규화(공백 제거)하고, 라벨 트라이를 따라 내려가며
+    모든 라벨과 Anchor/날짜 규칙을 한 번의 순회로 해석합니다.
+    결과는 필드별 "첫 번째 매칭" 규칙과 동일합니다.
+    """
+    resolved = {}
+    if not schema_mappings:
+        return resolved
+
+    trie = _build_label_trie(schema_mappings)
+    pending = len(schema_mappings) - (1 if DATE_FIELD in schema_mappings else 0)
+    need_date = DATE_FIELD in schema_mappings
+
+    # "위의 사실을 증명합니다" 위치 (날짜 식별을 위한 Anchor)
+    anchor_index = -1
+    date_after_anchor = None  # Anchor 이후 가장 먼저 나오는 날짜 줄
+    last_date_line = None     # 전체 문서의 마지막 날짜 줄 (Fallback)
+
+    for i, line in enumerate(all_text_lines):
+        clean_line = line.replace(" ", "")
+
+        # 일반 필드: Label 기반 prefix 매칭 (첫 번째 매칭만 사용)
+        if pending:
+            node = trie
+            for ch in clean_line:
+                for field_key in node.get(_TERMINAL, ()):
+                    if field_key not in resolved:
+                        resolved[field_key] = i
+                        pending -= 1
+                node = node.get(ch)
+                if node is None:
+                    break
+            else:
+                for field_key in node.get(_TERMINAL, ()):
+                    if field_key not in resolved:
+                        resolved[field_key] = i
+                        pending -= 1
+
+        # 작성날짜 특수 처리: Regex + Anchor 기반 정밀 탐색
+        if need_date:
+            is_date_line = "~" not in line and _DATE_RE.search(line) is not None
+            if is_date_line:
+                last_date_line = i
+                if anchor_index != -1 and date_after_anchor is None:
+                    date_after_anchor = i
+            if anchor_index == -1 and ANCHOR_TEXT in clean_line:
+                anchor_index = i
+
+        if not pending and (not need_date or date_after_anchor is not None):
+            break
+
+    if need_date:
+        resolved[DATE_FIELD] = date_after_anchor if date_after_anchor is not None else last_date_line
+
+    for field_key in schema_mappings:
+        resolved.setdefault(field_key, None)
+    return resolved
+
+
+def build_template_index(package, schema_mappings):
+    """
+    템플릿 "컴파일": 문서 스캔 + 라벨 해석 결과를 캐시 가능한 dict로 만듭니다.
+    - mappings: {Key: 실제 원본 줄} (못 찾으면 스키마 라벨 그대로)
+    - field_locations: {Key: [섹션명, 문단 인덱스] 또는 None}
+    - lines / locations: 스캔한 원본 줄과 위치
+    """
+    with instrumentation.stage("scan") as rec:
+        lines, locations = scan_text_lines(package)
+        rec.set(lines=len(lines))
+    with instrumentation.stage("label_match", fields=len(schema_mappings)):
+        resolved = resolve_schema_mappings(lines, schema_mappings)
+
+    mappings, field_locations = {}, {}
+    for field_key, label_pattern in schema_mappings.items():
+        i = resolved.get(field_key)
+        # [중요] 원본 라인(공백 포함)을 매핑 값으로 저장, 못 찾았다면 스키마의 값을 그대로 사용
+        mappings[field_key] = lines[i] if i is not None else label_pattern
+        field_locations[field_key] = locations[i] if i is not None else None
+
+    return {
+        "version": INDEX_VERSION,
+        "mappings": mappings,
+        "field_locations": field_locations,
+        "lines": lines,
+        "locations": locations,
+    }
+
+
+def load_index(cache_key, cache_dir=CACHE_DIR):
+    """캐시된 인덱스를 읽습니다. 없거나 손상되었으면 None"""
+    path = os.path.join(cache_dir, f"{cache_key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="UTF-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            return None
+        try:
+            os.utime(path)  # LRU 순서 갱신 (evict_index는 mtime이 오래된 항목부터 삭제)
+        except OSError:
+            pass
+        return index
+    except Exception as e:
+        logger.warning(f"템플릿 인덱스 캐시 손상, 재생성합니다 ({path}): {e}")
+        return None
+
+
+def save_index(cache_key, index, cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+    """
+    인덱스를 캐시에 저장합니다. (임시 파일에 쓴 뒤 교체하여 동시 실행에도 안전)
+    저장 후 항목 수가 max_entries를 넘으면 오래된 항목부터 삭제합니다.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{cache_key}.json")
+    # 같은 프로세스의 여러 스레드가 동시에 저장해도 임시 파일이 겹치지 않도록 스레드 id 포함
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="UTF-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    evict_index(cache_dir, max_entries)
+
+
+def evict_index(cache_dir=CACHE_DIR, max_entries=MAX_ENTRIES):
+    """항목 수가 max_entries 이하가 될 때까지 마지막 사용 시각(mtime)이 오래된 항목부터 삭제. 삭제한 수를 반환"""
+    if not max_entries:
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not _ENTRY_RE.match(name):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue  # 다른 프로세스가 삭제 중인 항목
+    excess = len(entries) - max_entries
+    if excess <= 0:
+        return 0
+
+    removed = 0
+    for _, path in sorted(entries)[:excess]:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    logger.info(f"템플릿 인덱스 캐시 항목 {removed}개 삭제 (최대 {max_entries}개)")
+    return removed
+
+
+def get_template_index(input_hwpx, package, schema_path, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    캐시에 컴파일된 인덱스가 있으면 그대로 사용하고(문서 스캔/라벨 해석 생략),
+    없으면 컴파일 후 저장합니다.
+    """
+    with instrumentation.stage("template_index") as rec:
+        cache_key = compute_cache_key(input_hwpx, schema_path) if use_cache else None
+
+        if cache_key:
+            index = load_index(cache_key, cache_dir)
+            if index is not None:
+                rec.set(cache_hit=True)
+                print(f"[*] 템플릿 인덱스 캐시 사용: {cache_key[:12]}")
+                return index
+
+        rec.set(cache_hit=False)
+        index = build_template_index(package, load_schema_mappings(schema_path))
+
+        if cache_key:
+            try:
+                save_index(cache_key, index, cache_dir)
+            except OSError as e:
+                logger.warning(f"템플릿 인덱스 캐시 저장 실패: {e}")
+        return index
@@ -0,0 +1,276 @@
+import os
+import json
+import glob
+import hashlib
+import logging
+import threading
+
+import template_index
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 양식별 스키마 폴더 (master_template.json과 같은 형식: {"mappings": {...}, "fingerprints": [...] (선택)})
+TEMPLATE_DIR = os.path.join(BASE_DIR, "template_json")
+# 라벨 스캔으로 알아낸 지문 -> 양식 이름 (다음부터는 지문으로 바로 찾음)
+# 소스 트리(template_dir)가 아니라 상태 폴더(기본: 템플릿 인덱스 캐시 폴더)에 양식 폴더별로 저장합니다.
+LEARNED_NAME = "learned_fingerprints.json"
+# 라벨 스캔 fallback에서 양식으로 인정할 최소 라벨 매칭 비율 (작성날짜 제외)
+MIN_MATCH_RATIO = 0.6
+
+HH_NS = "http://www.hancom.co.kr/hwpml/2011/head"
+FINGERPRINT_VERSION = 2
+# 지문에 넣는 앞쪽 라벨 줄 최대 개수
+FINGERPRINT_LABELS = 16
+
+
+class Template:
+    """등록된 양식 하나: 이름(파일명), 스키마 경로, 라벨 매핑, 선언된 지문"""
+
+    __slots__ = ("name", "path", "mappings", "fingerprints")
+
+    def __init__(self, name, path, mappings, fingerprints=()):
+        self.name = name
+        self.path = path
+        self.mappings = mappings
+        self.fingerprints = list(fingerprints)
+
+
+def _label_of(line):
+    """라벨 줄("주   소   지   : 서울...")에서 값을 뺀 라벨 부분(공백 제거). 라벨 줄이 아니면 None"""
+    for sep in (":", "："):
+        if sep in line:
+            return line.split(sep, 1)[0].replace(" ", "")
+    return None
+
+
+def _leading_labels(package, limit):
+    """
+    라벨이 처음 나오는 섹션의 라벨 줄(최대 limit개). 그 섹션까지만 읽으므로
+    뒤 섹션(반복되는 본문 등)은 파싱하지 않습니다.
+    """
+    labels = []
+    for name in package.section_names:
+        texts = package.iter_section_paragraph_texts(name)
+        try:
+            for _, _, text in texts:
+                label = _label_of(text.strip())
+                if label:
+                    labels.append(label)
+                    if len(labels) >= limit:
+                        break
+        finally:
+            texts.close()  # 스트리밍 섹션을 읽다 멈춘 경우 파트 파일을 닫음
+        if labels:
+            break
+    return labels
+
+
+def compute_fingerprint(package, label_count=FINGERPRINT_LABELS):
+    """
+    문서 구조 지문: header의 paraPr/charPr id 목록 + 앞쪽 라벨 줄(콜론 앞부분, _leading_labels) 해시.
+    채워진 값은 지문에 들어가지 않으므로 같은 양식이면 빈 양식/작성된 문서 모두 같은 지문이 나옵니다.
+    읽은 문단 텍스트는 패키지에 캐시되어 이후 단계에서 재사용합니다.
+    """
+    hasher = hashlib.sha256(f"fingerprint-v{FINGERPRINT_VERSION}".encode())
+    if "Contents/header.xml" in package.names:
+        header = package.header_root
+        for tag in ("paraPr", "charPr"):
+            ids = [elem.get("id", "") for elem in header.iter(f"{{{HH_NS}}}{tag}")]
+            hasher.update(f"\0{tag}\0{','.join(ids)}".encode())
+
+    hasher.update(b"\0labels\0")
+    for label in _leading_labels(package, label_count):
+        hasher.update(label.encode() + b"\n")
+    return hasher.hexdigest()
+
+
+def learned_path_for(template_dir, state_dir=None):
+    """template_dir에 대한 학습 지문 파일 경로 (여러 양식 폴더가 같은 상태 폴더를 써도 겹치지 않도록 경로 해시 포함)"""
+    digest = hashlib.sha256(os.path.abspath(template_dir).encode()).hexdigest()[:12]
+    stem, ext = os.path.splitext(LEARNED_NAME)
+    return os.path.join(state_dir or template_index.CACHE_DIR, f"{stem}-{digest}{ext}")
+
+
+def resolve_template_path(template, template_dir=TEMPLATE_DIR):
+    """--template 값(스키마 경로 또는 template_dir 안의 양식 이름)을 스키마 경로로 변환"""
+    if os.path.exists(template):
+        return template
+    name = template if template.endswith(".json") else f"{template}.json"
+    path = os.path.join(template_dir, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"양식 스키마를 찾을 수 없습니다: {template}")
+    return path
+
+
+class TemplateRegistry:
+    """
+    template_dir의 양식 스키마를 한 번만 읽어 두고, 들어온 문서를 알맞은 양식으로 보냅니다.
+    1) 구조 지문(header id 목록 + 라벨이 처음 나오는 섹션의 라벨 줄)이 등록되어 있으면 그 양식으로 결정
+       (지문은 그 섹션까지만 읽으므로 나머지 섹션은 스캔하지 않음)
+    2) 모르는 지문이면 모든 양식의 라벨을 스캔해 가장 잘 맞는 양식을 고르고, 지문을 학습해 저장
+    어느 양식과도 충분히 맞지 않으면 None (호출한 쪽에서 기본 스키마 사용)
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, learned_path=None, min_match_ratio=MIN_MATCH_RATIO, state_dir=None):
+        """
+        learned_path: 학습한 지문을 저장할 파일 (기본: state_dir 안의 learned_path_for(template_dir))
+        state_dir: 학습 지문을 둘 상태 폴더 (기본: template_index.CACHE_DIR)
+        """
+        self.template_dir = template_dir
+        self.learned_path = learned_path or learned_path_for(template_dir, state_dir)
+        self.min_match_ratio = min_match_ratio
+        self.templates = {}       # {이름: Template}
+        self._by_fingerprint = {}  # {지문: 이름}
+        self.signature = ()        # 로드한 스키마 파일 구성 (라우팅 결과 캐시 키에 포함)
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        templates, by_fingerprint = {}, {}
+        signature = _dir_signature(self.template_dir)
+        for path in sorted(glob.glob(os.path.join(self.template_dir, "*.json"))):
+            if os.path.basename(path) == LEARNED_NAME:
+                continue
+            try:
+                with open(path, "r", encoding="UTF-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"양식 스키마를 읽을 수 없습니다 ({path}): {e}")
+                continue
+            name = os.path.splitext(os.path.basename(path))[0]
+            templates[name] = Template(name, path, data.get("mappings", {}), data.get("fingerprints", ()))
+            for fingerprint in templates[name].fingerprints:
+                by_fingerprint[fingerprint] = name
+
+        for fingerprint, name in self._load_learned().items():
+            if name in templates:
+                by_fingerprint.setdefault(fingerprint, name)
+
+        with self._lock:
+            self.templates = templates
+            self._by_fingerprint = by_fingerprint
+            self.signature = signature
+        if templates:
+            print(f"[*] 양식 레지스트리 로드: {len(templates)}종, 지문 {len(by_fingerprint)}개")
+
+    def _load_learned(self):
+        if not os.path.exists(self.learned_path):
+            return {}
+        try:
+            with open(self.learned_path, "r", encoding="UTF-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"학습된 지문 파일 손상, 무시합니다 ({self.learned_path}): {e}")
+            return {}
+
+    def learn(self, fingerprint, name):
+        """지문 -> 양식 대응을 등록하고 파일에 저장 (임시 파일에 쓴 뒤 교체)"""
+        with self._lock:
+            self._by_fingerprint[fingerprint] = name
+            learned = {fp: n for fp, n in self._by_fingerprint.items()
+                       if fp not in self.templates[n].fingerprints}
+        tmp_path = f"{self.learned_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.learned_path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="UTF-8") as f:
+                json.dump(learned, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.learned_path)
+        except OSError as e:
+            logger.warning(f"학습된 지문 저장 실패: {e}")
+
+    def match_by_labels(self, lines):
+        """
+        라벨 스캔 fallback: 양식마다 라벨(작성날짜 제외)이 몇 개나 문서에서 찾아지는지 비교합니다.
+        반환값: (가장 잘 맞는 Template 또는 None, 매칭 비율)
+        """
+        best, best_score = None, 0.0
+        for template in self.templates.values():
+            labels = [key for key in template.mappings if key != template_index.DATE_FIELD]
+            if not labels:
+                continue
+            resolved = template_index.resolve_schema_mappings(lines, template.mappings)
+            score = sum(1 for key in labels if resolved.get(key) is not None) / len(labels)
+            if score > best_score or (score == best_score and best is not None
+                                      and len(template.mappings) > len(best.mappings)):
+                best, best_score = template, score
+        if best_score < self.min_match_ratio:
+            return None, best_score
+        return best, best_score
+
+    def route_key(self, source):
+        """입력 HWPX(경로 또는 bytes)와 현재 양식 구성으로 라우팅 결과 캐시 키를 만듭니다."""
+        hasher = hashlib.sha256(f"route-v{FINGERPRINT_VERSION}".encode())
+        template_index.hash_source(hasher, source)
+        hasher.update(b"\0templates\0")
+        for path, mtime in self.signature:
+            hasher.update(f"{path}\0{mtime}\n".encode())
+        return hasher.hexdigest()
+
+    def route(self, package, source=None, cache_dir=None):
+        """
+        문서에 맞는 Template (없으면 None)
+        source(입력 HWPX)와 cache_dir를 주면 판별 결과를 템플릿 인덱스 캐시 폴더에 함께 저장하고,
+        같은 입력/양식 구성이면 문서를 스캔하지 않고 저장된 결과를 사용합니다.
+        """
+        if not self.templates:
+            return None
+        with instrumentation.stage("route") as rec:
+            route_key = self.route_key(source) if source is not None and cache_dir else None
+            if route_key:
+                cached = template_index.load_index(route_key, cache_dir)
+                if cached is not None and (cached.get("template") is None or cached["template"] in self.templates):
+                    name = cached.get("template")
+                    rec.set(method="cache", template=name)
+                    return self.templates[name] if name is not None else None
+
+            template = self._route_scan(package, rec)
+            if route_key:
+                entry = {"version": template_index.INDEX_VERSION, "template": template.name if template else None}
+                try:
+                    template_index.save_index(route_key, entry, cache_dir)
+                except OSError as e:
+                    logger.warning(f"양식 판별 결과 캐시 저장 실패: {e}")
+            return template
+
+    def _route_scan(self, package, rec):
+        """지문 -> (모르는 지문이면) 전체 라벨 스캔 순으로 양식을 판별"""
+        fingerprint = compute_fingerprint(package)
+        name = self._by_fingerprint.get(fingerprint)
+        if name is not None:
+            rec.set(method="fingerprint", template=name)
+            return self.templates[name]
+
+        lines, _ = template_index.scan_text_lines(package)
+        template, score = self.match_by_labels(lines)
+        rec.set(method="label_scan", template=template.name if template else None, score=score)
+        if template is None:
+            print(f"[!] 일치하는 양식이 없습니다 (최고 라벨 매칭 {score:.0%}), 기본 스키마를 사용합니다.")
+            return None
+        print(f"[*] 양식 판별 (라벨 스캔): {template.name} ({score:.0%}), 지문 학습 {fingerprint[:12]}")
+        self.learn(fingerprint, template.name)
+        return template
+
+
+# 프로세스당 한 번만 읽도록 폴더별로 보관 {절대 경로: (폴더 상태, TemplateRegistry)}
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def _dir_signature(template_dir):
+    paths = sorted(p for p in glob.glob(os.path.join(template_dir, "*.json"))
+                   if os.path.basename(p) != LEARNED_NAME)
+    return tuple((p, os.path.getmtime(p)) for p in paths)
+
+
+def get_registry(template_dir=TEMPLATE_DIR, state_dir=None):
+    """template_dir의 레지스트리 (스키마 파일이 추가/수정되면 다시 로드). state_dir: 학습 지문을 둘 폴더"""
+    key = (os.path.abspath(template_dir), os.path.abspath(state_dir or template_index.CACHE_DIR))
+    signature = _dir_signature(key[0])
+    with _registries_lock:
+        cached = _registries.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, TemplateRegistry(key[0], state_dir=key[1]))
+            _registries[key] = cached
+        return cached[1]
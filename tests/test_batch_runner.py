@@ -0,0 +1,31 @@
+import os
+import zipfile
+
+import synth_hwpx
+import batch_runner
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODIFY_PATH = os.path.join(ROOT_DIR, "modify_data2.json")
+
+
+def test_job_options_reach_the_pipeline(tmp_path, monkeypatch):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    synth_hwpx.generate_hwpx(str(input_dir / "doc.hwpx"), paragraphs=10)
+    monkeypatch.chdir(tmp_path)
+
+    options = dict(compresslevel=0, use_template_cache=False, debug_extract=True, with_html=True,
+                   result_cache_bytes=1024 * 1024)
+    jobs = batch_runner.collect_jobs(str(input_dir), modify_source=MODIFY_PATH, output_dir=str(tmp_path / "out"),
+                                     use_registry=False, output_format="hwpx", options=options)
+    assert jobs[0]["options"] == options
+
+    output = batch_runner._run_job(jobs[0])
+
+    with zipfile.ZipFile(output) as zf:
+        info = zf.getinfo("Contents/section0.xml")
+        assert info.compress_size >= info.file_size  # 압축 레벨 0
+    assert (tmp_path / "out" / "[수정]doc.html").exists()
+    assert (tmp_path / "extracted_xml" / "doc_xml").is_dir()
+    assert not (tmp_path / ".template_cache").exists()
+    assert (tmp_path / ".result_cache").is_dir()
@@ -0,0 +1,34 @@
+import os
+import sys
+import json
+import subprocess
+
+import run_benchmarks
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 새 프로세스에서 main만 import하고 (시간, 로드된 무거운 모듈)을 보고
+_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import main
+print(json.dumps({"import_ms": (time.perf_counter() - started) * 1000,
+                  "loaded": [m for m in json.loads(sys.argv[1]) if m in sys.modules]}))
+"""
+
+
+def _probe():
+    completed = subprocess.run([sys.executable, "-c", _PROBE, json.dumps(run_benchmarks.HEAVY_MODULES)],
+                               cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_import_main_stays_light():
+    # 첫 실행은 .pyc 생성/디스크 캐시 영향이 있으므로 3번 중 가장 빠른 값으로 판단
+    probes = [_probe() for _ in range(3)]
+
+    loaded = set().union(*(probe["loaded"] for probe in probes))
+    assert "weasyprint" not in loaded
+    assert "lxml" not in loaded
+    assert not loaded
+    assert min(probe["import_ms"] for probe in probes) < run_benchmarks.IMPORT_BUDGET_MS
@@ -0,0 +1,46 @@
+import pytest
+
+try:
+    import font_manager
+    from weasyprint.pdf.fonts import Font
+except (ImportError, OSError) as e:  # WeasyPrint 네이티브 라이브러리(pango)가 없는 환경
+    pytest.skip(f"weasyprint를 불러올 수 없습니다: {e}", allow_module_level=True)
+
+
+class _FakeFont:
+    """make_key가 읽는 속성만 가진 폰트"""
+
+    def __init__(self, file_content, description_hash="same", index=0):
+        self.file_content = file_content
+        self.hash = description_hash
+        self.index = index
+        self.missing = {}
+
+
+def test_subset_key_uses_font_file_content():
+    a = _FakeFont(b"font-a" * 100)
+    b = _FakeFont(b"font-b" * 100)  # 설명 해시와 크기가 같은 다른 폰트 파일
+    assert font_manager.SubsetCache.make_key(a, {1, 2}, False) != \
+        font_manager.SubsetCache.make_key(b, {1, 2}, False)
+    assert font_manager.SubsetCache.make_key(a, {2, 1}, False) == \
+        font_manager.SubsetCache.make_key(_FakeFont(b"font-a" * 100), {1, 2}, False)
+
+
+def test_subset_key_digest_computed_once():
+    font = _FakeFont(b"font-a" * 100)
+    key = font_manager.SubsetCache.make_key(font, {1}, False)
+    font.file_content = b"subsetted"  # 서브셋 후 내용이 바뀌어도 원본 기준 키 유지
+    assert font_manager.SubsetCache.make_key(font, {1}, False) == key
+
+
+def test_subset_patch_only_inside_context():
+    original = Font.subset
+    font_manager.get_font_config()
+    assert Font.subset is original
+    with font_manager.subset_cache_installed():
+        patched = Font.subset
+        assert patched is not original
+        with font_manager.subset_cache_installed():
+            assert Font.subset is patched
+        assert Font.subset is patched
+    assert Font.subset is original
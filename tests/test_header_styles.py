@@ -0,0 +1,217 @@
+import re
+import random
+import pathlib
+import threading
+import xml.etree.ElementTree as ET
+
+import pytest
+from lxml import etree
+
+import header_styles
+
+HH = "http://www.hancom.co.kr/hwpml/2011/head"
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _xpath_string(expr):
+    """XSLT(XPath 1.0)가 출력하는 문자열"""
+    return etree.XPath(f"string({expr})")(etree.Element("x"))
+
+
+@pytest.mark.parametrize("value", ["abc", "1e3", "1e", "-1e-2", "inf", "+3", "", "12.50", "-7", " 33 "])
+def test_fmt_matches_xpath_number(value):
+    assert header_styles._fmt(header_styles._number(value) / 33) == _xpath_string(f"number('{value}') div 33")
+
+
+@pytest.mark.parametrize("expr", ["number('x')", "1 div 0", "-1 div 0"])
+def test_fmt_non_finite(expr):
+    value = etree.XPath(expr)(etree.Element("x"))
+    assert header_styles._fmt(value) == _xpath_string(expr)
+
+
+def test_invalid_margin_does_not_crash():
+    para_pr = ET.fromstring(f'<hh:paraPr xmlns:hh="{HH}" id="3"><hh:margin>'
+                            f'<hc:left xmlns:hc="http://www.hancom.co.kr/hwpml/2011/core" value="x" />'
+                            f'</hh:margin></hh:paraPr>')
+    assert "margin-left: NaN" in header_styles.paragraph_style(para_pr, "3")
+
+
+def test_css_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(header_styles, "_css_cache", header_styles.OrderedDict())
+    monkeypatch.setattr(header_styles, "CSS_CACHE_SIZE", 4)
+    root = ET.fromstring(f'<hh:head xmlns:hh="{HH}" />')
+    errors = []
+
+    def work(n):
+        try:
+            for i in range(200):
+                header_styles.get_header_css(f"{n}-{i % 8}".encode(), root)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(header_styles._css_cache) == 4
+
+
+# header_styles 도입 전 hwpx_to_html.xslt의 hp:run 인라인 스타일 규칙
+_LEGACY_CHAR_XSLT = f"""
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform" xmlns:hh="{HH}">
+    <xsl:output method="text" />
+    <xsl:template match="/">
+        <xsl:variable name="charPr" select="hh:charPr" />
+        <xsl:if test="$charPr/hh:bold or $charPr/@bold">font-weight: bold; </xsl:if>
+        <xsl:if test="$charPr/hh:underline and $charPr/hh:underline/@type != 'NONE'">text-decoration: underline; </xsl:if>
+        <xsl:if test="$charPr/@height">font-size: <xsl:value-of select="number($charPr/@height) div 100" />pt; </xsl:if>
+    </xsl:template>
+</xsl:stylesheet>
+"""
+
+
+@pytest.mark.parametrize("body", [
+    '<hh:underline />',
+    '<hh:underline type="NONE" />',
+    '<hh:underline type="BOTTOM" shape="SOLID" />',
+    '<hh:underline type="NONE" /><hh:underline type="BOTTOM" />',
+    '<hh:underline shape="SOLID" /><hh:underline type="NONE" />',
+    '<hh:bold />',
+    '',
+])
+@pytest.mark.parametrize("attrs", ['', 'height="1000"', 'height="950" bold="1"', 'height="x"'])
+def test_char_style_matches_legacy_xslt(body, attrs):
+    xml = f'<hh:charPr xmlns:hh="{HH}" id="1" {attrs}>{body}</hh:charPr>'
+    expected = str(etree.XSLT(etree.fromstring(_LEGACY_CHAR_XSLT))(etree.fromstring(xml)))
+
+    assert header_styles.char_style(ET.fromstring(xml)) == expected.strip()
+
+
+def test_fmt_matches_xpath_string():
+    rng = random.Random(18)
+    values = [301 / 33, 1000 / 33, -2624 / 33, 0.1, 1e9, 1e9 + 0.5, 1e-5, 9.99e-6, 2 ** 31 - 1, 2 ** 31, -2 ** 31,
+              1e21, 5e-324, -0.0]
+    values += [rng.randint(-100000, 100000) / rng.choice([33, 100, 7]) for _ in range(2000)]
+    values += [rng.uniform(-1, 1) * 10 ** rng.randint(-12, 14) for _ in range(2000)]
+    to_string = etree.XPath("string($value)")
+    for value in values:
+        assert header_styles._fmt(value) == to_string(etree.Element("x"), value=value), value
+
+
+# header_styles 도입 전 hwpx_to_html.xslt의 hp:p/hp:run 템플릿 (스타일 계산 부분 그대로)
+_LEGACY_XSLT = f"""
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform" xmlns:hh="{HH}"
+    xmlns:hp="{header_styles.HP_NS}" exclude-result-prefixes="hp hh">
+    <xsl:param name="header_path" />
+    <xsl:template match="/"><out><xsl:apply-templates select="//hp:p" /></out></xsl:template>
+    <xsl:template match="hp:p">
+        <xsl:variable name="pId" select="@paraPrIDRef" />
+        <xsl:variable name="paraPr" select="document($header_path)//hh:paraPr[@id=$pId]" />
+        <xsl:variable name="alignNode"
+            select="($paraPr//hp:default//hh:align | $paraPr//hh:align[not(ancestor::hp:switch)])[1]" />
+        <xsl:variable name="marginNode"
+            select="($paraPr//hp:default//hh:margin | $paraPr//hh:margin[not(ancestor::hp:switch)])[1]" />
+        <xsl:variable name="align">
+            <xsl:choose>
+                <xsl:when test="$pId = '15'">right</xsl:when>
+                <xsl:when test="$alignNode/@horizontal = 'CENTER'">center</xsl:when>
+                <xsl:when test="$alignNode/@horizontal = 'RIGHT'">right</xsl:when>
+                <xsl:when test="$alignNode/@horizontal = 'JUSTIFY'">justify</xsl:when>
+                <xsl:otherwise>left</xsl:otherwise>
+            </xsl:choose>
+        </xsl:variable>
+        <xsl:variable name="lVal">
+            <xsl:choose>
+                <xsl:when test="$marginNode/*[local-name()='left']/@value">
+                    <xsl:value-of select="number($marginNode/*[local-name()='left']/@value)" />
+                </xsl:when>
+                <xsl:otherwise>0</xsl:otherwise>
+            </xsl:choose>
+        </xsl:variable>
+        <xsl:variable name="iVal">
+            <xsl:choose>
+                <xsl:when test="$marginNode/*[local-name()='intent']/@value">
+                    <xsl:value-of select="number($marginNode/*[local-name()='intent']/@value)" />
+                </xsl:when>
+                <xsl:otherwise>0</xsl:otherwise>
+            </xsl:choose>
+        </xsl:variable>
+        <xsl:variable name="left" select="$lVal div 33" />
+        <xsl:variable name="intent" select="$iVal div 33" />
+        <xsl:variable name="finalLeft" select="$left + $intent" />
+        <xsl:variable name="finalIndent" select="-1 * $intent" />
+        <p id="{{$pId}}"
+            style="text-align: {{$align}}; margin-left: {{$finalLeft}}pt; text-indent: {{$finalIndent}}pt; line-height: 1.6; word-break: break-all;">
+            <xsl:apply-templates select="hp:run" />
+        </p>
+    </xsl:template>
+    <xsl:template match="hp:run">
+        <xsl:variable name="cId" select="@charPrIDRef" />
+        <xsl:variable name="charPr" select="document($header_path)//hh:charPr[@id=$cId]" />
+        <xsl:variable name="cStyle">
+            <xsl:if test="$charPr/hh:bold or $charPr/@bold">font-weight: bold; </xsl:if>
+            <xsl:if test="$charPr/hh:underline and $charPr/hh:underline/@type != 'NONE'">text-decoration: underline; </xsl:if>
+            <xsl:if test="$charPr/@height">font-size: <xsl:value-of select="number($charPr/@height) div 100" />pt; </xsl:if>
+        </xsl:variable>
+        <span id="{{$cId}}" style="{{$cStyle}}" />
+    </xsl:template>
+</xsl:stylesheet>
+"""
+
+
+def _random_header(rng, count):
+    """여백/들여쓰기/글자 크기 값이 다양한 header.xml (hp:switch 안팎의 margin 포함)"""
+    values = ["0", "301", "-2624", "150", "12.5", "1.23456789012345678", "1e3", "-7.25", "x", "", "99999999999", "0.0001"]
+    parts = []
+    for i in range(count):
+        def margin():
+            left = rng.choice(values + [None])
+            intent = rng.choice(values + [None])
+            children = "".join(f'<hc:{name} value="{value}" unit="HWPUNIT" />'
+                               for name, value in (("intent", intent), ("left", left)) if value is not None)
+            return f"<hh:margin>{children}</hh:margin>"
+
+        align = f'<hh:align horizontal="{rng.choice(["LEFT", "CENTER", "RIGHT", "JUSTIFY"])}" />'
+        if rng.random() < 0.5:
+            body = f"{align}<hp:switch><hp:case>{margin()}</hp:case><hp:default>{margin()}</hp:default></hp:switch>"
+        else:
+            body = align + margin()
+        parts.append(f'<hh:paraPr id="{i}">{body}</hh:paraPr>')
+        height = rng.choice(["1000", "950", "1234", "1", "x", None])
+        attrs = f' height="{height}"' if height is not None else ""
+        parts.append(f'<hh:charPr id="{i}"{attrs}>{"<hh:bold />" if rng.random() < 0.3 else ""}</hh:charPr>')
+    return (f'<hh:head xmlns:hh="{HH}" xmlns:hp="{header_styles.HP_NS}" '
+            f'xmlns:hc="http://www.hancom.co.kr/hwpml/2011/core">{"".join(parts)}</hh:head>').encode("UTF-8")
+
+
+def _section_for(header_root):
+    ids = [p.get("id") for p in header_root.iter(f"{{{HH}}}paraPr")]
+    char_ids = [c.get("id") for c in header_root.iter(f"{{{HH}}}charPr")]
+    runs = "".join(f'<hp:run charPrIDRef="{cid}" />' for cid in char_ids)
+    paragraphs = "".join(f'<hp:p paraPrIDRef="{pid}">{runs}</hp:p>' for pid in ids)
+    return f'<hs:sec xmlns:hs="s" xmlns:hp="{header_styles.HP_NS}">{paragraphs}</hs:sec>'.encode("UTF-8")
+
+
+@pytest.mark.parametrize("source", ["sample", "random"])
+def test_header_css_matches_legacy_xslt(source, tmp_path):
+    if source == "sample":
+        header = (ROOT / "debug_text" / "Contents" / "header.xml").read_bytes()
+    else:
+        header = _random_header(random.Random(7), 60)
+    header_path = tmp_path / "header.xml"
+    header_path.write_bytes(header)
+    root = ET.fromstring(header)
+
+    transform = etree.XSLT(etree.fromstring(_LEGACY_XSLT))
+    out = transform(etree.fromstring(_section_for(root)), header_path=etree.XSLT.strparam(header_path.as_uri()))
+    css = dict(re.findall(r"\.((?:pp|cp)-[^ ]+) \{ (.*?) \}", header_styles.build_header_css(root)))
+
+    paragraphs = out.getroot().findall("p")
+    assert paragraphs
+    for p in paragraphs:
+        assert css[f"pp-{p.get('id')}"] == p.get("style")
+    for span in paragraphs[0].findall("span"):
+        assert css.get(f"cp-{span.get('id')}", "") == span.get("style").strip()
@@ -0,0 +1,74 @@
+import zipfile
+
+import pytest
+
+import synth_hwpx
+import hwpx_package
+
+MODS = [{"original": "해 촉 증 명 서", "modified": "위 촉 증 명 서"}]
+
+
+@pytest.fixture
+def template(tmp_path):
+    return synth_hwpx.generate_hwpx(str(tmp_path / "sections.hwpx"), paragraphs=20, sections=4)
+
+
+def _edit(path, output, **kwargs):
+    with hwpx_package.HWPXPackage(path, **kwargs) as package:
+        texts = list(package.iter_paragraph_texts())
+        assert all(package.update_sections_text(MODS))
+        package.save(output)
+        executor = package._executor
+    return texts, executor
+
+
+def test_etree_backend_defaults_to_sequential():
+    assert hwpx_package.section_worker_count(8, None, "etree") == 1
+    assert hwpx_package.section_worker_count(8, 3, "etree") == 3
+    assert hwpx_package.section_worker_count(2, 16, "lxml") == 2
+
+
+def test_parallel_sections_match_sequential(template, tmp_path):
+    serial, executor = _edit(template, str(tmp_path / "serial.hwpx"), section_workers=1)
+    assert executor is None
+
+    parallel, _ = _edit(template, str(tmp_path / "parallel.hwpx"), xml_backend="lxml", section_workers=3)
+
+    assert serial == parallel
+    assert (tmp_path / "serial.hwpx").read_bytes() == (tmp_path / "parallel.hwpx").read_bytes()
+
+
+def test_sections_share_one_executor(template, tmp_path, monkeypatch):
+    created = []
+    real = hwpx_package.ThreadPoolExecutor
+
+    def track(*args, **kwargs):
+        created.append(real(*args, **kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(hwpx_package, "ThreadPoolExecutor", track)
+    _edit(template, str(tmp_path / "out.hwpx"), section_workers=2)
+
+    assert len(created) == 1
+    assert created[0]._shutdown
+
+
+@pytest.mark.parametrize("backend", ["etree", "lxml"])
+def test_save_falls_back_when_paragraphs_cannot_be_spliced(template, tmp_path, backend):
+    # 주석 안의 문단 태그 때문에 문단 범위를 대응시킬 수 없는 섹션은 전체를 직렬화
+    source = str(tmp_path / "comment.hwpx")
+    with zipfile.ZipFile(template) as src, zipfile.ZipFile(source, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == "Contents/section0.xml":
+                data = data.replace(b"<hp:p ", b"<!-- <hp:p> --><hp:p ", 1)
+            dst.writestr(info, data)
+
+    expected, _ = _edit(template, str(tmp_path / "plain.hwpx"), xml_backend=backend)
+    texts, _ = _edit(source, str(tmp_path / "out.hwpx"), xml_backend=backend)
+    assert texts == expected
+    with hwpx_package.HWPXPackage(str(tmp_path / "out.hwpx")) as package:
+        edited = list(package.iter_paragraph_texts())
+    with hwpx_package.HWPXPackage(str(tmp_path / "plain.hwpx")) as package:
+        assert edited == list(package.iter_paragraph_texts())
+    assert any("위 촉 증 명 서" in text for text in edited)
@@ -0,0 +1,49 @@
+import re
+import zipfile
+
+import pytest
+
+import synth_hwpx
+import hwpx_package
+import html_renderer
+import image_cache
+
+
+def _without_cur_size(source, target):
+    """모든 hp:pic에서 curSz를 지운 사본 (표시 크기가 없는 그림)"""
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(target, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename.startswith("Contents/section"):
+                data = re.sub(rb"<hp:curSz[^>]*/>", b"", data)
+            dst.writestr(info, data)
+    return target
+
+
+@pytest.fixture
+def png():
+    return synth_hwpx.make_png(4096, synth_hwpx.random.Random(0))
+
+
+@pytest.mark.parametrize("size", [(None, None), (float("nan"), float("nan")), (0, 10), (-5, 10), (float("inf"), 10)])
+def test_prepare_keeps_original_without_target_size(png, size):
+    cache = image_cache.ImageCache()
+    assert image_cache.target_pixels(*size) is None
+    assert cache.prepare(png, *size) == (png, "image/png")
+
+
+@pytest.mark.parametrize("query", ["w=NaN&h=NaN", "w=0&h=10", "w=-1&h=10", "w=inf&h=10", "", "w=abc&h=1"])
+def test_query_size_rejects_invalid_sizes(query):
+    assert html_renderer.query_size(query) == (None, None)
+
+
+def test_preview_picture_without_cur_size(tmp_path):
+    source = synth_hwpx.generate_hwpx(str(tmp_path / "image.hwpx"), paragraphs=5, image_bytes=4096)
+    path = _without_cur_size(source, str(tmp_path / "no_cursz.hwpx"))
+
+    with hwpx_package.HWPXPackage(path, xml_backend="lxml") as package:
+        original = package.read(f"BinData/{synth_hwpx.IMAGE_ID}.png")
+        html = html_renderer.render_preview(package, asset_base="assets/", asset_dir=str(tmp_path / "assets"))
+
+    assert f"assets/BinData/{synth_hwpx.IMAGE_ID}.png".encode() in html
+    assert (tmp_path / "assets" / "BinData" / f"{synth_hwpx.IMAGE_ID}.png").read_bytes() == original
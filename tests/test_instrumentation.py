@@ -0,0 +1,39 @@
+import io
+import json
+import time
+import threading
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def records():
+    stream = io.StringIO()
+    instrumentation.enable([instrumentation.JSONLinesHook(stream)])
+    try:
+        yield lambda: [json.loads(line) for line in stream.getvalue().splitlines()]
+    finally:
+        instrumentation.disable()
+
+
+def _busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_stage_cpu_is_per_thread(records):
+    worker = threading.Thread(target=_busy, args=(0.2,))
+    with instrumentation.stage("wait"):
+        worker.start()
+        worker.join()
+    with instrumentation.stage("leaf"):
+        _busy(0.2)
+
+    wait, leaf = records()
+    # 다른 스레드가 쓴 CPU는 단계의 cpu에는 들어가지 않고 process_cpu에만 포함됨
+    assert wait["cpu_seconds"] < 0.1 <= wait["process_cpu_seconds"]
+    assert leaf["cpu_seconds"] >= 0.15
+    assert leaf["process_cpu_seconds"] >= leaf["cpu_seconds"] - 0.01
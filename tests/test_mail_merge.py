@@ -0,0 +1,49 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import synth_hwpx
+import xml_editor
+import mail_merge
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / "template.hwpx"
+    synth_hwpx.generate_hwpx(str(path), paragraphs=30)
+    return str(path)
+
+
+def _section_paragraphs(data):
+    return len(list(ET.fromstring(data).iter(xml_editor.HP_P_TAG)))
+
+
+def test_same_slot_keys_write_paragraph_once(template):
+    with mail_merge.FillPlan(template, use_cache=False) as plan:
+        section = plan.slots["주소지"].section
+        before = _section_paragraphs(plan.sections[section][0])
+        result = plan.render_sections({"주소지": "서울", "주 소 지": "부산"})
+
+    assert _section_paragraphs(result[section]) == before
+
+
+def test_two_fields_on_one_paragraph(template, tmp_path):
+    schema = tmp_path / "schema.json"
+    schema.write_text(json.dumps({"mappings": {"주소지": "주   소   지   :", "거주지": "주   소   지   :"}},
+                                 ensure_ascii=False), encoding="UTF-8")
+
+    with mail_merge.FillPlan(template, str(schema), use_cache=False) as plan:
+        first, second = plan.slots["주소지"], plan.slots["거주지"]
+        assert (first.section, first.p_index) == (second.section, second.p_index)
+        before = _section_paragraphs(plan.sections[first.section][0])
+        result = plan.render_sections({"주소지": "서울", "거주지": "부산"})
+
+    data = result[first.section]
+    assert _section_paragraphs(data) == before
+    assert data.count("주   소   지".encode()) == 1
+
+
+def test_splice_bytes_rejects_overlapping_pieces():
+    with pytest.raises(ValueError):
+        xml_editor.splice_bytes(b"0123456789", [(2, 5, b"x"), (2, 5, b"y")])
@@ -0,0 +1,25 @@
+import result_cache
+
+
+def test_result_key_covers_render_sources(tmp_path, monkeypatch):
+    for name in result_cache.RENDER_SOURCES:
+        (tmp_path / name).write_text("# v1\n", encoding="utf-8")
+    monkeypatch.setattr(result_cache, "_SOURCE_DIR", str(tmp_path))
+    source = b"hwpx"
+    base = result_cache.compute_result_key(source, [], image_dpi=200)
+
+    (tmp_path / "header_styles.py").write_text("# v2\n", encoding="utf-8")
+    changed = result_cache.compute_result_key(source, [], image_dpi=200)
+    assert changed != base
+    assert result_cache.compute_result_key(source, [], image_dpi=150) != changed
+
+
+def test_stats_counts_hits_and_misses(tmp_path):
+    hwpx = tmp_path / "a.hwpx"
+    hwpx.write_bytes(b"data")
+    cache = result_cache.ResultCache(str(tmp_path / "cache"))
+    assert cache.get("k", need_pdf=False) is None
+    assert cache.put("k", str(hwpx))
+    assert cache.get("k", need_pdf=False)["hwpx"].endswith(result_cache.HWPX_NAME)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
@@ -0,0 +1,101 @@
+import os
+import json
+import threading
+import asyncio
+import base64
+
+import pytest
+
+import server
+
+
+def _request(body, content_length="auto"):
+    head = "POST /process HTTP/1.1\r\nHost: localhost\r\n"
+    if content_length == "auto":
+        content_length = str(len(body))
+    if content_length is not None:
+        head += f"Content-Length: {content_length}\r\n"
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+def _dispatch(raw):
+    async def run():
+        state = server.HWPXServer(concurrency=1)
+        processed = []
+
+        async def process(hwpx_bytes, payload, outputs=None):
+            processed.append(outputs)
+            return {"hwpx": None}
+
+        state.process = process
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        try:
+            status, _, body = await state._dispatch(reader)
+        finally:
+            state.engine.close()
+        return status, json.loads(body), processed
+
+    return asyncio.run(run())
+
+
+def _body(**payload):
+    payload.setdefault("hwpx", base64.b64encode(b"PK").decode("ascii"))
+    return json.dumps(payload).encode()
+
+
+@pytest.mark.parametrize("outputs", [["docx"], ["hwpx", "xml"], [], "pdf", [["pdf"]], {"pdf": True}])
+def test_invalid_outputs_rejected_before_processing(outputs):
+    status, body, processed = _dispatch(_request(_body(outputs=outputs)))
+    assert status == 400 and "outputs" in body["error"]
+    assert processed == []
+
+
+@pytest.mark.parametrize("outputs, expected", [(None, ["hwpx", "pdf"]), (["html"], ["html"])])
+def test_valid_outputs(outputs, expected):
+    status, _, processed = _dispatch(_request(_body(outputs=outputs)))
+    assert status == 200
+    assert processed == [expected]
+
+
+@pytest.mark.parametrize("content_length", [None, "abc", "-1", "1.5", ""])
+def test_invalid_content_length(content_length):
+    status, body, processed = _dispatch(_request(_body(), content_length))
+    assert status == 400 and "Content-Length" in body["error"]
+    assert processed == []
+
+
+@pytest.mark.parametrize("data", ["/etc/passwd", "modify_data2.json", 3, True])
+def test_data_must_be_in_memory(data):
+    status, body, processed = _dispatch(_request(_body(data=data)))
+    assert status == 400 and "data" in body["error"]
+    assert processed == []
+
+
+def test_process_bytes_rejects_paths(tmp_path):
+    import engine
+
+    async def run():
+        async with engine.HWPXEngine(max_concurrency=1) as hwpx:
+            await hwpx.process_bytes(b"PK", str(tmp_path / "modify.json"))
+
+    with pytest.raises(TypeError):
+        asyncio.run(run())
+
+
+def test_warm_up_compiles_xslt_in_every_engine_thread():
+    import html_renderer
+
+    state = server.HWPXServer(concurrency=3)
+    try:
+        idents = state.engine.run_in_each_thread(threading.get_ident)
+        assert len(set(idents)) == 3
+
+        state.warm_up()
+        xslt_path = os.path.abspath(html_renderer.XSLT_PATH)
+        cached = state.engine.run_in_each_thread(
+            lambda: xslt_path in getattr(html_renderer._transform_cache, "transforms", {}))
+        assert cached == [True, True, True]
+    finally:
+        state.engine.close()
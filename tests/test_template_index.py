@@ -0,0 +1,101 @@
+import os
+import re
+import random
+
+import pytest
+
+import template_index
+
+
+def _key(i):
+    return f"{i:064x}"
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    (tmp_path / "learned_fingerprints-abc.json").write_text("{}", encoding="UTF-8")
+    for i in range(3):
+        template_index.save_index(_key(i), {"version": template_index.INDEX_VERSION}, cache_dir, max_entries=3)
+        os.utime(tmp_path / f"{_key(i)}.json", (1000 + i, 1000 + i))
+
+    assert template_index.load_index(_key(0), cache_dir) is not None  # 사용한 항목은 최근 항목이 됨
+    template_index.save_index(_key(3), {"version": template_index.INDEX_VERSION}, cache_dir, max_entries=3)
+
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        [f"{_key(i)}.json" for i in (0, 2, 3)] + ["learned_fingerprints-abc.json"])
+
+
+def test_unbounded_cache(tmp_path):
+    for i in range(5):
+        template_index.save_index(_key(i), {"version": template_index.INDEX_VERSION}, str(tmp_path), max_entries=None)
+    assert len(os.listdir(tmp_path)) == 5
+
+
+def _linear_resolve(all_text_lines, schema_mappings):
+    """기존(트라이 이전) 구현: 필드마다 전체 줄을 처음부터 훑는 첫 번째 매칭"""
+    resolved = {}
+    anchor_index = -1
+    for i, line in enumerate(all_text_lines):
+        if template_index.ANCHOR_TEXT in line.replace(" ", ""):
+            anchor_index = i
+            break
+
+    for field_key, label_pattern in schema_mappings.items():
+        found_index = None
+        if field_key == template_index.DATE_FIELD:
+            if anchor_index != -1:
+                for i in range(anchor_index + 1, len(all_text_lines)):
+                    line = all_text_lines[i]
+                    if re.search(template_index.DATE_PATTERN, line) and "~" not in line:
+                        found_index = i
+                        break
+            if found_index is None:
+                for i in range(len(all_text_lines) - 1, -1, -1):
+                    line = all_text_lines[i]
+                    if re.search(template_index.DATE_PATTERN, line) and "~" not in line:
+                        found_index = i
+                        break
+        else:
+            clean_label = label_pattern.replace(" ", "").strip()
+            for i, line in enumerate(all_text_lines):
+                if line.replace(" ", "").startswith(clean_label):
+                    found_index = i
+                    break
+        resolved[field_key] = found_index
+    return resolved
+
+
+def _random_text(rng, alphabet, max_len):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+
+
+@pytest.mark.parametrize("anchor", [template_index.ANCHOR_TEXT, template_index.ANCHOR_TEXT.replace(" ", "")])
+def test_resolver_matches_linear_first_match(anchor, monkeypatch):
+    # 두 구현 모두 공백을 지운 줄에서 ANCHOR_TEXT를 찾으므로, 공백 없는 Anchor로도 Anchor 이후 날짜 규칙을 검사
+    monkeypatch.setattr(template_index, "ANCHOR_TEXT", anchor)
+    rng = random.Random(20240917)
+    alphabet = "성명주소 \t가나"
+    pieces = [anchor, template_index.ANCHOR_TEXT, "위의 사실을", "2024년 3월 5일", "24년12월 1일", "2025 년 10 월 9 일",
+              "2023년 1월 2일 ~ 2024년 1월 2일", "년 월 일", "~", "성 명", "주 소"]
+
+    for _ in range(500):
+        labels = []
+        for _ in range(rng.randint(0, 6)):
+            if labels and rng.random() < 0.5:
+                # 다른 라벨의 접두어/확장 (트라이에서 겹치는 경로)
+                base = rng.choice(labels)
+                label = base[:rng.randint(0, len(base))] if rng.random() < 0.5 else base + _random_text(rng, alphabet, 3)
+            else:
+                label = _random_text(rng, alphabet, 4)
+            labels.append(label)
+        schema = {f"field{i}": label for i, label in enumerate(labels)}
+        if rng.random() < 0.7:
+            schema[template_index.DATE_FIELD] = "작성날짜"
+
+        lines = []
+        for _ in range(rng.randint(0, 12)):
+            parts = [rng.choice(pieces) if rng.random() < 0.6 else _random_text(rng, alphabet, 6)
+                     for _ in range(rng.randint(1, 3))]
+            lines.append(" ".join(parts) if rng.random() < 0.5 else "".join(parts))
+
+        assert template_index.resolve_schema_mappings(lines, schema) == _linear_resolve(lines, schema), (lines, schema)
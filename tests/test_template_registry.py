@@ -0,0 +1,80 @@
+import os
+import shutil
+
+import pytest
+
+import synth_hwpx
+import hwpx_package
+import template_index
+import template_registry
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    path = tmp_path / "templates"
+    path.mkdir()
+    shutil.copy(os.path.join(ROOT_DIR, "master_template.json"), path / "certificate.json")
+    return str(path)
+
+
+@pytest.fixture
+def document(tmp_path):
+    return synth_hwpx.generate_hwpx(str(tmp_path / "doc.hwpx"), paragraphs=10)
+
+
+def test_learned_fingerprints_go_to_state_dir(template_dir, document, tmp_path):
+    state_dir = str(tmp_path / "state")
+    registry = template_registry.TemplateRegistry(template_dir, state_dir=state_dir)
+    with hwpx_package.HWPXPackage(document) as package:
+        assert registry.route(package).name == "certificate"
+
+    assert os.listdir(template_dir) == ["certificate.json"]
+    assert os.path.exists(registry.learned_path)
+    assert os.path.dirname(registry.learned_path) == state_dir
+
+
+def test_cached_route_skips_scan(template_dir, document, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    registry = template_registry.TemplateRegistry(template_dir, state_dir=cache_dir)
+    with hwpx_package.HWPXPackage(document) as package:
+        first = registry.route(package, document, cache_dir)
+
+    def no_scan(package):
+        raise AssertionError("캐시된 라우팅 결과가 있으면 문서를 스캔하지 않아야 합니다")
+
+    monkeypatch.setattr(template_index, "scan_text_lines", no_scan)
+    with hwpx_package.HWPXPackage(document) as package:
+        assert registry.route(package, document, cache_dir) is first
+
+
+def test_fingerprint_route_reads_only_label_section(template_dir, tmp_path, monkeypatch):
+    document = synth_hwpx.generate_hwpx(str(tmp_path / "sections.hwpx"), paragraphs=10, sections=4)
+    registry = template_registry.TemplateRegistry(template_dir, state_dir=str(tmp_path / "state"))
+    with hwpx_package.HWPXPackage(document) as package:
+        first = registry.route(package)
+        fingerprint = template_registry.compute_fingerprint(package)
+
+    def no_scan(package):
+        raise AssertionError("학습된 지문이면 문서 전체를 스캔하지 않아야 합니다")
+
+    monkeypatch.setattr(template_index, "scan_text_lines", no_scan)
+    with hwpx_package.HWPXPackage(document) as package:
+        assert registry.route(package) is first
+        # 라벨은 첫 섹션에만 있으므로 첫 섹션만 읽음
+        assert list(package._paragraph_texts) == package.section_names[:1]
+        assert template_registry.compute_fingerprint(package) == fingerprint
+
+
+def test_fingerprint_ignores_filled_values(template_dir, tmp_path):
+    blank = synth_hwpx.generate_hwpx(str(tmp_path / "blank.hwpx"), paragraphs=10, sections=2)
+    filled = synth_hwpx.generate_hwpx(str(tmp_path / "filled.hwpx"), paragraphs=10, sections=2, seed=5)
+    with hwpx_package.HWPXPackage(filled) as package:
+        assert package.update_sections_text([{"original": "테스트", "modified": "홍길동"}])[0]
+        package.save(str(tmp_path / "filled_edit.hwpx"))
+    fingerprints = []
+    for path in (blank, str(tmp_path / "filled_edit.hwpx")):
+        with hwpx_package.HWPXPackage(path) as package:
+            fingerprints.append(template_registry.compute_fingerprint(package))
+    assert fingerprints[0] == fingerprints[1]
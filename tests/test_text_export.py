@@ -0,0 +1,51 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import synth_hwpx
+import text_export
+
+
+@pytest.fixture
+def archive(tmp_path):
+    document = synth_hwpx.generate_hwpx(str(tmp_path / "doc.hwpx"), paragraphs=5)
+    path = str(tmp_path / "docs.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(5):
+            zf.write(document, f"folder/doc{i}.hwpx")
+    return path
+
+
+@pytest.fixture
+def opened(archive, monkeypatch):
+    """archive를 연 횟수"""
+    opened = []
+    real = zipfile.ZipFile
+
+    class CountingZipFile(real):
+        def __init__(self, file, *args, **kwargs):
+            if file == archive:
+                opened.append(file)
+            super().__init__(file, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile, "ZipFile", CountingZipFile)
+    return opened
+
+
+def test_export_opens_archive_once(archive, opened):
+    output = io.StringIO()
+    ok, failed, _ = text_export.export_texts([archive], output, workers=1)
+
+    assert (ok, failed) == (5, 0)
+    assert len({json.loads(line)["doc_id"] for line in output.getvalue().splitlines()}) == 5
+    assert len(opened) == 2  # 멤버 목록 1번 + 추출 1번
+
+
+def test_chunk_opens_archive_once(archive, opened):
+    tasks = [(*doc, False) for doc in text_export.iter_documents([archive])]
+    results = text_export._extract_chunk(tasks)
+
+    assert [error for *_, error in results] == [None] * 5
+    assert len(opened) == 2
@@ -0,0 +1,175 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import xml_editor
+
+HP = "http://www.hancom.co.kr/hwpml/2011/paragraph"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+MODS = [{"original": "홍길동", "modified": "김철수"}]
+
+SECTION = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>'
+    f'<hs:sec xmlns:hs="http://www.hancom.co.kr/hwpml/2011/section" xmlns:hp="{HP}">'
+    '<hp:p id="1" xml:space="preserve"><hp:run><hp:t>성  명 : 홍길동</hp:t></hp:run></hp:p>'
+    '<hp:p id="2"><hp:run><hp:t>주소 : 서울</hp:t></hp:run></hp:p>'
+    '</hs:sec>'
+).encode("UTF-8")
+
+
+def _check(data):
+    assert b"xmlns:xml" not in data
+    assert b"ns0:" not in data
+    root = ET.fromstring(data)
+    assert next(root.iter(xml_editor.HP_P_TAG)).get(XML_SPACE) == "preserve"
+    return [t.text for t in root.iter(f"{{{HP}}}t")]
+
+
+def test_stream_update_keeps_xml_prefix():
+    dest = io.BytesIO()
+    modified = xml_editor.update_xml_stream(io.BytesIO(SECTION), dest, MODS)
+
+    assert modified
+    assert _check(dest.getvalue()) == ["성  명 : 김철수", "주소 : 서울"]
+
+
+def test_splice_keeps_xml_prefix():
+    root = ET.fromstring(SECTION)
+    paragraphs = list(root.iter(xml_editor.HP_P_TAG))
+    assert xml_editor.modify_paragraph(paragraphs[0], MODS)
+
+    data = xml_editor.splice_paragraphs(SECTION, paragraphs, [paragraphs[0]])
+
+    assert data is not None
+    assert _check(data) == ["성  명 : 김철수", "주소 : 서울"]
+
+
+def _sequential_replace(text, modifications):
+    """기존 방식: 규칙마다 순서대로 str.replace (앞 규칙의 결과에 다음 규칙이 다시 적용될 수 있음)"""
+    for mod in modifications:
+        orig = mod.get("original", "").strip()
+        if orig and orig in text:
+            text = text.replace(orig, mod.get("modified", "").strip())
+    return text
+
+
+def _mods(*pairs):
+    return [{"original": original, "modified": modified} for original, modified in pairs]
+
+
+@pytest.mark.parametrize("pairs, expected", [
+    ((("성명", "이름"), ("성명 :", "이름:")), "이름 : 홍길동"),
+    ((("성명 :", "이름:"), ("성명", "이름")), "이름: 홍길동"),
+])
+def test_matcher_earlier_rule_wins_at_same_position(pairs, expected):
+    mods = _mods(*pairs)
+    text = "성명 : 홍길동"
+    assert xml_editor.ReplacementMatcher(mods).apply(text) == (expected, True)
+    assert _sequential_replace(text, mods) == expected
+
+
+def test_matcher_overlapping_originals():
+    text = "가나다 가나다"
+    # 왼쪽에서 먼저 시작하는 규칙이 이기는 경우는 순차 치환과 같음
+    mods = _mods(("가나", "A"), ("나다", "B"))
+    assert xml_editor.ReplacementMatcher(mods).apply(text) == ("A다 A다", True)
+    assert _sequential_replace(text, mods) == "A다 A다"
+
+    # 규칙 순서와 관계없이 왼쪽부터 겹치지 않게 치환 (순차 치환은 뒤 규칙이 앞 규칙을 가로챔)
+    mods = _mods(("나다", "B"), ("가나", "A"))
+    assert xml_editor.ReplacementMatcher(mods).apply(text) == ("A다 A다", True)
+    assert _sequential_replace(text, mods) == "가B 가B"
+
+    # 한 규칙의 결과는 다시 치환하지 않음 (순차 치환은 연쇄 치환)
+    mods = _mods(("가", "나"), ("나", "다"))
+    assert xml_editor.ReplacementMatcher(mods).apply("가나") == ("나다", True)
+    assert _sequential_replace("가나", mods) == "다다"
+
+
+@pytest.mark.parametrize("original", ["(주)한글", "1.5*2+3?", "[별표] $100", "^a|b$", r"C:\d\w", "{1,2}"])
+def test_matcher_escapes_regex_metacharacters(original):
+    mods = _mods((original, "X"), ("없는.*규칙", "Y"))
+    text = f"앞 {original} 뒤 {original}"
+    assert xml_editor.ReplacementMatcher(mods).apply(text) == ("앞 X 뒤 X", True)
+    assert _sequential_replace(text, mods) == "앞 X 뒤 X"
+    assert xml_editor.ReplacementMatcher(mods).apply("1x5-2 없는 규칙") == ("1x5-2 없는 규칙", False)
+
+
+def test_matcher_agrees_with_sequential_replace_without_overlaps():
+    mods = _mods(("홍길동", "김철수"), ("서울", "부산"), ("  ", " "), ("2024", "2025"))
+    for text in ["성  명 : 홍길동", "주소 : 서울 서울", "2024년 홍길동", "해당 없음", ""]:
+        expected = _sequential_replace(text, mods)
+        assert xml_editor.ReplacementMatcher(mods).apply(text) == (expected, expected != text)
+
+
+# 공백/따옴표/빈 요소 표기가 ElementTree 직렬화와 다른 원본 (다시 직렬화하면 바이트가 달라지는 부분)
+RAW_SECTION = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\r\n"
+    f"<hs:sec xmlns:hs='http://www.hancom.co.kr/hwpml/2011/section'   xmlns:hp='{HP}'>\r\n"
+    "  <hp:p id='1' ><hp:run charPrIDRef = '0'><hp:t>주소 : 서울</hp:t></hp:run><hp:run/></hp:p>\r\n"
+    "  <hp:p id='2'><hp:run><hp:t>성  명 : 홍길동</hp:t></hp:run></hp:p>\r\n"
+    "  <hp:p id='3' ><hp:run><hp:t>전화 &#x31;</hp:t></hp:run><hp:linesegarray /></hp:p>\r\n"
+    "</hs:sec>\r\n"
+).encode("UTF-8")
+
+
+def test_splice_keeps_untouched_bytes():
+    root = ET.fromstring(RAW_SECTION)
+    paragraphs = list(root.iter(xml_editor.HP_P_TAG))
+    assert xml_editor.modify_paragraph(paragraphs[1], MODS)
+
+    data = xml_editor.splice_paragraphs(RAW_SECTION, paragraphs, [paragraphs[1]])
+    start, end = xml_editor.find_paragraph_ranges(RAW_SECTION, "hp:p")[1]
+    assert data.startswith(RAW_SECTION[:start])
+    assert data.endswith(RAW_SECTION[end:])
+    assert [t.text for t in ET.fromstring(data).iter(f"{{{HP}}}t")] == ["주소 : 서울", "성  명 : 김철수", "전화 1"]
+
+    # 수정한 문단이 없으면 원본 그대로
+    assert xml_editor.splice_paragraphs(RAW_SECTION, paragraphs, []) == RAW_SECTION
+
+
+def test_splice_bytes_rejects_overlapping_ranges():
+    data = b"0123456789"
+    assert xml_editor.splice_bytes(data, [(1, 3, b"ab"), (3, 5, b"cd")]) == b"0abcd56789"
+    with pytest.raises(ValueError):
+        xml_editor.splice_bytes(data, [(1, 4, b"ab"), (3, 5, b"cd")])
+    with pytest.raises(ValueError):
+        xml_editor.splice_bytes(data, [(1, 3, b"ab"), (1, 3, b"ab")])
+    with pytest.raises(ValueError):
+        xml_editor.splice_bytes(data, [(5, 3, b"ab")])
+
+
+def test_splice_falls_back_to_full_serialization(tmp_path):
+    # 주석 안의 태그 때문에 원본 위치와 트리를 대응시킬 수 없는 경우
+    source = SECTION.replace(b"<hp:p id=\"1\"", b"<!-- <hp:p id=\"0\"> --><hp:p id=\"1\"", 1)
+    root = ET.fromstring(source)
+    paragraphs = list(root.iter(xml_editor.HP_P_TAG))
+    assert xml_editor.modify_paragraph(paragraphs[0], MODS)
+    assert xml_editor.splice_paragraphs(source, paragraphs, [paragraphs[0]]) is None
+
+    path = tmp_path / "section0.xml"
+    path.write_bytes(source)
+    assert xml_editor.update_xml_text_content(str(path), MODS)
+    assert _check(path.read_bytes()) == ["성  명 : 김철수", "주소 : 서울"]
+
+    # UTF-8이 아닌 문서도 전체 직렬화
+    latin = b'<?xml version="1.0" encoding="ISO-8859-1"?>' + SECTION[SECTION.index(b"?>") + 2:]
+    assert xml_editor.splice_paragraphs(latin, paragraphs, [paragraphs[0]]) is None
+
+
+def test_serializer_keeps_comments_and_their_tails():
+    from lxml import etree
+
+    source = SECTION.replace("<hp:t>주소 : 서울</hp:t>".encode("UTF-8"),
+                             "<hp:t>주소 : 서울</hp:t><!-- 메모 -->뒤 텍스트<?hwp keep?>끝".encode("UTF-8"))
+    root = etree.fromstring(source)
+    paragraphs = list(root.iter(xml_editor.HP_P_TAG))
+    ns_decls = xml_editor.read_namespace_decls(source)
+
+    data = xml_editor.serialize_element(paragraphs[1], ns_decls)
+    assert data == ("<hp:p id=\"2\"><hp:run><hp:t>주소 : 서울</hp:t><!-- 메모 -->뒤 텍스트"
+                    "<?hwp keep?>끝</hp:run></hp:p>").encode("UTF-8")
+
+    # 전체를 다시 쓴 문단도 lxml 직렬화와 같은 내용
+    assert xml_editor.splice_paragraphs(source, paragraphs, paragraphs) == source
@@ -0,0 +1,77 @@
+import zipfile
+
+import pytest
+
+import synth_hwpx
+import xml_repacker
+
+META_FIELDS = ("filename", "date_time", "compress_type", "comment", "extra", "create_system", "create_version",
+               "extract_version", "flag_bits", "volume", "internal_attr", "external_attr", "header_offset",
+               "CRC", "compress_size", "file_size")
+
+
+def _writestr_repack(source, output, replaced=None):
+    """기존 방식: 모든 멤버를 읽어 ZipFile.writestr로 다시 압축 (mimetype 먼저)"""
+    replaced = replaced or {}
+    with zipfile.ZipFile(source) as src:
+        members = [(info.filename, replaced.get(info.filename) or src.read(info))
+                   for info in src.infolist() if not info.is_dir()]
+    members.sort(key=lambda m: m[0] != "mimetype")
+    with zipfile.ZipFile(output, "w") as zf:
+        for name, data in members:
+            zf.writestr(xml_repacker._make_zinfo(name), data)
+    return output
+
+
+def _metadata(path):
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        return [tuple(getattr(info, field) for field in META_FIELDS) for info in zf.infolist()]
+
+
+@pytest.fixture
+def source(tmp_path):
+    # 생성기 출력에는 폴더 항목이 있으므로 writestr로 한 번 다시 묶은 것을 원본으로 사용
+    synth = synth_hwpx.generate_hwpx(str(tmp_path / "synth.hwpx"), paragraphs=20, sections=2,
+                                     image_bytes=64 * 1024)
+    return _writestr_repack(synth, str(tmp_path / "source.hwpx"))
+
+
+def test_raw_copy_matches_writestr_repack(source, tmp_path):
+    baseline = _writestr_repack(source, str(tmp_path / "baseline.hwpx"))
+    raw = str(tmp_path / "raw.hwpx")
+    assert xml_repacker.repackage_incremental(source, raw)
+
+    assert _metadata(raw) == _metadata(baseline)
+    with open(raw, "rb") as a, open(baseline, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_replaced_member_matches_writestr_repack(source, tmp_path):
+    with zipfile.ZipFile(source) as zf:
+        data = zf.read("Contents/section1.xml").replace("해 촉".encode(), "위 촉".encode())
+    replaced = {"Contents/section1.xml": data}
+    baseline = _writestr_repack(source, str(tmp_path / "baseline.hwpx"), replaced)
+    raw = str(tmp_path / "raw.hwpx")
+    assert xml_repacker.repackage_incremental(source, raw, replaced)
+
+    assert _metadata(raw) == _metadata(baseline)
+    with zipfile.ZipFile(raw) as zf:
+        assert zf.read("Contents/section1.xml") == data
+
+
+def test_raw_copy_with_shared_source(source, monkeypatch):
+    # raw 복사 도중 같은 ZipFile을 다른 곳에서 읽어도 복사되는 바이트가 섞이지 않는지
+    monkeypatch.setattr(xml_repacker, "STREAM_CHUNK_SIZE", 512)
+    with zipfile.ZipFile(source) as src:
+        info = src.getinfo("BinData/image1.png")
+        zinfo, chunks = xml_repacker._raw_member(info.filename, src, info)
+        payload = b""
+        for chunk in chunks:
+            payload += chunk
+            src.read("Contents/section0.xml")
+        with open(source, "rb") as f:
+            f.seek(info.header_offset)
+            f.read(30 + len(info.filename.encode()) + len(info.extra))
+            assert payload == f.read(info.compress_size)
+    assert zinfo.CRC == info.CRC
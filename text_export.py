@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import logging
+import zipfile
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import hwpx_package
+
+logger = logging.getLogger(__name__)
+
+# 워커에 한 번에 넘기는 문서 수 (작은 문서가 많을 때 프로세스 간 통신 비용을 줄임)
+CHUNK_SIZE = 16
+# 워커마다 동시에 맡겨 둘 묶음 수 (출력 순서를 지키면서 대기 메모리를 제한)
+IN_FLIGHT_PER_WORKER = 4
+# 아카이브 안 문서 id 구분자: "archive.zip!/폴더/문서.hwpx"
+ARCHIVE_SEPARATOR = "!/"
+
+
+def iter_documents(sources):
+    """
+    추출 대상 문서를 순회합니다: (문서 id, 컨테이너 경로, 아카이브 내 멤버 이름 또는 None)
+    - .hwpx 파일: 그대로
+    - 폴더: 하위 폴더까지 *.hwpx 전부 (문서 id는 폴더 기준 상대 경로)
+    - .zip 아카이브: 안에 든 *.hwpx 멤버 전부 (디스크에 풀지 않음)
+    """
+    for source in sources:
+        if os.path.isdir(source):
+            for dir_path, dir_names, file_names in os.walk(source):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    path = os.path.join(dir_path, file_name)
+                    if file_name.lower().endswith(".hwpx"):
+                        yield os.path.relpath(path, source).replace(os.sep, "/"), path, None
+                    elif file_name.lower().endswith(".zip"):
+                        yield from _iter_archive(path)
+        elif source.lower().endswith(".zip"):
+            yield from _iter_archive(source)
+        else:
+            yield source, source, None
+
+
+def _iter_archive(archive_path):
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [info.filename for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith(".hwpx")]
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.error(f"아카이브를 열 수 없습니다 ({archive_path}): {e}")
+        return
+    for member in members:
+        yield f"{archive_path}{ARCHIVE_SEPARATOR}{member}", archive_path, member
+
+
+def extract_document(doc_id, path, member=None, keep_empty=False, archive=None):
+    """
+    (워커) 문서 1건의 문단 텍스트를 JSONL 문자열로 만듭니다.
+    섹션 XML은 zip에서 바로 스트리밍(iterparse)으로 읽으므로 섹션 크기와 무관하게 메모리가 일정합니다.
+    archive: 이미 열어 둔 path의 ZipFile (없으면 멤버를 읽을 때 직접 열고 닫음)
+    반환값: (문서 id, JSONL 문자열, 문단 수, 오류 메시지 또는 None)
+    """
+    try:
+        if member is None:
+            source = path
+        elif archive is not None:
+            source = archive.read(member)
+        else:
+            with zipfile.ZipFile(path) as archive:
+                source = archive.read(member)
+
+        lines = []
+        with hwpx_package.HWPXPackage(source, streaming_threshold=0) as package:
+            for section_name, p_index, text in package.iter_paragraph_texts():
+                if not keep_empty and not text.strip():
+                    continue
+                section = int(hwpx_package.SECTION_PATTERN.match(section_name).group(1))
+                lines.append(json.dumps({"doc_id": doc_id, "section": section, "paragraph": p_index, "text": text},
+                                        ensure_ascii=False))
+        return doc_id, "".join(line + "\n" for line in lines), len(lines), None
+    except Exception as e:
+        return doc_id, "", 0, f"{type(e).__name__}: {e}"
+
+
+def _open_archive(path):
+    try:
+        return zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile):
+        return None  # 멤버마다 extract_document가 다시 열어 보고 오류를 기록
+
+
+def _extract_tasks(tasks):
+    """
+    (워커) 문서들을 순서대로 추출합니다.
+    iter_documents는 한 아카이브의 멤버를 연달아 내보내므로, 아카이브는 바뀔 때만 한 번씩 엽니다.
+    (멤버마다 zip을 다시 열면 중앙 디렉토리를 매번 읽어 멤버 수의 제곱에 비례하는 비용이 듬)
+    """
+    archive = archive_path = None
+    try:
+        for doc_id, path, member, keep_empty in tasks:
+            if member is not None and path != archive_path:
+                if archive is not None:
+                    archive.close()
+                archive, archive_path = _open_archive(path), path
+            yield extract_document(doc_id, path, member, keep_empty, archive if member is not None else None)
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def _extract_chunk(tasks):
+    return list(_extract_tasks(tasks))
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_texts(sources, output, workers=None, keep_empty=False):
+    """
+    sources의 모든 HWPX 문단 텍스트를 output(텍스트 스트림)에 JSONL로 씁니다.
+    문서 단위로 프로세스 풀에 나눠 처리하고, 결과는 입력 순서대로 기록합니다.
+    반환값: (성공 문서 수, 실패 문서 수, 문단 수)
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = ((doc_id, path, member, keep_empty) for doc_id, path, member in iter_documents(sources))
+    ok = failed = paragraphs = 0
+
+    def write(result):
+        nonlocal ok, failed, paragraphs
+        doc_id, text, count, error = result
+        if error:
+            failed += 1
+            logger.error(f"[실패] {doc_id}: {error}")
+            return
+        output.write(text)
+        ok += 1
+        paragraphs += count
+
+    if workers == 1:
+        for result in _extract_tasks(tasks):
+            write(result)
+        return ok, failed, paragraphs
+
+    # 전체 목록을 한꺼번에 제출하지 않고 일정 개수만 대기시켜 수십만 건에서도 메모리를 제한
+    window = workers * IN_FLIGHT_PER_WORKER
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunked(tasks, CHUNK_SIZE):
+            pending.append(pool.submit(_extract_chunk, chunk))
+            if len(pending) >= window:
+                for result in pending.popleft().result():
+                    write(result)
+        for future in pending:
+            for result in future.result():
+                write(result)
+    return ok, failed, paragraphs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HWPX 문단 텍스트 일괄 추출 (검색 색인용 JSONL)")
+    parser.add_argument("sources", nargs="+", help="HWPX 파일, 폴더(하위 포함) 또는 HWPX가 든 .zip 아카이브")
+    parser.add_argument("-o", "--output", help="출력 JSONL 경로 (기본: 표준 출력)")
+    parser.add_argument("--workers", type=int, help="워커 프로세스 수 (기본값: CPU 수, 1이면 단일 프로세스)")
+    parser.add_argument("--keep-empty", action="store_true", help="빈 문단도 출력")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s", stream=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as output:
+            ok, failed, paragraphs = export_texts(args.sources, output, args.workers, args.keep_empty)
+    else:
+        ok, failed, paragraphs = export_texts(args.sources, sys.stdout, args.workers, args.keep_empty)
+    logger.info(f"텍스트 추출 완료: 문서 {ok}건 성공, {failed}건 실패, 문단 {paragraphs}개")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,12 @@ import os
 import re
 def load_json_replacements(json_source, is_file=True):
     """
-    JSON 소스(파일 경로 또는 문자열)에서 치환 규칙을 로드합니다.
+    JSON 소스(파일 경로 또는 문자열, 이미 읽은 dict/list)에서 치환 규칙을 로드합니다.
     """
     try:
-        if is_file:
+        if isinstance(json_source, (dict, list)):
+            data = json_source  # 메모리의 치환 데이터 (엔진/서버 요청): 파일 경로로 해석하지 않음
+        elif is_file:
             if not os.path.exists(json_source):
                 print(f"[!] JSON 파일을 찾을 수 없습니다: {json_source}")
                 return []
@@ -10,6 +10,8 @@ import re
 import json
 import xml.etree.ElementTree as ET
 
+import instrumentation
+
 # logging
 logger = logging.getLogger(__name__)
 
@@ -39,8 +41,11 @@ async def extract_hwpx_file(hwpx_path: str, output_xml_dir: str) -> bool:
         def _extract():
             with zipfile.ZipFile(hwpx_path, "r") as zf:
                 zf.extractall(output_dir)
+                return sum(info.file_size for info in zf.infolist())
 
-        await asyncio.to_thread(_extract)
+        with instrumentation.stage("extract", file=file_name) as rec:
+            written = await asyncio.to_thread(_extract)
+            rec.add_bytes(read=os.path.getsize(hwpx_path), written=written)
 
         logger.info(f"'{file_name}' 압축 해제 완료!")
         return True
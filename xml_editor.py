@@ -3,6 +3,8 @@ import xml.etree.ElementTree as ET
 import logging
 import re
 
+import instrumentation
+
 logger = logging.getLogger(__name__)
 
 # HWPX 표준 네임스페이스 정의
@@ -29,17 +31,19 @@ def update_xml_text_content(xml_path, modifications):
         if not os.path.exists(xml_path):
             return False
 
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        modified_any = False
-
-        all_paragraphs = root.findall(".//{http://www.hancom.co.kr/hwpml/2011/paragraph}p")
-        for p in all_paragraphs:
-            if _modify_paragraph_with_precision(p, modifications):
-                modified_any = True
+        with open(xml_path, "rb") as f:
+            data = f.read()
+        root = ET.fromstring(data)
 
-        if modified_any:
-            _save_xml(xml_path, root)
+        touched = modify_tree_paragraphs(root, modifications)
+        if touched:
+            # 수정된 문단만 다시 직렬화하고 나머지는 원본 바이트를 그대로 사용
+            new_data = splice_paragraphs(data, list(root.iter(HP_P_TAG)), touched)
+            if new_data is None:
+                _save_xml(xml_path, root)
+            else:
+                with open(xml_path, "wb") as f:
+                    f.write(new_data)
             return True
         return False
         
@@ -48,19 +52,400 @@ def update_xml_text_content(xml_path, modifications):
         return False
 
 
+def update_tree_text_content(root, modifications):
+    """
+    이미 파싱된 XML 트리의 텍스트를 제자리에서 수정합니다. (저장은 호출자 몫)
+    modifications는 치환 규칙 리스트 또는 미리 만든 ReplacementMatcher입니다.
+    """
+    return bool(modify_tree_paragraphs(root, modifications))
+
+
+def modify_tree_paragraphs(root, modifications):
+    """update_tree_text_content와 같지만 수정된 문단(hp:p) 목록을 문서 순서대로 반환"""
+    matcher = _as_matcher(modifications)
+    if not matcher:
+        return []
+
+    touched = []
+    all_paragraphs = root.findall(".//{http://www.hancom.co.kr/hwpml/2011/paragraph}p")
+    with instrumentation.stage("xml_edit", mode="tree", paragraphs=len(all_paragraphs)):
+        for p in all_paragraphs:
+            if _modify_paragraph_with_precision(p, matcher):
+                touched.append(p)
 
+    return touched
 
 
-def _save_xml(path, root):
-    """공통 XML 저장 로직"""
-    xml_str = ET.tostring(root, encoding="unicode")
+class ReplacementMatcher:
+    """
+    치환 규칙 전체를 하나의 정규식(alternation)으로 컴파일한 매처.
+    문단 텍스트를 한 번만 훑어 모든 original을 왼쪽부터 겹치지 않게 치환하므로,
+    한 규칙의 결과가 다음 규칙에 다시 걸리는 연쇄 치환이 생기지 않습니다.
+    같은 위치에서 여러 규칙이 맞으면 목록에서 앞선 규칙이 우선합니다.
+    """
+
+    def __init__(self, modifications):
+        self.table = {}
+        for mod in modifications:
+            orig = mod.get('original', '').strip()
+            new_val = mod.get('modified', '').strip()
+            if orig and orig not in self.table:
+                self.table[orig] = new_val
+
+        self.pattern = None
+        if self.table:
+            self.pattern = re.compile("|".join(re.escape(orig) for orig in self.table))
+
+    def __bool__(self):
+        return self.pattern is not None
+
+    def apply(self, text):
+        """(치환된 텍스트, 치환 여부)를 반환"""
+        if self.pattern is None:
+            return text, False
+        updated_text, count = self.pattern.subn(lambda m: self.table[m.group(0)], text)
+        return updated_text, count > 0
+
+
+def _as_matcher(modifications):
+    if isinstance(modifications, ReplacementMatcher):
+        return modifications
+    return ReplacementMatcher(modifications or [])
+
+
+def _append_child(parent, tag):
+    """ET.SubElement 대체 (ElementTree/lxml 트리 모두 지원)"""
+    child = parent.makeelement(tag, {})
+    parent.append(child)
+    return child
+
+
+def serialize_xml(root):
+    """XML 트리를 HWPX 선언이 붙은 UTF-8 바이트로 직렬화 (ElementTree/lxml 트리 모두 지원)"""
+    if isinstance(root, ET.Element):
+        xml_str = ET.tostring(root, encoding="unicode")
+    else:
+        from lxml import etree as lxml_etree
+        xml_str = lxml_etree.tostring(root, encoding="unicode")
     header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
     xml_str = re.sub(r'<\?xml.*?\?>', '', xml_str).strip()
-    with open(path, "w", encoding="UTF-8") as f:
-        f.write(header + xml_str)
+    return (header + xml_str).encode("UTF-8")
+
+
+def _save_xml(path, root):
+    """공통 XML 저장 로직"""
+    with open(path, "wb") as f:
+        f.write(serialize_xml(root))
+
+
+HP_P_TAG = "{http://www.hancom.co.kr/hwpml/2011/paragraph}p"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+def iterparse_top_level(source_fp, chunk_size=64 * 1024):
+    """
+    XML을 스트리밍으로 읽으며 루트 바로 아래 요소가 완성될 때마다 넘겨줍니다.
+    - ("start", root, ns_decls): 루트 시작 (ns_decls: 루트까지 선언된 [(prefix, uri)])
+    - ("child", elem, None): 완성된 최상위 자식 (다음 자식이 나오면 루트에서 제거됨)
+    - ("end", root, None): 문서 끝
+    메모리는 가장 큰 최상위 요소 하나 크기로 제한됩니다.
+    """
+    parser = ET.XMLPullParser(events=("start", "end", "start-ns"))
+    ns_decls = []
+    depth = 0
+    root = None
+    previous = None
+
+    while True:
+        chunk = source_fp.read(chunk_size)
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+
+        for event, item in parser.read_events():
+            if event == "start-ns":
+                if root is None:
+                    ns_decls.append(item)
+            elif event == "start":
+                depth += 1
+                if depth == 1:
+                    root = item
+                    yield "start", root, ns_decls
+            else:
+                depth -= 1
+                if depth == 1:
+                    if previous is not None:
+                        root.remove(previous)
+                    previous = item
+                    yield "child", item, None
+                elif depth == 0:
+                    yield "end", root, None
+
+        if not chunk:
+            return
+
+
+def _escape_cdata(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attrib(text):
+    text = _escape_cdata(text).replace("\"", "&quot;")
+    return text.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+
+
+# xml: 접두어의 고정 네임스페이스
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+
+def _special_node(node):
+    """주석/PI/엔티티 참조 노드를 XML 문자열로 (ElementTree/lxml 트리 모두 지원)"""
+    kind = getattr(node.tag, "__name__", "")
+    text = node.text or ""
+    if kind == "Comment":
+        return f"<!--{text}-->"
+    if kind == "ProcessingInstruction":
+        target = getattr(node, "target", None)  # lxml은 target/text가 나뉘어 있고, ElementTree는 text에 함께 있음
+        if target:
+            return f"<?{target} {text}?>" if text else f"<?{target}?>"
+        return f"<?{text}?>"
+    if kind == "Entity":
+        return text  # lxml: "&이름;"
+    return ""
+
+
+class _StreamSerializer:
+    """
+    스트리밍 출력용 직렬화기. 원본 문서의 접두어(prefix)를 그대로 사용하므로
+    최상위 요소마다 xmlns 선언이 반복되지 않습니다.
+    """
+
+    def __init__(self, ns_decls):
+        self.prefixes = {}
+        for prefix, uri in ns_decls:
+            if uri != XML_NS:
+                self.prefixes.setdefault(uri, prefix)
+
+    def _qname(self, name, extra_decls):
+        if name[:1] != "{":
+            return name
+        uri, local = name[1:].split("}", 1)
+        if uri == XML_NS:
+            # xml 접두어는 XML 규격상 항상 바인딩되어 있으므로 선언하지 않음 (xml:space 등)
+            return f"xml:{local}"
+        prefix = self.prefixes.get(uri)
+        if prefix is None:
+            # 루트에 선언되지 않은 네임스페이스: 해당 최상위 요소에서 선언
+            prefix = extra_decls.get(uri)
+            if prefix is None:
+                prefix = f"ns{len(self.prefixes) + len(extra_decls)}"
+                extra_decls[uri] = prefix
+        return f"{prefix}:{local}" if prefix else local
+
+    def start_tag(self, root):
+        parts = ["<", self._qname(root.tag, {})]
+        for uri, prefix in self.prefixes.items():
+            attr = f"xmlns:{prefix}" if prefix else "xmlns"
+            parts.append(f' {attr}="{_escape_attrib(uri)}"')
+        for key, value in root.items():
+            parts.append(f' {self._qname(key, {})}="{_escape_attrib(value)}"')
+        parts.append(">")
+        return "".join(parts)
+
+    def end_tag(self, root):
+        return f"</{self._qname(root.tag, {})}>"
+
+    def element(self, elem):
+        """요소(하위 포함, tail 제외)를 문자열로 직렬화"""
+        parts = []
+        extra_decls = {}
+        self._write(parts, elem, extra_decls, top=True)
+        if extra_decls:
+            decls = "".join(f' xmlns:{prefix}="{_escape_attrib(uri)}"' for uri, prefix in extra_decls.items())
+            parts[1] += decls
+        return "".join(parts)
+
+    def _write(self, parts, elem, extra_decls, top=False):
+        tag = elem.tag
+        if not isinstance(tag, str):
+            # 주석/PI/엔티티 참조 (lxml 트리 등): 노드와 뒤따르는 텍스트(tail)를 그대로 기록
+            parts.append(_special_node(elem))
+            if elem.tail and not top:
+                parts.append(_escape_cdata(elem.tail))
+            return
+        parts.append("<")
+        parts.append(self._qname(tag, extra_decls))
+        for key, value in elem.items():
+            parts.append(f' {self._qname(key, extra_decls)}="{_escape_attrib(value)}"')
+        if elem.text or len(elem):
+            parts.append(">")
+            if elem.text:
+                parts.append(_escape_cdata(elem.text))
+            for child in elem:
+                self._write(parts, child, extra_decls)
+            parts.append(f"</{self._qname(tag, extra_decls)}>")
+        else:
+            parts.append(" />")
+        if elem.tail and not top:
+            parts.append(_escape_cdata(elem.tail))
+
+
+HP_NS = NAMESPACES["hp"]
+_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([^"\']+)["\']')
+# 시작 태그의 속성 부분 (따옴표 안의 '>'도 올바르게 건너뜀)
+_ATTRS_PATTERN = rb"""(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*"""
+
+
+def read_namespace_decls(data, chunk_size=64 * 1024):
+    """문서 앞부분만 읽어 루트 요소까지 선언된 네임스페이스 [(prefix, uri)]를 반환"""
+    parser = ET.XMLPullParser(events=("start-ns", "start"))
+    decls = []
+    for offset in range(0, len(data), chunk_size):
+        parser.feed(data[offset:offset + chunk_size])
+        for event, item in parser.read_events():
+            if event == "start":
+                return decls
+            decls.append(item)
+    return decls
+
+
+def find_paragraph_ranges(data, qname):
+    """
+    원본 bytes에서 문단 요소(qname, 예: "hp:p")의 [시작, 끝) 바이트 범위를 시작 태그 순서대로 반환합니다.
+    중첩된 문단(표 셀 등)도 포함하므로 root.iter(HP_P_TAG) 순서와 1:1로 대응합니다.
+    """
+    name = re.escape(qname.encode("UTF-8"))
+    pattern = re.compile(rb"<" + name + _ATTRS_PATTERN + rb"\s*(/?)>|</" + name + rb"\s*>")
+
+    ranges = []
+    open_stack = []
+    for m in pattern.finditer(data):
+        closing = m.group(1)
+        if closing is None:  # 끝 태그
+            if not open_stack:
+                return None
+            idx = open_stack.pop()
+            ranges[idx][1] = m.end()
+        elif closing == b"/":
+            ranges.append([m.start(), m.end()])
+        else:
+            open_stack.append(len(ranges))
+            ranges.append([m.start(), None])
+    if open_stack:
+        return None
+    return ranges
+
+
+def splice_paragraphs(data, paragraphs, touched, ns_decls=None, ranges=None):
+    """
+    원본 bytes에서 수정된 문단의 바이트 범위만 다시 직렬화한 문단으로 바꿔 끼운 결과를 반환합니다.
+    나머지 부분(선언, 루트, 수정되지 않은 문단)은 원본 바이트 그대로이므로 비용이 수정한 문단 수에 비례합니다.
+
+    paragraphs: data를 파싱한 트리의 root.iter(HP_P_TAG) 목록 (문서 순서)
+    touched: 수정된 문단들
+    ns_decls / ranges: 같은 원본에 여러 번 적용할 때 미리 계산해 둔 값 (read_namespace_decls / find_paragraph_ranges)
+    원본 위치와 트리를 대응시킬 수 없으면(UTF-8 아님, 주석 안의 태그 등) None을 반환하며,
+    이때 호출자는 트리 전체를 직렬화해야 합니다.
+    """
+    m = _ENCODING_RE.match(data)
+    if m and m.group(1).decode("ascii", "replace").upper().replace("-", "") != "UTF8":
+        return None
+
+    if ns_decls is None:
+        ns_decls = read_namespace_decls(data)
+    prefix = next((prefix for prefix, uri in ns_decls if uri == HP_NS), None)
+    if prefix is None:
+        return None
+    if ranges is None:
+        ranges = find_paragraph_ranges(data, f"{prefix}:p" if prefix else "p")
+    if ranges is None or len(ranges) != len(paragraphs):
+        return None
+
+    touched = set(touched)
+    serializer = _StreamSerializer(ns_decls)
+    pieces = []
+    pos = 0
+    for p, (start, end) in zip(paragraphs, ranges):
+        if start < pos or p not in touched:
+            continue  # 수정되지 않았거나, 이미 바깥 문단과 함께 다시 쓴 중첩 문단
+        pieces.append((start, end, serializer.element(p).encode("UTF-8")))
+        pos = end
+    return splice_bytes(data, pieces)
+
+
+def splice_bytes(data, pieces):
+    """[(시작, 끝, 새 bytes)] (시작 위치 순, 겹치지 않음)를 원본 data의 해당 범위에 바꿔 끼운 bytes"""
+    out = []
+    pos = 0
+    for start, end, new_bytes in pieces:
+        if start < pos or end < start:
+            # 같은 범위가 두 번 들어오면 원본 내용이 중복 기록되므로 거부
+            raise ValueError(f"바꿔 끼울 범위가 겹치거나 순서가 잘못되었습니다: ({start}, {end}), 이전 끝 {pos}")
+        out.append(data[pos:start])
+        out.append(new_bytes)
+        pos = end
+    out.append(data[pos:])
+    return b"".join(out)
+
+
+def serialize_element(elem, ns_decls):
+    """요소 하나(tail 제외)를 원본 문서의 접두어(ns_decls)로 직렬화한 UTF-8 bytes"""
+    return _StreamSerializer(ns_decls).element(elem).encode("UTF-8")
+
+
+def update_xml_stream(source_fp, dest_fp, modifications):
+    """
+    대용량 섹션 XML을 문단 단위로 스트리밍 수정합니다.
+    최상위 요소가 끝날 때마다 수정 후 바로 dest_fp에 쓰므로 메모리 사용량이 문서 크기와 무관합니다.
+    수정된 문단이 하나라도 있으면 True를 반환합니다.
+    """
+    matcher = _as_matcher(modifications)
+    modified_any = False
+    root = serializer = None
+    pending = None  # tail을 아직 쓰지 않은 직전 최상위 요소
+
+    def write(text):
+        if text:
+            data = text.encode("UTF-8")
+            dest_fp.write(data)
+            rec.add_bytes(written=len(data))
+
+    with instrumentation.stage("xml_edit", mode="stream") as rec:
+        for event, elem, ns_decls in iterparse_top_level(source_fp):
+            if event == "start":
+                root = elem
+                serializer = _StreamSerializer(ns_decls)
+                write(XML_DECLARATION)
+                write(serializer.start_tag(elem))
+                continue
+
+            if pending is None:
+                # 루트의 첫 텍스트는 첫 자식이 시작된 뒤에 확정됨
+                write(_escape_cdata(root.text or ""))
+            else:
+                write(_escape_cdata(pending.tail or ""))
+
+            if event == "end":
+                write(serializer.end_tag(elem))
+                break
+
+            if matcher:
+                for p in elem.iter(HP_P_TAG):
+                    if _modify_paragraph_with_precision(p, matcher):
+                        modified_any = True
+            write(serializer.element(elem))
+            pending = elem
+
+    return modified_any
+
+
+def modify_paragraph(p_node, modifications):
+    """문단(hp:p) 하나에만 치환 규칙을 적용합니다. 수정 여부를 반환합니다."""
+    return _modify_paragraph_with_precision(p_node, _as_matcher(modifications))
 
 
-def _modify_paragraph_with_precision(p_node, modifications):
+def _modify_paragraph_with_precision(p_node, matcher):
     """문단 내 텍스트 치환 및 구조 복원"""
     runs = p_node.findall("./{http://www.hancom.co.kr/hwpml/2011/paragraph}run")
     if not runs: return False
@@ -79,15 +464,7 @@ def _modify_paragraph_with_precision(p_node, modifications):
     combined_text = "".join(parts)
     if not combined_text.strip(): return False
 
-    updated_text = combined_text
-    is_modified = False
-    
-    for mod in modifications:
-        orig = mod.get('original', '').strip()
-        new_val = mod.get('modified', '').strip()
-        if orig and orig in updated_text:
-            updated_text = updated_text.replace(orig, new_val)
-            is_modified = True
+    updated_text, is_modified = _as_matcher(matcher).apply(combined_text)
 
     if is_modified:
         segments = re.split(r'(\t|\n)', updated_text)
@@ -103,10 +480,10 @@ def _modify_paragraph_with_precision(p_node, modifications):
         # 첫 번째 런에 수정된 텍스트 재조립
         for seg in segments:
             if not seg: continue
-            if seg == '\t': ET.SubElement(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}tab")
-            elif seg == '\n': ET.SubElement(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}br")
+            if seg == '\t': _append_child(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}tab")
+            elif seg == '\n': _append_child(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}br")
             else:
-                t_node = ET.SubElement(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}t")
+                t_node = _append_child(first_run, "{http://www.hancom.co.kr/hwpml/2011/paragraph}t")
                 t_node.text = seg
 
         lsa = p_node.find("./{http://www.hancom.co.kr/hwpml/2011/paragraph}linesegarray")
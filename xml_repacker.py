@@ -1,6 +1,43 @@
+import io
 import os
+import zlib
+import struct
 import zipfile
+import tempfile
 import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+
+# Priority/Compression mapping based on original HWPX analysis
+# mimetype: must be first, STORED
+# version.xml: STORED
+# Preview/PrvImage.png: STORED
+# Others: DEFLATED
+ITEMS_TO_STORE = ["mimetype", "version.xml", "Preview/PrvImage.png"]
+
+# Standard timestamp (1980-01-01 00:00:00) to match original
+FIXED_TIME = (1980, 1, 1, 0, 0, 0)
+
+# zlib default level (same output as ZipFile.writestr)
+DEFAULT_COMPRESS_LEVEL = zlib.Z_DEFAULT_COMPRESSION
+
+# Members are streamed in chunks of this size instead of being read whole
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _make_zinfo(rel_path):
+    """
+    Builds the ZipInfo for one member following the HWPX storage rules.
+    """
+    zinfo = zipfile.ZipInfo(rel_path, date_time=FIXED_TIME)
+    if rel_path in ITEMS_TO_STORE:
+        zinfo.compress_type = zipfile.ZIP_STORED
+    else:
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+    return zinfo
+
 
 def repackage_hwpx(input_dir, output_file):
     """
@@ -15,47 +52,242 @@ def repackage_hwpx(input_dir, output_file):
         # Create the output zip file
         with zipfile.ZipFile(output_file, 'w') as zf:
             print(f"Repackaging '{input_dir}' to '{output_file}'...")
-            
-            # Priority/Compression mapping based on original HWPX analysis
-            # mimetype: must be first, STORED
-            # version.xml: STORED
-            # Preview/PrvImage.png: STORED
-            # Others: DEFLATED
-            
-            items_to_store = ["mimetype", "version.xml", "Preview/PrvImage.png"]
-            
-            # Standard timestamp (1980-01-01 00:00:00) to match original
-            fixed_time = (1980, 1, 1, 0, 0, 0)
-            
+
             # 1. mimetype (MUST BE FIRST)
             mimetype_path = os.path.join(input_dir, "mimetype")
             if os.path.exists(mimetype_path):
-                zinfo = zipfile.ZipInfo("mimetype", date_time=fixed_time)
-                zinfo.compress_type = zipfile.ZIP_STORED
                 with open(mimetype_path, "rb") as f:
-                    zf.writestr(zinfo, f.read())
-            
+                    zf.writestr(_make_zinfo("mimetype"), f.read())
+
             # 2. Walk and add others
             for root, dirs, files in os.walk(input_dir):
                 for file in files:
                     rel_path = os.path.relpath(os.path.join(root, file), start=input_dir)
                     if rel_path == "mimetype":
                         continue
-                    
+
                     full_path = os.path.join(root, file)
-                    zinfo = zipfile.ZipInfo(rel_path, date_time=fixed_time)
-                    
-                    if rel_path in items_to_store:
-                        zinfo.compress_type = zipfile.ZIP_STORED
-                    else:
-                        zinfo.compress_type = zipfile.ZIP_DEFLATED
-                        
                     with open(full_path, "rb") as f:
-                        zf.writestr(zinfo, f.read())
-        
+                        zf.writestr(_make_zinfo(rel_path), f.read())
+
         print(f"Successfully created '{output_file}'")
         return True
 
     except Exception as e:
         print(f"Error creating HWPX: {e}")
         return False
+
+
+def _open_source(source):
+    """
+    Accepts a path, a file object or an already opened ZipFile.
+    Returns (zipfile, should_close).
+    """
+    if isinstance(source, zipfile.ZipFile):
+        return source, False
+    return zipfile.ZipFile(source, 'r'), True
+
+
+def _compress_bytes(name, data, compresslevel):
+    """
+    Builds the ZipInfo and payload for a freshly written member.
+    Runs in worker threads when parallel compression is enabled (zlib releases the GIL).
+    """
+    zinfo = _make_zinfo(name)
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data) & 0xffffffff
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+    else:
+        payload = data
+    zinfo.compress_size = len(payload)
+    return zinfo, [payload]
+
+
+def _compress_stream(name, src_fp, compresslevel):
+    """
+    Re-encodes a member chunk by chunk into a spooled buffer so large members
+    are never held in memory as a whole.
+    """
+    zinfo = _make_zinfo(name)
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_CHUNK_SIZE)
+    compressor = None
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+
+    crc, file_size = 0, 0
+    while True:
+        chunk = src_fp.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        crc = zlib.crc32(chunk, crc)
+        file_size += len(chunk)
+        spool.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        spool.write(compressor.flush())
+
+    zinfo.file_size = file_size
+    zinfo.CRC = crc & 0xffffffff
+    zinfo.compress_size = spool.tell()
+    spool.seek(0)
+    return zinfo, _iter_chunks(spool, zinfo.compress_size, close=True)
+
+
+def _iter_chunks(fp, length, close=False):
+    """Yields length bytes from fp in STREAM_CHUNK_SIZE pieces."""
+    try:
+        remaining = length
+        while remaining > 0:
+            chunk = fp.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise EOFError("Unexpected end of archive data")
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        if close:
+            fp.close()
+
+
+def _compress_member(name, data, compresslevel):
+    """bytes or a readable binary file object (streamed)."""
+    if isinstance(data, (bytes, bytearray)):
+        return _compress_bytes(name, data, compresslevel)
+    return _compress_stream(name, data, compresslevel)
+
+
+def _raw_member(name, src, info):
+    """
+    Prepares a raw copy of an unchanged member: the compressed bytes are taken
+    from the source archive as-is, without decompressing or recompressing.
+    Reads hold the archive lock, like ZipFile.open, since src may be shared.
+    """
+    with src._lock:
+        src.fp.seek(info.header_offset)
+        header = src.fp.read(30)
+    if len(header) != 30 or header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Bad local file header for '{name}'")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    offset = info.header_offset + 30 + name_len + extra_len
+
+    zinfo = _make_zinfo(name)
+    zinfo.CRC = info.CRC
+    zinfo.file_size = info.file_size
+    zinfo.compress_size = info.compress_size
+    return zinfo, _iter_archive_chunks(src, offset, info.compress_size)
+
+
+def _iter_archive_chunks(src, offset, length):
+    """
+    Yields length bytes of src's underlying file starting at offset.
+    Each read seeks under src._lock, so other readers of src may run in between.
+    """
+    position, remaining = offset, length
+    while remaining > 0:
+        with src._lock:
+            src.fp.seek(position)
+            chunk = src.fp.read(min(STREAM_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise EOFError("Unexpected end of archive data")
+        position += len(chunk)
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _can_raw_copy(name, info):
+    """Raw copy is only valid when the stored encoding already matches the HWPX rules."""
+    encrypted = info.flag_bits & 0x1
+    return not encrypted and info.compress_type == _make_zinfo(name).compress_type
+
+
+@functools.lru_cache(maxsize=None)
+def _writestr_external_attr():
+    """
+    external_attr that ZipFile.writestr stores for a _make_zinfo entry.
+    Taken from writestr itself because the default differs between Python versions.
+    """
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr(_make_zinfo("probe"), b"")
+    return zf.infolist()[0].external_attr
+
+
+def _write_raw_member(zf, zinfo, chunks):
+    """
+    Writes an already encoded member (local header + payload) and registers it
+    so ZipFile writes the central directory entry on close.
+    Entries get the same metadata as ZipFile.writestr(zinfo), and zf._lock is
+    held while the archive state changes, as writestr does.
+    """
+    if not zinfo.external_attr:
+        zinfo.external_attr = _writestr_external_attr()
+    # Same ZIP64 rule as ZipFile.writestr for the local header
+    zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+
+    with zf._lock:
+        zf.fp.seek(zf.start_dir)
+        zinfo.header_offset = zf.fp.tell()
+        zf.fp.write(zinfo.FileHeader(zip64))
+        for chunk in chunks:
+            zf.fp.write(chunk)
+
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        zf.start_dir = zf.fp.tell()
+        zf._didModify = True
+
+
+def repackage_incremental(source, output_file, replaced_members=None,
+                          compresslevel=DEFAULT_COMPRESS_LEVEL, workers=1):
+    """
+    Rebuilds an HWPX (ZIP) file from a source archive, compressing only the
+    members in replaced_members ({name: bytes or binary file object}).
+    Unchanged members are copied as raw compressed bytes and streamed in chunks,
+    so BinData images and previews cost about a file copy.
+    mimetype stays first and STORED, and all entries keep the fixed 1980 timestamp.
+    workers > 1 compresses the replaced members in parallel threads.
+    """
+    replaced_members = replaced_members or {}
+    with instrumentation.stage("repack", rewritten=len(replaced_members)) as rec:
+        try:
+            src, should_close = _open_source(source)
+            try:
+                # 1. Fresh compression for edited members only
+                items = list(replaced_members.items())
+                if workers and workers > 1 and len(items) > 1:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        compressed = list(pool.map(lambda kv: _compress_member(kv[0], kv[1], compresslevel), items))
+                else:
+                    compressed = [_compress_member(name, data, compresslevel) for name, data in items]
+                fresh = {zinfo.filename: (zinfo, chunks) for zinfo, chunks in compressed}
+
+                # 2. Member order: mimetype first, then source order, then new members
+                names = [info.filename for info in src.infolist() if not info.is_dir()]
+                names += [name for name in replaced_members if name not in names]
+                names.sort(key=lambda n: n != "mimetype")
+
+                with zipfile.ZipFile(output_file, 'w') as zf:
+                    print(f"Repackaging {len(names)} members ({len(fresh)} rewritten) to '{output_file}'...")
+                    for name in names:
+                        if name in fresh:
+                            zinfo, chunks = fresh[name]
+                        else:
+                            info = src.getinfo(name)
+                            if _can_raw_copy(name, info):
+                                zinfo, chunks = _raw_member(name, src, info)
+                            else:
+                                with src.open(info) as member_fp:
+                                    zinfo, chunks = _compress_stream(name, member_fp, compresslevel)
+                        _write_raw_member(zf, zinfo, chunks)
+            finally:
+                if should_close:
+                    src.close()
+
+            if isinstance(output_file, (str, os.PathLike)):
+                rec.add_bytes(written=os.path.getsize(output_file))
+            print(f"Successfully created '{output_file}'")
+            return True
+
+        except Exception as e:
+            print(f"Error creating HWPX: {e}")
+            return False